@@ -6,8 +6,10 @@ from typing import Any, Dict
 from .base import Agent
 from controller.task_graph import TaskGraph
 from llm.model_manager import ModelManager
+from memory.context_packer import ContextPacker
 from memory.hybrid_search import HybridSearch
 from memory.semantic_indexer import SemanticIndexer
+from observability.logger import span
 
 class PlannerAgent(Agent):
     """
@@ -18,12 +20,16 @@ class PlannerAgent(Agent):
         model_manager: ModelManager,
         task_graph: TaskGraph,
         semantic_indexer: SemanticIndexer,
-        memory: HybridSearch
+        memory: HybridSearch,
+        context_packer: ContextPacker = None,
+        retrieval_k: int = 20,
     ):
         self.model_manager = model_manager
         self.task_graph = task_graph
         self.semantic_indexer = semantic_indexer
         self.memory = memory
+        self.context_packer = context_packer or ContextPacker()
+        self.retrieval_k = retrieval_k
 
     def _create_planning_prompt(self, query: str, context: str) -> str:
         """Creates the prompt for the orchestrator LLM to generate a task plan."""
@@ -61,12 +67,18 @@ CONTEXT:
 
         if self._decide_indexing(user_query):
             print("Planner decided to index the repository.")
-            self.semantic_indexer.index_repo()
-            all_chunks = [chunk for chunks in self.semantic_indexer.index.values() for chunk in chunks]
-            self.memory.index(all_chunks)
-            # Retrieve relevant context from memory
-            chunks = self.memory.search(user_query)
-            relevant_context = "\n\n".join([chunk for chunk, _ in chunks]) or "No context available."
+            # Stream chunks straight from the indexer; unchanged files are not re-parsed.
+            self.memory.index(self.semantic_indexer.iter_chunks())
+            stats = self.semantic_indexer.stats
+            print(f"Indexed {stats['files']} files ({stats['parsed']} re-parsed) "
+                  f"in {stats['seconds']:.2f}s.")
+            # Over-fetch, then let the packer dedupe and cut to the token budget.
+            chunks = self.memory.search(user_query, top_k=self.retrieval_k)
+            with span("retrieval.pack", candidates=len(chunks)):
+                relevant_context = self.context_packer.pack(chunks) or "No context available."
+            packed = self.context_packer.last_stats
+            print(f"Packed {packed['kept']}/{packed['candidates']} chunks "
+                  f"({packed['duplicates']} near-duplicates) into {packed['tokens']} tokens.")
         else:
             print("Planner decided to skip indexing.")
             relevant_context = "No repository context available."
@@ -84,11 +96,15 @@ CONTEXT:
             return
 
         print("Populating task graph...")
-        for task_data in plan:
-            self.task_graph.add_task(
-                node_id=task_data['id'],
-                task_fn=task_data['description'],
-                deps=task_data.get('deps', [])
-            )
+        # Added as one batch so the plan may list a task before its dependencies;
+        # duplicate ids, unknown deps and cycles are rejected as a whole.
+        self.task_graph.add_tasks([
+            {
+                "node_id": task_data['id'],
+                "task_fn": task_data['description'],
+                "deps": task_data.get('deps', []),
+            }
+            for task_data in plan
+        ])
         
         print(f"Task graph populated with {len(self.task_graph.nodes)} tasks.")
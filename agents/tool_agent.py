@@ -0,0 +1,218 @@
+"""
+Tool agent: answers a query by picking one tool (from a similar past query
+or from the model) and running it in a sandbox. Also builds the fully wired
+agent used by the CLI, the daemon and batch mode (see main.py).
+"""
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+from llm.model_manager import ModelManager
+from sandbox.wsl_sandbox import WSLSandbox
+from sandbox.workspace_pool import WorkspacePool
+from tools.registry import ToolRegistry
+from memory.tool_exemplar_store import ToolExemplarStore
+from observability.logger import Logger, span
+from observability.guardrails import Guardrails, GuardrailViolation
+
+@dataclass
+class ToolCall:
+    """A query's chosen tool; error is set (and the tool not run) if none is usable."""
+    query: str
+    tool_name: str = None
+    args: Dict[str, Any] = None
+    reused: bool = False
+    latency: float = 0.0
+    error: str = None
+
+
+class ToolAgent:
+    """
+    A simple agent that selects and executes a single tool based on a user prompt.
+    Queries that closely match a past successful one reuse its tool call from
+    the exemplar store instead of asking the model. With guardrails, tool
+    arguments holding destructive commands are refused before execution.
+    """
+    def __init__(self, model: ModelManager, tool_registry: ToolRegistry, sandbox: WSLSandbox,
+                 exemplars: ToolExemplarStore = None, guardrails: Guardrails = None):
+        self.model = model
+        self.tool_registry = tool_registry
+        self.sandbox = sandbox
+        self.exemplars = exemplars
+        self.guardrails = guardrails
+
+    def _create_prompt(self, query: str, tools: str) -> str:
+        """Creates a prompt for the LLM to select a tool."""
+        return f"""
+You are a helpful AI assistant. Your goal is to select the best tool to respond to the user's query.
+Your output must be a single JSON object with two fields:
+- "tool_name": The name of the tool to use.
+- "args": A dictionary of arguments to pass to the tool.
+
+USER QUERY: "{query}"
+
+AVAILABLE TOOLS:
+---
+{tools}
+---
+
+Your response must be ONLY the JSON object.
+"""
+
+    def _select(self, query: str) -> ToolCall:
+        """Picks the tool call for a query: from the exemplar store, else from the model."""
+        exemplar = self.exemplars.lookup(query) if self.exemplars is not None else None
+        if exemplar is not None:
+            print(f"Reusing tool call from a similar past query: {exemplar.query!r}")
+            return ToolCall(query, exemplar.tool_name, dict(exemplar.args), reused=True)
+        # Only tools that lexically match the query; definitions are pre-rendered.
+        available_tools = self.tool_registry.get_tool_definitions_str(query)
+        prompt = self._create_prompt(query, available_tools)
+
+        print("Selecting tool with model...")
+        start = time.perf_counter()
+        # Routed to the small model first; escalates if its JSON does not validate.
+        tool_call = self.model.select_tool(prompt, self.tool_registry.tools)
+        latency = time.perf_counter() - start
+        print(f"Received tool call from LLM: {tool_call}")
+        if tool_call is None:
+            return ToolCall(query, error="Error: LLM returned invalid JSON.")
+        return ToolCall(query, tool_call.get("tool_name"), tool_call.get("args", {}),
+                        latency=latency)
+
+    def _check(self, call: ToolCall) -> ToolCall:
+        """Sets call.error if the tool does not exist or the guardrails refuse its args."""
+        if call.error is None and not self.tool_registry.get_tool(call.tool_name):
+            call.error = f"Error: LLM selected a non-existent tool: {call.tool_name}"
+        if call.error is None and self.guardrails is not None:
+            try:
+                self.guardrails.validate_tool_call(call.tool_name, call.args)
+            except GuardrailViolation as e:
+                call.error = f"Error: {e}"
+        return call
+
+    def _execute(self, call: ToolCall, sandbox: WSLSandbox) -> dict:
+        print(f"Executing tool '{call.tool_name}' with args: {call.args}")
+        with sandbox as sb:
+            execution_result = sb.run(self.tool_registry.get_tool(call.tool_name), **call.args)
+        print(f"Task finished. Result: {execution_result}")
+        return execution_result
+
+    def _remember(self, call: ToolCall, result: Any) -> None:
+        if (not call.reused and self.exemplars is not None
+                and isinstance(result, dict) and result.get("success")):
+            self.exemplars.add(call.query, call.tool_name, call.args, result.get("output", ""),
+                               latency=call.latency)
+
+    def run(self, query: str) -> dict:
+        """Selects and runs a tool, returning the result."""
+        call = self._check(self._select(query))
+        if call.error is not None:
+            return {"success": False, "output": call.error}
+        execution_result = self._execute(call, self.sandbox)
+        self._remember(call, execution_result)
+        return execution_result
+
+    def run_batch(self, queries: Iterable[str], max_sandboxes: int = None,
+                  selection_workers: int = 8) -> Iterator[dict]:
+        """
+        Runs many queries, yielding {"index", "query", "tool_name", "result"}
+        as each finishes, so results arrive in completion order.
+        - tool selection for all queries is in flight at once, up to
+          selection_workers (the shared LLM client still caps requests)
+        - selected tools run in parallel on at most max_sandboxes sandboxes
+          (default: the sandbox pool's size, else 2)
+        - queries that select the same read-only tool with the same args
+          share a single execution; "deduplicated" marks the ones that did
+        """
+        queries = list(queries)
+        pool = self.sandbox.pool
+        if max_sandboxes is None:
+            max_sandboxes = pool.size if pool is not None else 2
+        done: "queue.SimpleQueue" = queue.SimpleQueue()
+        lock = threading.Lock()
+        executions: Dict[Tuple[str, str], Future] = {}
+        selector = ThreadPoolExecutor(max_workers=max(1, min(selection_workers, len(queries))),
+                                      thread_name_prefix="tool_select")
+        runner = ThreadPoolExecutor(max_workers=max(1, max_sandboxes),
+                                    thread_name_prefix="tool_run")
+
+        def execute(call: ToolCall) -> dict:
+            # Sandboxes hold per-entry state, so each execution gets its own.
+            sandbox = WSLSandbox(cache_dir=self.sandbox.cache_dir, pool=pool,
+                                 source=self.sandbox.source)
+            return self._execute(call, sandbox)
+
+        def finish(index: int, call: ToolCall, result: dict, shared: bool = False) -> None:
+            item = {"index": index, "query": call.query, "tool_name": call.tool_name,
+                    "result": result}
+            if shared:
+                item["deduplicated"] = True
+            done.put(item)
+
+        def selected(index: int, query: str, future: Future) -> None:
+            try:
+                call = self._check(future.result())
+            except Exception as e:
+                call = ToolCall(query, error=f"Error: {type(e).__name__}: {e}")
+            if call.error is not None:
+                finish(index, call, {"success": False, "output": call.error})
+                return
+            key = None
+            if self.tool_registry.is_read_only(call.tool_name):
+                key = (call.tool_name, json.dumps(call.args, sort_keys=True, default=str))
+            with lock:
+                execution = executions.get(key) if key is not None else None
+                shared = execution is not None
+                if execution is None:
+                    execution = runner.submit(execute, call)
+                    if key is not None:
+                        executions[key] = execution
+
+            def executed(f: Future) -> None:
+                try:
+                    result = f.result()
+                except Exception as e:
+                    result = {"success": False, "output": f"Error: {type(e).__name__}: {e}"}
+                finish(index, call, result, shared)
+                if not shared:
+                    self._remember(call, result)
+            execution.add_done_callback(executed)
+
+        with span("agent.batch", queries=len(queries), sandboxes=max_sandboxes):
+            try:
+                for index, query in enumerate(queries):
+                    selector.submit(self._select, query).add_done_callback(
+                        partial(selected, index, query))
+                for _ in queries:
+                    yield done.get()
+            finally:
+                # Only matters when the caller stops early: queued work is dropped.
+                selector.shutdown(wait=True, cancel_futures=True)
+                runner.shutdown(wait=True, cancel_futures=True)
+
+
+def build_agent() -> ToolAgent:
+    """The agent with every client, cache and pool it holds; built once per process."""
+    model = ModelManager.from_env()
+    tool_registry = ToolRegistry()
+    sandbox = WSLSandbox(pool=WorkspacePool(size=int(os.getenv("SMALLHANDS_SANDBOX_POOL", "2"))))
+    return ToolAgent(model, tool_registry, sandbox, exemplars=ToolExemplarStore(),
+                     guardrails=Guardrails())
+
+
+def answer(agent: ToolAgent, query: str, logger: Logger) -> dict:
+    """Runs one query between the input and output guardrails."""
+    agent.guardrails.validate_input(query)
+    logger.log("query_start", query=query)
+    with span("agent.query"):
+        result = agent.run(query)
+    result = agent.guardrails.validate_output(result)
+    logger.log("query_complete", result=result)
+    return result
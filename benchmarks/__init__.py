@@ -0,0 +1 @@
+"""Benchmarks and evaluation harness for SmallHands."""
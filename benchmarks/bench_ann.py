@@ -0,0 +1,80 @@
+"""
+Recall-vs-latency benchmark for the FaissVectorStore index types.
+
+Builds each index type over the same synthetic clustered unit vectors,
+sweeps its query-time knob (nprobe for IVF, efSearch for HNSW) and reports
+recall@k against the exact flat index, mean query latency and index size.
+
+    python -m benchmarks.bench_ann --n 100000 --dim 256
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from memory.vector_store import create_faiss_index, set_search_params
+
+SWEEPS = {
+    "flat": [None],
+    "ivf_flat": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+    "ivf_pq": [1, 4, 16, 64],
+}
+
+
+def clustered_vectors(n: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype("float32")
+    assignment = rng.integers(0, clusters, size=n)
+    vectors = centers[assignment] + 0.5 * rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def index_bytes(index) -> int:
+    return faiss.serialize_index(index).nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--n", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    base = clustered_vectors(args.n, args.dim, clusters=max(args.n // 500, 8))
+    queries = clustered_vectors(args.queries, args.dim, clusters=max(args.n // 500, 8), seed=1)
+    ids = np.arange(args.n, dtype="int64")
+
+    exact = create_faiss_index("flat", base)
+    exact.add_with_ids(base, ids)
+    _, truth = exact.search(queries, args.k)
+
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'index':<10} {'knob':>6} {'recall@k':>9} {'ms/query':>9} {'build s':>8} {'MB':>8}")
+    for kind, knobs in SWEEPS.items():
+        start = time.perf_counter()
+        index = create_faiss_index(kind, base)
+        index.add_with_ids(base, ids)
+        build = time.perf_counter() - start
+        size_mb = index_bytes(index) / 1e6
+        for knob in knobs:
+            if kind == "hnsw":
+                set_search_params(index, ef_search=knob)
+            elif knob is not None:
+                set_search_params(index, nprobe=knob)
+            start = time.perf_counter()
+            _, found = index.search(queries, args.k)
+            latency_ms = (time.perf_counter() - start) * 1000 / args.queries
+            recall = np.mean([
+                len(set(found[i]) & set(truth[i])) / args.k for i in range(args.queries)
+            ])
+            print(f"{kind:<10} {str(knob or '-'):>6} {recall:9.3f} {latency_ms:9.3f} "
+                  f"{build:8.2f} {size_mb:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
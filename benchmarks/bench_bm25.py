@@ -0,0 +1,78 @@
+"""
+BM25 benchmark: sparse BM25Strategy vs the original rank_bm25 strategy.
+
+Indexes synthetic code chunks with both strategies and reports index build
+time, mean query latency and incremental add time. The rank_bm25 baseline
+needs the optional rank_bm25 package.
+
+    python -m benchmarks.bench_bm25 --chunks 100000
+"""
+
+import argparse
+import random
+import time
+
+from memory.hybrid_search import BM25Strategy, RankBM25Strategy
+
+WORDS = [
+    "user", "account", "session", "token", "cache", "index", "query", "request",
+    "response", "parse", "render", "config", "client", "server", "handler", "retry",
+    "buffer", "stream", "graph", "node", "task", "state", "result", "error",
+]
+
+
+def synthetic_chunks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        a, b, c = rng.sample(WORDS, 3)
+        body = " ".join(rng.choice(WORDS) for _ in range(rng.randint(10, 40)))
+        chunks.append(
+            f"def {a}_{b}_{i}(self, {c}Id):\n"
+            f"    \"\"\"{body}\"\"\"\n"
+            f"    return self.{b}{c.title()}Handler.get({c}Id)\n"
+        )
+    return chunks
+
+
+def time_queries(strategy, queries, top_k):
+    start = time.perf_counter()
+    for query in queries:
+        strategy.search(query, top_k)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+    rng = random.Random(1)
+    queries = [" ".join(rng.sample(WORDS, 3)) + " handler" for _ in range(args.queries)]
+
+    strategies = [("BM25Strategy (sparse)", BM25Strategy())]
+    if not args.skip_baseline:
+        strategies.append(("RankBM25Strategy (baseline)", RankBM25Strategy()))
+
+    print(f"chunks={args.chunks} queries={args.queries} top_k={args.top_k}")
+    print(f"{'strategy':<30} {'index s':>9} {'ms/query':>10}")
+    for label, strategy in strategies:
+        start = time.perf_counter()
+        strategy.index(chunks)
+        build = time.perf_counter() - start
+        latency = time_queries(strategy, queries, args.top_k)
+        print(f"{label:<30} {build:9.2f} {latency:10.2f}")
+
+    extra = synthetic_chunks(1000, seed=2)
+    sparse = strategies[0][1]
+    start = time.perf_counter()
+    sparse.add(extra)
+    print(f"incremental add of {len(extra)} chunks: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
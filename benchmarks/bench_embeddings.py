@@ -0,0 +1,69 @@
+"""
+Offline throughput benchmark for the embedding pipeline.
+
+Compares the old one-request-per-document loop with batched, concurrent
+embedding, then re-runs against a warm cache. Uses FakeOpenAIClient, so
+the numbers reflect request count and simulated round-trip latency only.
+
+    python -m benchmarks.bench_embeddings --docs 5000 --latency 0.05
+"""
+
+import argparse
+import tempfile
+import time
+import os
+
+from llm.fake_client import FakeOpenAIClient
+from memory.vector_store import EmbeddingCache, EmbeddingPipeline
+
+
+def synthetic_docs(n: int):
+    return [
+        f"def function_{i}(arg_{i % 7}):\n    return helper_{i % 13}(arg_{i % 7}) + {i}\n"
+        for i in range(n)
+    ]
+
+
+def run_sequential(client, model, docs):
+    for doc in docs:
+        client.embeddings.create(input=doc, model=model)
+
+
+def report(label, client, elapsed, n):
+    print(f"{label:<28} {elapsed:8.2f}s  {n / elapsed:10.1f} docs/s  "
+          f"{client.embeddings.calls:6d} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated seconds per request")
+    parser.add_argument("--per-input-latency", type=float, default=0.0005)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-tokens", type=int, default=8000)
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    model = "text-embedding-ada-002"
+    docs = synthetic_docs(args.docs)
+
+    if not args.skip_sequential:
+        client = FakeOpenAIClient(latency=args.latency, per_input_latency=args.per_input_latency)
+        start = time.perf_counter()
+        run_sequential(client, model, docs)
+        report("sequential (baseline)", client, time.perf_counter() - start, len(docs))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(os.path.join(tmp, "embeddings.sqlite"))
+        for label in ("batched, cold cache", "batched, warm cache"):
+            client = FakeOpenAIClient(latency=args.latency, per_input_latency=args.per_input_latency)
+            pipeline = EmbeddingPipeline(client, model, max_batch_tokens=args.batch_tokens,
+                                         max_workers=args.workers, cache=cache)
+            start = time.perf_counter()
+            pipeline.embed(docs)
+            report(label, client, time.perf_counter() - start, len(docs))
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Time-to-first-token and throughput of the LLM client under concurrent load.
+
+Runs N concurrent chat completions against a local mock server and compares:
+a fresh openai.Client per request (the old behaviour), the shared pooled
+client, async streaming through the shared client, and the ToolAgent path
+that stops reading once the tool-call JSON object has closed.
+
+    python -m benchmarks.bench_llm_client --concurrency 32 --ttft 0.2 --token-delay 0.01
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+import openai
+
+from benchmarks.mock_openai import DEFAULT_REPLY, MockOpenAIServer
+from llm.client import LLMClient
+from llm.json_stream import first_json_object
+
+MESSAGES = [{"role": "user", "content": "Which tool should run the tests?"}]
+MODEL = "mock-model"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def report(label: str, samples: List[Tuple[float, float]], wall: float) -> None:
+    ttft = [s[0] for s in samples]
+    total = [s[1] for s in samples]
+    tokens = len(samples) * (len(DEFAULT_REPLY) / 4)
+    print(f"{label:<26} ttft p50 {statistics.median(ttft) * 1000:7.1f}ms "
+          f"p99 {percentile(ttft, 99) * 1000:7.1f}ms  total p50 "
+          f"{statistics.median(total) * 1000:7.1f}ms  {len(samples) / wall:7.1f} req/s "
+          f"{tokens / wall:9.0f} tok/s")
+
+
+def run_threads(fn, n: int, concurrency: int) -> Tuple[List[Tuple[float, float]], float]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda _: fn(), range(n)))
+    return samples, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ttft", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with MockOpenAIServer(ttft=args.ttft, token_delay=args.token_delay) as server:
+        shared = LLMClient(api_key="test", base_url=server.base_url,
+                           max_connections=args.concurrency, max_concurrency=args.concurrency)
+
+        def fresh_client():
+            start = time.perf_counter()
+            client = openai.Client(api_key="test", base_url=server.base_url)
+            client.chat.completions.create(model=MODEL, messages=MESSAGES)
+            client.close()
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed
+
+        def pooled():
+            start = time.perf_counter()
+            shared.create(model=MODEL, messages=MESSAGES)
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed
+
+        def early_json():
+            start = time.perf_counter()
+            first_json_object(shared.stream(model=MODEL, messages=MESSAGES))
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed
+
+        async def streamed(gate: asyncio.Semaphore):
+            # Same admission as the thread pools, so queueing is not counted as TTFT.
+            async with gate:
+                start = time.perf_counter()
+                first = None
+                async for _ in shared.astream(model=MODEL, messages=MESSAGES):
+                    if first is None:
+                        first = time.perf_counter() - start
+                return first, time.perf_counter() - start
+
+        async def run_async():
+            gate = asyncio.Semaphore(args.concurrency)
+            start = time.perf_counter()
+            samples = await asyncio.gather(*(streamed(gate) for _ in range(args.requests)))
+            return samples, time.perf_counter() - start
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}, ttft {args.ttft}s, "
+              f"{len(DEFAULT_REPLY) // 4} tokens at {args.token_delay}s")
+        report("fresh client per call", *run_threads(fresh_client, args.requests,
+                                                     args.concurrency))
+        report("shared pooled client", *run_threads(pooled, args.requests, args.concurrency))
+        report("async streaming", *asyncio.run(run_async()))
+        report("stream to first JSON", *run_threads(early_json, args.requests, args.concurrency))
+        print(f"stats: {shared.stats}")
+
+
+if __name__ == "__main__":
+    main()
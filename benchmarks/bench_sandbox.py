@@ -0,0 +1,75 @@
+"""
+WSLSandbox setup time against repository size.
+
+For each repository size, measures the time to enter a sandbox with the
+baseline fresh copy and with each WorkspacePool strategy: the first (cold)
+acquire, and warm acquires after a tool call edited the workspace and a
+few source files changed.
+
+    python -m benchmarks.bench_sandbox --sizes 1000,10000 --strategies rsync,overlay
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from benchmarks.bench_indexer import make_tree, touch_fraction
+from sandbox.workspace_pool import WorkspacePool
+from sandbox.wsl_sandbox import WSLSandbox
+
+
+def enter_time(sandbox: WSLSandbox, dirty: bool = False) -> float:
+    start = time.perf_counter()
+    with sandbox as sb:
+        elapsed = time.perf_counter() - start
+        if dirty:
+            with open(os.path.join(sb.work_dir, "pkg_0", "module_0.py"), "a") as f:
+                f.write("# edited by a tool\n")
+    return elapsed
+
+
+def git_init(repo: str) -> None:
+    subprocess.run("git init -q && git add -A && "
+                   "git -c user.name=bench -c user.email=bench@example.com commit -qm init",
+                   shell=True, cwd=repo, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated file counts")
+    parser.add_argument("--strategies", default="rsync,reflink,hardlink,overlay,worktree")
+    parser.add_argument("--repeats", type=int, default=5, help="warm acquires per strategy")
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'mode':<12} {'cold':>9} {'warm mean':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = os.path.join(tmp, "repo")
+            make_tree(repo, size)
+            git_init(repo)
+
+            times = [enter_time(WSLSandbox(source=repo)) for _ in range(args.repeats)]
+            print(f"{size:>8} {'baseline':<12} {times[0] * 1000:8.1f}ms "
+                  f"{sum(times) / len(times) * 1000:9.1f}ms")
+
+            for strategy in args.strategies.split(","):
+                pool = WorkspacePool(repo, size=1, strategy=strategy,
+                                     base_dir=os.path.join(tmp, f"pool_{strategy}"), prewarm=False)
+                sandbox = WSLSandbox(pool=pool)
+                # Hardlinked workspaces share inodes with the source; keep them read-only.
+                dirty = strategy != "hardlink"
+                cold = enter_time(sandbox, dirty=dirty)
+                warm = []
+                for _ in range(args.repeats):
+                    touch_fraction(repo, size, 0.001)
+                    warm.append(enter_time(sandbox, dirty=dirty))
+                pool.close()
+                label = strategy if pool.strategy == strategy else f"{strategy}>{pool.strategy}"
+                print(f"{size:>8} {label:<12} {cold * 1000:8.1f}ms "
+                      f"{sum(warm) / len(warm) * 1000:9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
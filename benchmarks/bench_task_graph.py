@@ -0,0 +1,92 @@
+"""
+TaskGraph makespan benchmark on synthetic DAGs.
+
+Each task sleeps for cost * --unit seconds, standing in for I/O-bound work
+such as LLM calls or tool subprocesses. Reports makespan for serial
+execution, parallel FIFO dispatch and parallel critical-path-first
+dispatch, next to the critical-path lower bound.
+
+    python -m benchmarks.bench_task_graph --workers 8
+"""
+
+import argparse
+import random
+import time
+from functools import partial
+
+from controller.task_graph import TaskGraph
+
+
+def sleep_task(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def wide_dag(width: int, unit: float):
+    tasks = [{"node_id": "root", "task_fn": partial(sleep_task, unit), "cost": 1}]
+    for i in range(width):
+        tasks.append({"node_id": f"w{i}", "task_fn": partial(sleep_task, unit),
+                      "deps": ["root"], "cost": 1})
+    tasks.append({"node_id": "sink", "task_fn": partial(sleep_task, unit),
+                  "deps": [f"w{i}" for i in range(width)], "cost": 1})
+    return tasks
+
+
+def deep_dag(chains: int, depth: int, unit: float):
+    tasks = []
+    for c in range(chains):
+        for d in range(depth):
+            deps = [f"c{c}_{d - 1}"] if d else []
+            tasks.append({"node_id": f"c{c}_{d}", "task_fn": partial(sleep_task, unit),
+                          "deps": deps, "cost": 1})
+    return tasks
+
+
+def layered_dag(layers: int, width: int, unit: float, seed: int = 0):
+    """Random layered DAG with uneven costs, where dispatch order matters."""
+    rng = random.Random(seed)
+    tasks = []
+    for layer in range(layers):
+        for i in range(width):
+            cost = rng.choice([1, 1, 1, 4])
+            deps = []
+            if layer:
+                deps = rng.sample([f"l{layer - 1}_{j}" for j in range(width)], k=min(2, width))
+            tasks.append({"node_id": f"l{layer}_{i}", "task_fn": partial(sleep_task, cost * unit),
+                          "deps": deps, "cost": cost})
+    return tasks
+
+
+def makespan(tasks, workers: int, prioritize: bool) -> float:
+    graph = TaskGraph()
+    graph.add_tasks(tasks)
+    graph.run(max_parallel=workers, prioritize=prioritize)
+    return graph.last_run["makespan"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--unit", type=float, default=0.01, help="seconds per unit of cost")
+    args = parser.parse_args()
+
+    dags = {
+        "wide (1-64-1)": wide_dag(64, args.unit),
+        "deep (8 chains x 16)": deep_dag(8, 16, args.unit),
+        "layered (6 x 12, mixed cost)": layered_dag(6, 12, args.unit),
+    }
+    print(f"workers={args.workers} unit={args.unit}s")
+    print(f"{'dag':<30} {'tasks':>6} {'serial':>8} {'fifo':>8} {'crit-path':>10} {'bound':>8} {'speedup':>8}")
+    for name, tasks in dags.items():
+        graph = TaskGraph()
+        graph.add_tasks(tasks)
+        bound = graph.nodes[graph.critical_path()[0]].priority * args.unit
+        serial = makespan(tasks, 1, prioritize=False)
+        fifo = makespan(tasks, args.workers, prioritize=False)
+        critical = makespan(tasks, args.workers, prioritize=True)
+        print(f"{name:<30} {len(tasks):>6} {serial:8.2f} {fifo:8.2f} {critical:10.2f} "
+              f"{bound:8.2f} {serial / critical:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
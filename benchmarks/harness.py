@@ -0,0 +1,345 @@
+"""
+End-to-end benchmark harness on synthetic repositories, fully offline.
+
+Runs each scenario in its own process (so peak RSS is per scenario) against
+a generated repository, with deterministic fakes standing in for the OpenAI
+chat and embedding APIs:
+
+- sandbox_setup:  WSLSandbox enter/exit on a WorkspacePool (warm acquires)
+- hybrid_index:   SemanticIndexer chunks into BM25 + FAISS HybridSearch
+- hybrid_search:  queries against the index built above
+- tool_agent:     ToolAgent.run, from tool selection to the sandboxed tool
+- tool_batch:     ToolAgent.run_batch over the same queries, latency measured
+                  to each result; a quarter of the queries repeat
+- planner_agent:  PlannerAgent.run with indexing, retrieval and planning
+
+Each scenario reports throughput, p50/p99/mean latency and peak RSS as
+JSON. With --baseline, results are compared to a stored run and the exit
+status is 1 if any metric regressed by more than --tolerance.
+
+    python -m benchmarks.harness --files 2000 --output results.json
+    python -m benchmarks.harness --baseline benchmarks/baseline.json
+    python -m benchmarks.harness --save-baseline benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_indexer import make_tree
+
+SCENARIOS = ["sandbox_setup", "hybrid_index", "hybrid_search", "tool_agent", "tool_batch",
+             "planner_agent"]
+# Metric -> True if higher is better.
+COMPARED = {"throughput": True, "p50": False, "p99": False, "peak_rss_mb": False}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def summarize(latencies: List[float], **extra: Any) -> Dict[str, Any]:
+    total = sum(latencies)
+    return {
+        "iterations": len(latencies),
+        "throughput": len(latencies) / total if total else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p99": percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies) if latencies else 0.0,
+        **extra,
+    }
+
+
+def timed(fn: Callable[[int], Any], iterations: int) -> List[float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def fake_responder(messages: List[Dict[str, Any]], model: str) -> str:
+    """Replies like a well-behaved model: a tool call or a three-step plan."""
+    prompt = messages[-1]["content"]
+    if "AVAILABLE TOOLS" in prompt:
+        query = prompt.split('USER QUERY: "', 1)[1].split('"', 1)[0]
+        return json.dumps({"tool_name": "search_repo", "args": {"query": query.split()[-1]}})
+    return json.dumps([
+        {"id": "inspect", "description": "Inspect the affected modules", "deps": []},
+        {"id": "change", "description": "Make the change", "deps": ["inspect"]},
+        {"id": "verify", "description": "Run the tests", "deps": ["change"]},
+    ])
+
+
+def fake_client(args: argparse.Namespace):
+    from llm.fake_client import FakeOpenAIClient
+    return FakeOpenAIClient(dim=args.dim, latency=args.embed_latency, per_input_latency=0.0,
+                            responder=fake_responder, chat_latency=args.llm_latency)
+
+
+def make_search(args: argparse.Namespace, tmp: str, tag: str):
+    from memory.hybrid_search import BM25Strategy, EmbeddingStrategy, HybridSearch
+    from memory.vector_store import EmbeddingCache, FaissVectorStore
+    store = FaissVectorStore(client=fake_client(args), index_dir="",
+                             cache=EmbeddingCache(os.path.join(tmp, f"embeddings-{tag}.sqlite")))
+    return HybridSearch({"bm25": BM25Strategy(), "semantic": EmbeddingStrategy(store)})
+
+
+def make_model(args: argparse.Namespace):
+    from llm.model_manager import ModelManager
+    from llm.openai_model import OpenAIModel
+    return ModelManager(OpenAIModel("fake-model", client=fake_client(args), cache=False))
+
+
+def scenario_sandbox_setup(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from sandbox.workspace_pool import WorkspacePool
+    from sandbox.wsl_sandbox import WSLSandbox
+    pool = WorkspacePool(source=repo, size=1, base_dir=os.path.join(tmp, "pool"), prewarm=False)
+    sandbox = WSLSandbox(pool=pool)
+    try:
+        start = time.perf_counter()
+        with sandbox:
+            pass
+        cold = time.perf_counter() - start
+
+        def enter(i: int) -> None:
+            with sandbox as sb:
+                with open(os.path.join(sb.work_dir, "pkg_0", "module_0.py"), "a") as f:
+                    f.write(f"# edit {i}\n")
+        return summarize(timed(enter, args.iterations), cold=cold, strategy=pool.strategy)
+    finally:
+        pool.close()
+
+
+def scenario_hybrid_index(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from memory.semantic_indexer import SemanticIndexer
+
+    def index(i: int) -> None:
+        search = make_search(args, tmp, f"index-{i}")
+        search.index(SemanticIndexer(repo, cache_path="").iter_chunks())
+        index.chunks = len(search.docs)
+    index.chunks = 0
+    latencies = timed(index, args.index_runs)
+    return summarize(latencies, files=args.files, chunks=index.chunks)
+
+
+def scenario_hybrid_search(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from memory.semantic_indexer import SemanticIndexer
+    search = make_search(args, tmp, "search")
+    search.index(SemanticIndexer(repo, cache_path="").iter_chunks())
+    n = max(args.files, 1)
+    latencies = timed(lambda i: search.search(f"helper_{i * 7919 % n} scaled value", top_k=10),
+                      args.queries)
+    return summarize(latencies, chunks=len(search.docs))
+
+
+def scenario_tool_agent(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from agents.tool_agent import ToolAgent
+    from sandbox.workspace_pool import WorkspacePool
+    from sandbox.wsl_sandbox import WSLSandbox
+    from tools.registry import ToolRegistry
+    pool = WorkspacePool(source=repo, size=1, base_dir=os.path.join(tmp, "pool"))
+    agent = ToolAgent(make_model(args), ToolRegistry(), WSLSandbox(pool=pool))
+    n = max(args.files, 1)
+    failures = []
+
+    def run(i: int) -> None:
+        result = agent.run(f"search the repo for helper_{i * 7919 % n}")
+        if not result.get("success"):
+            failures.append(i)
+    try:
+        latencies = timed(run, args.iterations)
+    finally:
+        pool.close()
+    return summarize(latencies, failures=len(failures))
+
+
+def scenario_tool_batch(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from agents.tool_agent import ToolAgent
+    from sandbox.workspace_pool import WorkspacePool
+    from sandbox.wsl_sandbox import WSLSandbox
+    from tools.registry import ToolRegistry
+    pool = WorkspacePool(source=repo, size=2, base_dir=os.path.join(tmp, "pool"))
+    agent = ToolAgent(make_model(args), ToolRegistry(), WSLSandbox(pool=pool))
+    n = max(args.files, 1)
+    distinct = max(1, args.iterations * 3 // 4)
+    queries = [f"search the repo for helper_{i % distinct * 7919 % n}"
+               for i in range(args.iterations)]
+    latencies, failures, shared = [], 0, 0
+    try:
+        start = time.perf_counter()
+        for item in agent.run_batch(queries):
+            latencies.append(time.perf_counter() - start)
+            failures += not item["result"].get("success")
+            shared += bool(item.get("deduplicated"))
+        total = time.perf_counter() - start
+    finally:
+        pool.close()
+    return summarize(latencies, throughput=len(latencies) / total if total else 0.0,
+                     failures=failures, deduplicated=shared)
+
+
+def scenario_planner_agent(args: argparse.Namespace, repo: str, tmp: str) -> Dict[str, Any]:
+    from agents.planner_agent import PlannerAgent
+    from controller.task_graph import TaskGraph
+    from memory.semantic_indexer import SemanticIndexer
+    model = make_model(args)
+    indexer = SemanticIndexer(repo, cache_path=os.path.join(tmp, "semantic_index.pkl"))
+    memory = make_search(args, tmp, "planner")
+    n = max(args.files, 1)
+
+    def run(i: int) -> None:
+        planner = PlannerAgent(model, TaskGraph(), indexer, memory)
+        planner.run(f"analyze and refactor helper_{i * 7919 % n}")
+    latencies = timed(run, args.iterations)
+    # The first run indexes the repository from scratch; later runs are incremental.
+    return summarize(latencies[1:] or latencies, cold=latencies[0] if latencies else 0.0)
+
+
+def run_scenario(name: str, args: argparse.Namespace) -> Dict[str, Any]:
+    tmp = tempfile.mkdtemp(prefix="smallhands_harness_")
+    os.environ["SMALLHANDS_CACHE_DIR"] = os.path.join(tmp, "cache")
+    try:
+        repo = os.path.join(tmp, "repo")
+        make_tree(repo, args.files)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = globals()[f"scenario_{name}"](args, repo, tmp)
+        result["peak_rss_mb"] = peak_rss_mb()
+        return result
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def child_args(args: argparse.Namespace) -> List[str]:
+    return ["--files", str(args.files), "--iterations", str(args.iterations),
+            "--queries", str(args.queries), "--index-runs", str(args.index_runs),
+            "--dim", str(args.dim), "--llm-latency", str(args.llm_latency),
+            "--embed-latency", str(args.embed_latency)]
+
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return {
+        "commit": commit.stdout.strip() or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items()
+                 if k not in ("baseline", "save_baseline", "output", "child")},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            tolerance: float) -> List[Dict[str, Any]]:
+    """Per-metric ratios to the baseline, each flagged if worse than tolerance."""
+    rows = []
+    for name, result in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or "error" in result or "error" in base:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+            rows.append({"scenario": name, "metric": metric, "baseline": old, "current": new,
+                         "ratio": ratio, "regression": worse})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--files", type=int, default=500, help="synthetic repository size")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-runs", type=int, default=3)
+    parser.add_argument("--dim", type=int, default=256, help="fake embedding dimension")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="simulated seconds per chat completion")
+    parser.add_argument("--embed-latency", type=float, default=0.0,
+                        help="simulated seconds per embedding request")
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--save-baseline", help="also write the results here as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(args.child, args)))
+        return
+
+    results = {"meta": metadata(args), "scenarios": {}}
+    for name in args.scenarios.split(","):
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        print(f"running {name}...", file=sys.stderr)
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.harness", "--child", name,
+                               *child_args(args)], capture_output=True, text=True)
+        try:
+            results["scenarios"][name] = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            results["scenarios"][name] = {"error": proc.stderr.strip()[-2000:]}
+        r = results["scenarios"][name]
+        if "error" in r:
+            print(f"  failed: {r['error'].splitlines()[-1] if r['error'] else '?'}",
+                  file=sys.stderr)
+        else:
+            print(f"  {r['throughput']:10.1f} ops/s   p50 {r['p50'] * 1000:9.2f}ms   "
+                  f"p99 {r['p99'] * 1000:9.2f}ms   peak RSS {r['peak_rss_mb']:7.1f}MB",
+                  file=sys.stderr)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.tolerance)
+        results["comparison"] = rows
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"{row['scenario']:15} {row['metric']:12} {row['ratio']:6.2f}x {flag}",
+                  file=sys.stderr)
+        status = 1 if any(row["regression"] for row in rows) else 0
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Local mock of the OpenAI chat completions and embeddings endpoints.
+
+Serves /v1/chat/completions (plain and SSE streaming) and /v1/embeddings
+over HTTP/1.1 keep-alive, with configurable time-to-first-token and
+per-token delay, so client behaviour can be measured without the network.
+
+    with MockOpenAIServer(ttft=0.2, token_delay=0.01) as server:
+        client = LLMClient(api_key="test", base_url=server.base_url)
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm.fake_client import fake_embedding
+
+DEFAULT_REPLY = ('{"tool_name": "run_tests", "args": {}}\n\n'
+                 "I picked run_tests because the query asks to check the test suite. " * 3)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.requests += 1
+        if self.path.endswith("/embeddings"):
+            texts = request["input"]
+            texts = [texts] if isinstance(texts, str) else texts
+            time.sleep(server.ttft)
+            self._send_json({
+                "object": "list", "model": request["model"],
+                "data": [{"object": "embedding", "index": i,
+                          "embedding": fake_embedding(t, server.dim)}
+                         for i, t in enumerate(texts)],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            })
+            return
+
+        reply = server.reply
+        tokens = [reply[i:i + 4] for i in range(0, len(reply), 4)]
+        time.sleep(server.ttft)
+        if not request.get("stream"):
+            time.sleep(server.token_delay * max(0, len(tokens) - 1))
+            self._send_json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": reply}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": len(tokens),
+                          "total_tokens": 10 + len(tokens)},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(server.token_delay)
+                chunk = {
+                    "id": "chatcmpl-mock", "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": request["model"],
+                    "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading early (e.g. after the JSON object closed).
+            self.close_connection = True
+
+
+class MockOpenAIServer:
+    """
+    Threaded mock server on 127.0.0.1; use as a context manager.
+    - ttft: seconds before the first token (or the whole non-streamed reply)
+    - token_delay: seconds between streamed tokens of ~4 characters
+    """
+    def __init__(self, ttft: float = 0.2, token_delay: float = 0.01, reply: str = DEFAULT_REPLY,
+                 dim: int = 64, port: int = 0):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.ttft = ttft
+        self.httpd.token_delay = token_delay
+        self.httpd.reply = reply
+        self.httpd.dim = dim
+        self.httpd.requests = 0
+        self.httpd.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock_openai",
+                                        daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,8 +1,66 @@
 """State models for SmallHands."""
 
+import os
 import json
-from pydantic import BaseModel
-from typing import Any, Dict
+from pydantic import BaseModel, PrivateAttr
+from typing import Any, Dict, Iterable, Optional
+
+from .state_store import SECTIONS, StateStore, is_state_store
+
+DEFAULT_STATE_PATH = "state.db"
+_UNLOADED = object()
+
+
+class LazyResults(dict):
+    """
+    Results dict backed by a StateStore: values are decoded on first access,
+    so resuming a run does not deserialize every historical result.
+    """
+    def __init__(self, store: StateStore, node_ids: Iterable[str]):
+        super().__init__((node_id, _UNLOADED) for node_id in node_ids)
+        self._store = store
+
+    def __getitem__(self, key: str) -> Any:
+        value = super().__getitem__(key)
+        if value is _UNLOADED:
+            value = self._store.get_result(key)
+            super().__setitem__(key, value)
+        return value
+
+    def __iter__(self):
+        # Overriding __iter__ also keeps dict(lazy) off CPython's raw-copy fast path.
+        return super().__iter__()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            value = self[key]
+            super().pop(key)
+            return value
+        return super().pop(key, *default)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def load_all(self) -> None:
+        for key in self:
+            self[key]
+
+    @property
+    def loaded(self) -> int:
+        return sum(1 for value in super().values() if value is not _UNLOADED)
+
+    def __repr__(self) -> str:
+        return f"LazyResults({len(self)} results, {self.loaded} loaded)"
+
 
 class State(BaseModel):
     """
@@ -11,30 +69,84 @@ class State(BaseModel):
     - results: mapping of node_id to task result
     - environment: arbitrary context data
     - metadata: additional info (timestamps, logs)
+    Once saved to or loaded from a StateStore, the state stays bound to it:
+    mark_complete and add_metadata are journaled as they happen.
     """
     task_status: Dict[str, bool] = {}
     results: Dict[str, Any] = {}
     environment: Dict[str, Any] = {}
     metadata: Dict[str, Any] = {}
 
+    _store: Optional[StateStore] = PrivateAttr(default=None)
+
     def mark_complete(self, node_id: str, result: Any) -> None:
         self.task_status[node_id] = True
         self.results[node_id] = result
+        if self._store is not None:
+            self._store.mark_complete(node_id, result)
 
     def is_complete(self) -> bool:
         return all(self.task_status.values())
 
     def add_metadata(self, key: str, value: Any) -> None:
         self.metadata[key] = value
+        if self._store is not None:
+            self._store.set("metadata", key, value)
+
+    def _sections(self) -> Dict[str, Dict[str, Any]]:
+        return {section: getattr(self, section) for section in SECTIONS}
+
+    def model_dump(self, **kwargs: Any) -> Dict[str, Any]:
+        if isinstance(self.results, LazyResults):
+            self.results.load_all()
+        return super().model_dump(**kwargs)
+
+    def model_dump_json(self, **kwargs: Any) -> str:
+        if isinstance(self.results, LazyResults):
+            self.results.load_all()
+        return super().model_dump_json(**kwargs)
 
-    def save(self, path: str = "state.json") -> None:
-        """Saves the current state to a JSON file."""
-        with open(path, "w") as f:
-            f.write(self.model_dump_json(indent=4))
+    def save(self, path: str = None) -> None:
+        """
+        Saves the current state. A ".json" path gets a full JSON dump,
+        written atomically. Any other path (the default: the bound store,
+        else state.db) is a StateStore: the first save writes everything,
+        later ones only re-sync task_status, environment and metadata,
+        since results were journaled by mark_complete.
+        """
+        path = path or (self._store.path if self._store is not None else DEFAULT_STATE_PATH)
+        if path.endswith(".json"):
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(self.model_dump_json(indent=4))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+            return
+        bound = self._store is not None and (
+            os.path.abspath(self._store.path) == os.path.abspath(path))
+        if bound:
+            self._store.sync(self._sections())
+            return
+        store = StateStore(path)
+        # A fresh State saved over an older store must not inherit that run's results.
+        store.sync(self._sections(), results=dict(self.results.items()), replace_results=True)
+        self._store = store
 
     @classmethod
-    def load(cls, path: str = "state.json") -> "State":
-        """Loads the state from a JSON file."""
-        with open(path, "r") as f:
-            data = json.load(f)
-        return cls(**data)
+    def load(cls, path: str = DEFAULT_STATE_PATH) -> "State":
+        """
+        Loads the state from a StateStore (results are decoded lazily) or,
+        for files written by older versions, from a JSON file.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        if not is_state_store(path):
+            with open(path, "r") as f:
+                data = json.load(f)
+            return cls(**data)
+        store = StateStore(path)
+        sections = store.load_sections()
+        state = cls.model_construct(results=LazyResults(store, store.result_ids()), **sections)
+        state._store = store
+        return state
@@ -0,0 +1,119 @@
+"""Incremental, crash-safe persistence for controller.state.State."""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Tuple
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+SECTIONS = ("task_status", "environment", "metadata")
+
+
+def is_state_store(path: str) -> bool:
+    """True if path is a StateStore database (as opposed to a legacy JSON dump)."""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    except OSError:
+        return False
+
+
+class StateStore:
+    """
+    SQLite (WAL) journal of a State.
+    - every mark_complete / add_metadata is one small transaction, so the
+      cost of a save does not grow with the results already stored and a
+      crash loses at most the write in flight
+    - results are read back one node at a time (get_result), so resuming
+      does not decode every historical result
+    - checkpoint_every: writes between WAL checkpoints, which fold the
+      journal back into the main file and truncate it
+    """
+    def __init__(self, path: str, checkpoint_every: int = 256):
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only an OS crash may lose the last commits.
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " section TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " PRIMARY KEY (section, key));"
+            "CREATE TABLE IF NOT EXISTS results (node_id TEXT PRIMARY KEY, value TEXT NOT NULL);"
+        )
+
+    def _commit(self, statements: Iterable[Tuple[str, tuple]]) -> None:
+        with self._lock:
+            with self._conn:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+            self._writes += 1
+            if self._writes % self.checkpoint_every == 0:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    def _set(section: str, key: str, value: Any) -> Tuple[str, tuple]:
+        return ("INSERT OR REPLACE INTO entries (section, key, value) VALUES (?, ?, ?)",
+                (section, key, json.dumps(value, default=str)))
+
+    def mark_complete(self, node_id: str, result: Any) -> None:
+        self._commit([
+            self._set("task_status", node_id, True),
+            ("INSERT OR REPLACE INTO results (node_id, value) VALUES (?, ?)",
+             (node_id, json.dumps(result, default=str))),
+        ])
+
+    def set(self, section: str, key: str, value: Any) -> None:
+        self._commit([self._set(section, key, value)])
+
+    def sync(self, sections: Dict[str, Dict[str, Any]], results: Dict[str, Any] = None,
+             replace_results: bool = False) -> None:
+        """
+        Replaces the small sections wholesale and writes the given results,
+        in one transaction. Used for the first save of a State and for
+        changes made to its dicts directly rather than through its methods.
+        With replace_results, results already stored but not given are
+        dropped too, so the store holds exactly this State.
+        """
+        statements: List[Tuple[str, tuple]] = [("DELETE FROM entries", ())]
+        if replace_results:
+            statements.append(("DELETE FROM results", ()))
+        for section in SECTIONS:
+            statements.extend(self._set(section, k, v) for k, v in sections[section].items())
+        for node_id, result in (results or {}).items():
+            statements.append(("INSERT OR REPLACE INTO results (node_id, value) VALUES (?, ?)",
+                               (node_id, json.dumps(result, default=str))))
+        self._commit(statements)
+
+    def load_sections(self) -> Dict[str, Dict[str, Any]]:
+        sections: Dict[str, Dict[str, Any]] = {s: {} for s in SECTIONS}
+        with self._lock:
+            rows = self._conn.execute("SELECT section, key, value FROM entries").fetchall()
+        for section, key, value in rows:
+            sections.setdefault(section, {})[key] = json.loads(value)
+        return sections
+
+    def result_ids(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT node_id FROM results")]
+
+    def get_result(self, node_id: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE node_id = ?",
+                                     (node_id,)).fetchone()
+        if row is None:
+            raise KeyError(node_id)
+        return json.loads(row[0])
+
+    def checkpoint(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
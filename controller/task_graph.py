@@ -0,0 +1,273 @@
+"""Task graph engine for SmallHands."""
+
+import os
+import heapq
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from execution.local_executor import ThreadPoolLocalExecutor
+from observability.logger import record_span
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class TaskGraphError(ValueError):
+    """Raised for invalid graph edits: duplicate ids or dangling dependencies."""
+
+
+class CycleError(TaskGraphError):
+    """Raised when adding tasks would create a dependency cycle."""
+
+
+@dataclass
+class TaskNode:
+    """
+    A unit of work in the graph.
+    - task_fn: a zero-argument callable, or any payload (e.g. a task
+      description from the planner) that TaskGraph.run hands to its runner
+    - cost: estimated duration, used to find the critical path
+    - priority: cost of the longest path from this node to a sink
+    """
+    node_id: str
+    task_fn: Any
+    deps: List[str] = field(default_factory=list)
+    cost: float = 1.0
+    priority: float = 0.0
+    status: str = PENDING
+    result: Any = None
+    error: Optional[BaseException] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+class TaskGraph:
+    """
+    DAG of tasks with validation on insert and a concurrent scheduler.
+    Ready nodes are dispatched to an executor as soon as their last
+    dependency finishes, highest critical-path priority first.
+    """
+    def __init__(self):
+        self.nodes: Dict[str, TaskNode] = {}
+        self.dependents: Dict[str, List[str]] = {}
+        self.last_run: Dict[str, float] = {}
+
+    def add_task(self, node_id: str, task_fn: Any, deps: Iterable[str] = None,
+                 cost: float = 1.0) -> TaskNode:
+        """Adds one task; its dependencies must already be in the graph."""
+        return self.add_tasks([{"node_id": node_id, "task_fn": task_fn,
+                                "deps": list(deps or []), "cost": cost}])[0]
+
+    def add_tasks(self, tasks: Iterable[Dict[str, Any]]) -> List[TaskNode]:
+        """
+        Adds several tasks atomically. Dependencies may point at existing
+        nodes or at other tasks in the same batch, in any order. Nothing is
+        added if an id is duplicated, a dependency is unknown or the batch
+        would introduce a cycle.
+        """
+        batch = [
+            TaskNode(node_id=t["node_id"], task_fn=t["task_fn"],
+                     deps=list(dict.fromkeys(t.get("deps") or [])), cost=t.get("cost", 1.0))
+            for t in tasks
+        ]
+        new_ids = set()
+        for node in batch:
+            if node.node_id in self.nodes or node.node_id in new_ids:
+                raise TaskGraphError(f"Duplicate task id: {node.node_id}")
+            new_ids.add(node.node_id)
+        for node in batch:
+            dangling = [d for d in node.deps if d not in self.nodes and d not in new_ids]
+            if dangling:
+                raise TaskGraphError(f"Task '{node.node_id}' depends on unknown tasks: {dangling}")
+        self._check_acyclic(batch)
+
+        for node in batch:
+            self.nodes[node.node_id] = node
+            self.dependents.setdefault(node.node_id, [])
+            for dep in node.deps:
+                self.dependents.setdefault(dep, []).append(node.node_id)
+        self._update_priorities()
+        return batch
+
+    def _check_acyclic(self, batch: List[TaskNode]) -> None:
+        # Existing nodes cannot depend on new ones, so only the batch can form a cycle.
+        by_id = {node.node_id: node for node in batch}
+        indegree = {nid: sum(1 for d in node.deps if d in by_id) for nid, node in by_id.items()}
+        children: Dict[str, List[str]] = {nid: [] for nid in by_id}
+        for nid, node in by_id.items():
+            for dep in node.deps:
+                if dep in by_id:
+                    children[dep].append(nid)
+        queue = [nid for nid, deg in indegree.items() if deg == 0]
+        visited = 0
+        while queue:
+            nid = queue.pop()
+            visited += 1
+            for child in children[nid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        if visited != len(by_id):
+            cyclic = sorted(nid for nid, deg in indegree.items() if deg > 0)
+            raise CycleError(f"Dependency cycle among tasks: {cyclic}")
+
+    def topological_order(self) -> List[str]:
+        indegree = {nid: len(node.deps) for nid, node in self.nodes.items()}
+        queue = [nid for nid, deg in indegree.items() if deg == 0]
+        order = []
+        while queue:
+            nid = queue.pop()
+            order.append(nid)
+            for child in self.dependents.get(nid, []):
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+        return order
+
+    def _update_priorities(self) -> None:
+        for nid in reversed(self.topological_order()):
+            node = self.nodes[nid]
+            downstream = [self.nodes[c].priority for c in self.dependents.get(nid, [])]
+            node.priority = node.cost + max(downstream, default=0.0)
+
+    def critical_path(self) -> List[str]:
+        """Longest chain of tasks by total cost: the lower bound on makespan."""
+        roots = [n for n in self.nodes.values() if not n.deps]
+        if not roots:
+            return []
+        path = [max(roots, key=lambda n: n.priority).node_id]
+        while self.dependents.get(path[-1]):
+            path.append(max(self.dependents[path[-1]], key=lambda c: self.nodes[c].priority))
+        return path
+
+    def get_predecessors(self, node_id: str) -> List[str]:
+        return list(self.nodes[node_id].deps)
+
+    def mark_complete(self, node_id: str, result: Any = None) -> None:
+        node = self.nodes[node_id]
+        node.status = DONE
+        node.result = result
+
+    def ready_nodes(self) -> List[str]:
+        return [
+            nid for nid, node in self.nodes.items()
+            if node.status == PENDING and all(self.nodes[d].status == DONE for d in node.deps)
+        ]
+
+    def is_complete(self) -> bool:
+        return all(node.status == DONE for node in self.nodes.values())
+
+    def _skip_dependents(self, node_id: str) -> None:
+        stack = list(self.dependents.get(node_id, []))
+        while stack:
+            nid = stack.pop()
+            node = self.nodes[nid]
+            if node.status == PENDING:
+                node.status = SKIPPED
+                stack.extend(self.dependents.get(nid, []))
+
+    def run(self, executor: Any = None, runner: Callable[[str, Any], Any] = None,
+            max_parallel: int = None, fail_fast: bool = True, prioritize: bool = True,
+            state: Any = None) -> Dict[str, Any]:
+        """
+        Executes every pending node and returns {node_id: result}.
+        - executor: anything with submit() returning a concurrent Future
+          (e.g. an execution.BaseExecutor); a ThreadPoolLocalExecutor is
+          used if omitted
+        - runner: called as runner(node_id, task_fn) for non-callable task_fn
+        - fail_fast: stop dispatching new work after the first failure;
+          dependents of a failed node are always skipped
+        - state: optional controller.state.State; nodes it already marks
+          complete are not re-run and new results are recorded in it
+        """
+        if state is not None:
+            for nid, done in state.task_status.items():
+                if done and nid in self.nodes and self.nodes[nid].status == PENDING:
+                    self.mark_complete(nid, state.results.get(nid))
+
+        own_executor = executor is None
+        if max_parallel is None:
+            max_parallel = getattr(executor, "max_workers", None) or os.cpu_count() or 1
+        if own_executor:
+            executor = ThreadPoolLocalExecutor(max_workers=max_parallel)
+
+        waiting = {
+            nid: sum(1 for d in node.deps if self.nodes[d].status != DONE)
+            for nid, node in self.nodes.items() if node.status == PENDING
+        }
+        ready: List[tuple] = []
+        counter = 0
+        for nid, count in waiting.items():
+            if count == 0:
+                key = -self.nodes[nid].priority if prioritize else 0
+                heapq.heappush(ready, (key, counter, nid))
+                counter += 1
+
+        inflight: Dict[Any, str] = {}
+        failed = False
+        start = time.perf_counter()
+        busy = 0.0
+        try:
+            while ready or inflight:
+                while ready and len(inflight) < max_parallel and not (failed and fail_fast):
+                    _, _, nid = heapq.heappop(ready)
+                    node = self.nodes[nid]
+                    node.status = RUNNING
+                    node.started_at = time.perf_counter()
+                    if callable(node.task_fn):
+                        future = executor.submit(node.task_fn)
+                    elif runner is not None:
+                        future = executor.submit(runner, nid, node.task_fn)
+                    else:
+                        raise TaskGraphError(f"Task '{nid}' is not callable and no runner was given")
+                    inflight[future] = nid
+                if not inflight:
+                    break
+                done, _ = wait(list(inflight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    nid = inflight.pop(future)
+                    node = self.nodes[nid]
+                    node.finished_at = time.perf_counter()
+                    busy += node.finished_at - node.started_at
+                    try:
+                        node.result = future.result()
+                    except BaseException as e:
+                        record_span("scheduler.task", node.started_at, node.finished_at,
+                                    node=nid, status=FAILED)
+                        node.status = FAILED
+                        node.error = e
+                        failed = True
+                        print(f"Task '{nid}' failed: {e}")
+                        self._skip_dependents(nid)
+                        continue
+                    node.status = DONE
+                    record_span("scheduler.task", node.started_at, node.finished_at,
+                                node=nid, status=DONE)
+                    if state is not None:
+                        state.mark_complete(nid, node.result)
+                    for child in self.dependents.get(nid, []):
+                        if child not in waiting:
+                            continue
+                        waiting[child] -= 1
+                        if waiting[child] == 0 and self.nodes[child].status == PENDING:
+                            key = -self.nodes[child].priority if prioritize else 0
+                            heapq.heappush(ready, (key, counter, child))
+                            counter += 1
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        end = time.perf_counter()
+        makespan = end - start
+        record_span("scheduler.run", start, end, nodes=len(waiting), max_parallel=max_parallel)
+        self.last_run = {
+            "makespan": makespan,
+            "busy": busy,
+            "parallelism": busy / makespan if makespan else 0.0,
+        }
+        return {nid: node.result for nid, node in self.nodes.items() if node.status == DONE}
@@ -0,0 +1,157 @@
+"""
+Resident SmallHands server: keeps the agent warm between CLI calls.
+
+`python main.py --serve` builds the ToolAgent once (model clients and their
+connection pools, the completion cache, tool exemplars and a prewarmed
+sandbox pool) and answers queries on a Unix socket. Later
+`python main.py <query>` calls in the same directory send the query here
+instead of paying the cold start again.
+
+The protocol is one JSON object per line each way: {"query", "cwd"} in,
+{"result"} or {"error"} out. This module only uses the standard library
+(and paths.py), so a client pays nothing beyond the interpreter start.
+"""
+
+import os
+import json
+import signal
+import socket
+import threading
+import socketserver
+from typing import Any, Callable, Dict, Optional
+
+from paths import cache_path
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is serving this directory; the caller should run the query itself."""
+
+
+def socket_path() -> str:
+    return os.getenv("SMALLHANDS_DAEMON_SOCKET") or cache_path("daemon.sock")
+
+
+def _send(path: str, request: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("daemon closed the connection without replying")
+    return json.loads(line)
+
+
+def query(text: str, path: str = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Runs a query on the daemon and returns the tool result. Raises
+    DaemonUnavailable when no daemon listens on path or it serves another
+    directory, and RuntimeError for errors raised while answering.
+    """
+    path = path or socket_path()
+    if not os.path.exists(path):
+        raise DaemonUnavailable(path)
+    try:
+        reply = _send(path, {"query": text, "cwd": os.getcwd()}, timeout)
+    except (ConnectionRefusedError, FileNotFoundError) as e:
+        raise DaemonUnavailable(path) from e
+    if reply.get("unavailable"):
+        raise DaemonUnavailable(reply.get("error", path))
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply["result"]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                self._reply({"error": "malformed request"})
+                return
+            self._reply(self.server.daemon.answer(request))
+
+    def _reply(self, reply: Dict[str, Any]) -> None:
+        self.wfile.write(json.dumps(reply, default=str).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+class Daemon:
+    """
+    Serves queries with one long-lived handler.
+    - handler: called with the query text, returns a JSON-serializable result;
+      built once by the caller, so everything it holds stays warm
+    - path: Unix socket (SMALLHANDS_DAEMON_SOCKET, default
+      .smallhands/daemon.sock, so each project gets its own daemon)
+    - concurrent: let queries overlap; otherwise they are answered one at a
+      time, as the single-query agent expects
+    Only queries from the directory the daemon was started in are answered:
+    tools resolve paths against it.
+    """
+    def __init__(self, handler: Callable[[str], Any], path: str = None,
+                 concurrent: bool = False):
+        self.handler = handler
+        self.path = path or socket_path()
+        self.cwd = os.path.realpath(os.getcwd())
+        self.served = 0
+        self._lock = threading.Lock() if not concurrent else None
+        self._server: Optional[_Server] = None
+
+    def answer(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        cwd = request.get("cwd")
+        if cwd is not None and os.path.realpath(cwd) != self.cwd:
+            return {"unavailable": True, "error": f"daemon serves {self.cwd}"}
+        try:
+            if self._lock is None:
+                result = self.handler(request["query"])
+            else:
+                with self._lock:
+                    result = self.handler(request["query"])
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+        self.served += 1
+        return {"result": result}
+
+    def _bind(self) -> _Server:
+        if os.path.exists(self.path):
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                    probe.settimeout(1.0)
+                    probe.connect(self.path)
+            except OSError:
+                os.unlink(self.path)  # left behind by a daemon that did not shut down cleanly
+            else:
+                raise RuntimeError(f"A daemon is already listening on {self.path}")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        server = _Server(self.path, _Handler)
+        server.daemon = self
+        return server
+
+    def serve_forever(self) -> None:
+        self._server = self._bind()
+        print(f"SmallHands daemon serving {self.cwd} on {self.path}")
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, _interrupt)
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            print(f"Daemon stopped after {self.served} queries.")
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
@@ -11,3 +11,9 @@ class BaseExecutor(ABC):
     @abstractmethod
     def shutdown(self) -> None:
         ...
+
+    def __enter__(self) -> "BaseExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown()
@@ -0,0 +1,383 @@
+"""Local executors for SmallHands: thread pool, process pool and asyncio."""
+
+import asyncio
+import heapq
+import inspect
+import itertools
+import os
+import threading
+import time
+from abc import abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .base_executor import BaseExecutor
+
+
+class QueueFullError(RuntimeError):
+    """Raised by submit() when the executor queue stays full past queue_timeout."""
+
+
+@dataclass
+class ExecutorMetrics:
+    """
+    Counters for sizing pools.
+    - queue_depth: submitted tasks not yet given a worker slot
+    - wait: seconds between submit and start; run: seconds spent running
+    Each task ends up in exactly one of completed, failed, cancelled and
+    timed_out; wait and run cover the completed and failed ones.
+    """
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    timed_out: int = 0
+    pending: int = 0
+    queue_depth: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    total_run: float = 0.0
+    max_run: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_wait / finished if finished else 0.0
+
+    @property
+    def mean_run(self) -> float:
+        finished = self.completed + self.failed
+        return self.total_run / finished if finished else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        data = asdict(self)
+        data.update(mean_wait=self.mean_wait, mean_run=self.mean_run)
+        return data
+
+
+def _timed_call(fn: Callable[..., Any], args: tuple,
+                kwargs: dict) -> Tuple[bool, float, float, Any]:
+    """Runs fn in the worker and reports (ok, start, end, result or exception)."""
+    start = time.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except BaseException as e:
+        return False, start, time.monotonic(), e
+    return True, start, time.monotonic(), result
+
+
+class _Watchdog(threading.Thread):
+    """Single thread that expires task deadlines, instead of one timer per task."""
+    def __init__(self):
+        super().__init__(name="executor_watchdog", daemon=True)
+        self._cond = threading.Condition()
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._stopped = False
+
+    def schedule(self, deadline: float, callback: Callable[[], None]) -> None:
+        with self._cond:
+            heapq.heappush(self._heap, (deadline, next(self._seq), callback))
+            self._cond.notify()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and (
+                    not self._heap or self._heap[0][0] > time.monotonic()
+                ):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+                _, _, callback = heapq.heappop(self._heap)
+            callback()
+
+
+class _LocalExecutor(BaseExecutor):
+    """
+    Shared machinery for the local executors.
+    - max_workers: tasks running at once
+    - max_queue: tasks allowed to wait for a worker; submit() blocks (up to
+      queue_timeout) once max_workers + max_queue tasks are outstanding
+    - default_timeout: per-task deadline in seconds (None = unlimited)
+    submit() returns a concurrent Future that fails with TimeoutError at the
+    deadline and can be cancelled; the underlying work is cancelled too when
+    the backend allows it (queued work always, running coroutines in asyncio).
+    """
+    def __init__(self, max_workers: int = 4, max_queue: int = 64,
+                 default_timeout: Optional[float] = None,
+                 queue_timeout: Optional[float] = None):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.queue_timeout = queue_timeout
+        self.metrics = ExecutorMetrics()
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._watchdog: Optional[_Watchdog] = None
+
+    @abstractmethod
+    def _dispatch(self, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future:
+        """Starts _timed_call(fn, args, kwargs) on the backend; returns its Future."""
+        ...
+
+    @abstractmethod
+    def _shutdown_backend(self, wait: bool, cancel_pending: bool) -> None:
+        ...
+
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+        return self.submit_with_timeout(self.default_timeout, fn, *args, **kwargs)
+
+    def submit_with_timeout(self, timeout: Optional[float], fn: Callable[..., Any],
+                            *args: Any, **kwargs: Any) -> Future:
+        if self._closed:
+            raise RuntimeError("Cannot submit to an executor that has been shut down")
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise QueueFullError(
+                f"{self.max_workers + self.max_queue} tasks outstanding; queue is full"
+            )
+        submitted_at = time.monotonic()
+        with self._lock:
+            self.metrics.submitted += 1
+            self.metrics.pending += 1
+            self.metrics.queue_depth = max(0, self.metrics.pending - self.max_workers)
+
+        outer: Future = Future()
+        # Set by whichever of the worker and the watchdog decides the outcome first.
+        outcome = {"decided": False}
+        try:
+            inner = self._dispatch(fn, args, kwargs)
+        except BaseException:
+            self._finish(None, submitted_at, None)
+            raise
+        inner.add_done_callback(partial(self._on_inner_done, outer, submitted_at, outcome))
+        outer.add_done_callback(partial(self._on_outer_done, inner))
+        if timeout is not None:
+            self._ensure_watchdog().schedule(
+                submitted_at + timeout, partial(self._expire, outer, inner, timeout, outcome)
+            )
+        return outer
+
+    def _ensure_watchdog(self) -> _Watchdog:
+        with self._lock:
+            if self._watchdog is None:
+                self._watchdog = _Watchdog()
+                self._watchdog.start()
+            return self._watchdog
+
+    def _finish(self, ok: Optional[bool], submitted_at: float,
+                timing: Optional[Tuple[float, float]]) -> None:
+        with self._lock:
+            m = self.metrics
+            m.pending -= 1
+            m.queue_depth = max(0, m.pending - self.max_workers)
+            if ok is True:
+                m.completed += 1
+            elif ok is False:
+                m.failed += 1
+            if timing is not None:
+                start, end = timing
+                wait, run = max(0.0, start - submitted_at), end - start
+                m.total_wait += wait
+                m.max_wait = max(m.max_wait, wait)
+                m.total_run += run
+                m.max_run = max(m.max_run, run)
+        self._slots.release()
+
+    def _decide(self, outcome: dict) -> bool:
+        with self._lock:
+            first = not outcome["decided"]
+            outcome["decided"] = True
+            return first
+
+    def _on_inner_done(self, outer: Future, submitted_at: float, outcome: dict,
+                       inner: Future) -> None:
+        # A task that already timed out or was cancelled is not also counted as finished.
+        if not self._decide(outcome) or outer.cancelled():
+            self._finish(None, submitted_at, None)
+            return
+        if inner.cancelled():
+            self._finish(None, submitted_at, None)
+            if not outer.done():
+                outer.cancel()
+            return
+        try:
+            ok, start, end, value = inner.result()
+        except BaseException as e:
+            # The backend itself failed (e.g. a broken process pool or unpicklable task).
+            self._finish(False, submitted_at, None)
+            self._settle(outer, exception=e)
+            return
+        self._finish(ok, submitted_at, (start, end))
+        if ok:
+            self._settle(outer, result=value)
+        else:
+            self._settle(outer, exception=value)
+
+    @staticmethod
+    def _settle(outer: Future, result: Any = None, exception: BaseException = None) -> None:
+        if outer.done():
+            return
+        try:
+            if exception is not None:
+                outer.set_exception(exception)
+            else:
+                outer.set_result(result)
+        except Exception:
+            # Lost a race with cancel() or the watchdog; the outcome is already set.
+            pass
+
+    def _on_outer_done(self, inner: Future, outer: Future) -> None:
+        if outer.cancelled():
+            with self._lock:
+                self.metrics.cancelled += 1
+            inner.cancel()
+
+    def _expire(self, outer: Future, inner: Future, timeout: float, outcome: dict) -> None:
+        if outer.done() or not self._decide(outcome):
+            return
+        with self._lock:
+            self.metrics.timed_out += 1
+        self._settle(outer, exception=FutureTimeout(f"Task exceeded its {timeout}s timeout"))
+        inner.cancel()
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """
+        Stops accepting work. With wait=True, in-flight and queued tasks are
+        drained first; cancel_pending=True drops tasks that have not started.
+        """
+        self._closed = True
+        self._shutdown_backend(wait, cancel_pending)
+        with self._lock:
+            watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.stop()
+
+
+class ThreadPoolLocalExecutor(_LocalExecutor):
+    """Threads: suited to I/O-bound work such as LLM calls and tool subprocesses."""
+    def __init__(self, max_workers: int = 8, **kwargs: Any):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="local_executor")
+
+    def _dispatch(self, fn, args, kwargs) -> Future:
+        return self._pool.submit(_timed_call, fn, args, kwargs)
+
+    def _shutdown_backend(self, wait: bool, cancel_pending: bool) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+class ProcessPoolLocalExecutor(_LocalExecutor):
+    """
+    Processes: suited to CPU-bound work such as indexing. Functions and
+    arguments must be picklable. A running task cannot be interrupted; on
+    timeout its Future fails but the worker finishes the task.
+    """
+    def __init__(self, max_workers: int = None, **kwargs: Any):
+        max_workers = max_workers or os.cpu_count() or 1
+        super().__init__(max_workers=max_workers, **kwargs)
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+
+    def _dispatch(self, fn, args, kwargs) -> Future:
+        return self._pool.submit(_timed_call, fn, args, kwargs)
+
+    def _shutdown_backend(self, wait: bool, cancel_pending: bool) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+class AsyncioLocalExecutor(_LocalExecutor):
+    """
+    Event loop on a background thread. Coroutine functions run on the loop,
+    bounded by an asyncio.Semaphore, and are truly cancelled on timeout or
+    cancel(); plain functions run in the loop's default thread pool.
+    """
+    def __init__(self, max_workers: int = 32, **kwargs: Any):
+        super().__init__(max_workers=max_workers, **kwargs)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._serve, name="asyncio_executor",
+                                        daemon=True)
+        self._thread.start()
+        self._semaphore = asyncio.run_coroutine_threadsafe(
+            self._make_semaphore(), self._loop
+        ).result()
+        # Loop-side bookkeeping, only touched from the loop thread.
+        self._tasks: set = set()
+        self._started: set = set()
+
+    def _serve(self) -> None:
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+    async def _make_semaphore(self) -> asyncio.Semaphore:
+        return asyncio.Semaphore(self.max_workers)
+
+    async def _run(self, fn, args, kwargs) -> Tuple[bool, float, float, Any]:
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            return await self._run_bounded(task, fn, args, kwargs)
+        finally:
+            self._tasks.discard(task)
+            self._started.discard(task)
+
+    async def _run_bounded(self, task, fn, args, kwargs) -> Tuple[bool, float, float, Any]:
+        async with self._semaphore:
+            self._started.add(task)
+            start = time.monotonic()
+            try:
+                if inspect.iscoroutinefunction(fn):
+                    result = await fn(*args, **kwargs)
+                else:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(None, partial(fn, *args, **kwargs))
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                return False, start, time.monotonic(), e
+            return True, start, time.monotonic(), result
+
+    def _dispatch(self, fn, args, kwargs) -> Future:
+        return asyncio.run_coroutine_threadsafe(self._run(fn, args, kwargs), self._loop)
+
+    async def _drain(self, cancel_pending: bool) -> None:
+        """Lets every task finish (timed-out ones included), then stops the loop."""
+        if cancel_pending:
+            for task in self._tasks - self._started:
+                task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._loop.shutdown_default_executor()
+        self._loop.stop()
+
+    def _shutdown_backend(self, wait: bool, cancel_pending: bool) -> None:
+        # The loop closes itself once _drain stops it (see _serve).
+        asyncio.run_coroutine_threadsafe(self._drain(cancel_pending), self._loop)
+        if wait:
+            self._thread.join()
+
+
+EXECUTORS = {
+    "thread": ThreadPoolLocalExecutor,
+    "process": ProcessPoolLocalExecutor,
+    "asyncio": AsyncioLocalExecutor,
+}
+
+
+def create_executor(kind: str = "thread", **kwargs: Any) -> _LocalExecutor:
+    """Builds a local executor by name: "thread", "process" or "asyncio"."""
+    try:
+        return EXECUTORS[kind](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown executor kind: {kind}") from None
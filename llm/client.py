@@ -0,0 +1,277 @@
+"""Shared, connection-pooled OpenAI client with retries and a concurrency limit."""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# openai (and httpx under it) take most of a second to import, so they are
+# imported when the first real client is built, not with this module.
+RETRYABLE_ERROR_NAMES = ("RateLimitError", "APIConnectionError", "APITimeoutError",
+                         "InternalServerError")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits, timeouts, connection and 5xx errors raised by openai."""
+    openai = sys.modules.get("openai")
+    if openai is None:
+        # Nothing imported openai, so nothing could have raised one of its errors.
+        return False
+    return isinstance(error, tuple(getattr(openai, name) for name in RETRYABLE_ERROR_NAMES))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After header), if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if name == "retry-after-ms" else seconds
+    return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 20.0,
+                  error: BaseException = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the server's Retry-After."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    hinted = retry_after(error) if error is not None else None
+    return max(delay, min(hinted, cap)) if hinted is not None else delay
+
+
+class LLMClient:
+    """
+    One OpenAI client per process, shared by every model and the vector store.
+    - max_connections / max_keepalive: HTTP connection pool size; pooled
+      keep-alive connections skip the TCP and TLS handshake per request
+    - max_concurrency: requests in flight at once, across threads (sync) or
+      per event loop (async); excess callers wait instead of triggering 429s
+    - max_retries: attempts after a rate limit, timeout, connection or 5xx
+      error, with jittered exponential backoff honouring Retry-After
+    - client / async_client: pre-built clients to use instead, e.g.
+      llm.fake_client.FakeOpenAIClient; with only a sync client, async calls
+      run it on a worker thread
+    Streams are retried only until the first chunk arrives. Nothing touches
+    openai or the network until the first request.
+    """
+    def __init__(self, api_key: str = None, base_url: str = None, max_connections: int = 64,
+                 max_keepalive: int = 32, max_concurrency: int = 16, max_retries: int = 5,
+                 timeout: float = 60.0, backoff_base: float = 0.5, backoff_cap: float = 20.0,
+                 client: Any = None, async_client: Any = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL")
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._client = client
+        self._limits = None
+        self._async_override = async_client
+        self._sync_only = client is not None and async_client is None
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {"requests": 0, "retries": 0, "failures": 0}
+
+    @property
+    def limits(self) -> Any:
+        if self._limits is None:
+            import httpx
+            self._limits = httpx.Limits(max_connections=self.max_connections,
+                                        max_keepalive_connections=self.max_keepalive)
+        return self._limits
+
+    @property
+    def sync(self) -> Any:
+        """The pooled synchronous client (exposes .chat, .embeddings, ...)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import openai
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                        timeout=self.timeout,
+                        http_client=openai.DefaultHttpxClient(limits=self.limits),
+                    )
+        return self._client
+
+    def _async_state(self):
+        """(client, semaphore) for the running event loop; async clients are loop-bound."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._async_clients.get(loop)
+            if state is None:
+                client = None if self._sync_only else self._async_override
+                if client is None and not self._sync_only:
+                    import openai
+                    client = openai.AsyncOpenAI(
+                        api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                        timeout=self.timeout,
+                        http_client=openai.DefaultAsyncHttpxClient(limits=self.limits),
+                    )
+                state = (client, asyncio.Semaphore(self.max_concurrency))
+                self._async_clients[loop] = state
+        return state
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def _should_retry(self, attempt: int, error: BaseException) -> bool:
+        if not is_retryable(error) or attempt >= self.max_retries:
+            self._count("failures")
+            return False
+        self._count("retries")
+        return True
+
+    def _delay(self, attempt: int, error: BaseException) -> float:
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap, error)
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        """Runs one API call under the concurrency limit, retrying transient errors."""
+        attempt = 0
+        while True:
+            self._count("requests")
+            with self._slots:
+                try:
+                    return fn()
+                except BaseException as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    error = e
+            time.sleep(self._delay(attempt, error))
+            attempt += 1
+
+    def create(self, **kwargs: Any) -> Any:
+        """chat.completions.create with pooling, limiting and retries."""
+        return self.call(lambda: self.sync.chat.completions.create(**kwargs))
+
+    def stream(self, finish: Dict[str, Any] = None, **kwargs: Any) -> Iterator[str]:
+        """
+        Yields content deltas of a streamed chat completion. finish, if given,
+        receives the reply's finish_reason under "reason".
+        """
+        attempt = 0
+        while True:
+            self._count("requests")
+            with self._slots:
+                try:
+                    response = self.sync.chat.completions.create(stream=True, **kwargs)
+                    chunks = iter(response)
+                    first = next(chunks, None)
+                except BaseException as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    error = e
+                else:
+                    try:
+                        for chunk in ([first] if first is not None else []):
+                            yield from _deltas(chunk, finish)
+                        for chunk in chunks:
+                            yield from _deltas(chunk, finish)
+                    finally:
+                        # Releases the connection when the caller stops early.
+                        close = getattr(response, "close", None)
+                        if close is not None:
+                            close()
+                    return
+            time.sleep(self._delay(attempt, error))
+            attempt += 1
+
+    async def acreate(self, **kwargs: Any) -> Any:
+        client, slots = self._async_state()
+        attempt = 0
+        while True:
+            self._count("requests")
+            async with slots:
+                try:
+                    if client is None:
+                        return await asyncio.to_thread(self.sync.chat.completions.create, **kwargs)
+                    return await client.chat.completions.create(**kwargs)
+                except BaseException as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    error = e
+            await asyncio.sleep(self._delay(attempt, error))
+            attempt += 1
+
+    async def astream(self, finish: Dict[str, Any] = None, **kwargs: Any) -> AsyncIterator[str]:
+        client, slots = self._async_state()
+        if client is None:
+            deltas = self.stream(finish, **kwargs)
+            try:
+                while True:
+                    delta = await asyncio.to_thread(next, deltas, None)
+                    if delta is None:
+                        return
+                    yield delta
+            finally:
+                deltas.close()
+        attempt = 0
+        while True:
+            self._count("requests")
+            async with slots:
+                try:
+                    response = await client.chat.completions.create(stream=True, **kwargs)
+                    chunks = response.__aiter__()
+                    try:
+                        first = await chunks.__anext__()
+                    except StopAsyncIteration:
+                        first = None
+                except BaseException as e:
+                    if not self._should_retry(attempt, e):
+                        raise
+                    error = e
+                else:
+                    try:
+                        if first is not None:
+                            for delta in _deltas(first, finish):
+                                yield delta
+                        async for chunk in chunks:
+                            for delta in _deltas(chunk, finish):
+                                yield delta
+                    finally:
+                        close = getattr(response, "close", None)
+                        if close is not None:
+                            await close()
+                    return
+            await asyncio.sleep(self._delay(attempt, error))
+            attempt += 1
+
+
+def _deltas(chunk: Any, finish: Dict[str, Any] = None) -> Iterator[str]:
+    for choice in getattr(chunk, "choices", None) or []:
+        if finish is not None and getattr(choice, "finish_reason", None):
+            finish["reason"] = choice.finish_reason
+        content = getattr(choice.delta, "content", None)
+        if content:
+            yield content
+
+
+_shared: Optional[LLMClient] = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> LLMClient:
+    """The process-wide LLMClient, created on first use from the environment."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = LLMClient(
+                    max_connections=int(os.getenv("SMALLHANDS_MAX_CONNECTIONS", "64")),
+                    max_concurrency=int(os.getenv("SMALLHANDS_MAX_CONCURRENCY", "16")),
+                )
+    return _shared
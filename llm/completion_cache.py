@@ -0,0 +1,234 @@
+"""Content-addressed cache for chat completions."""
+
+import os
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from paths import cache_path
+
+
+def completion_key(model: str, messages: List[Dict[str, Any]],
+                   params: Dict[str, Any] = None) -> str:
+    """Cache key: model, messages and request parameters in canonical JSON."""
+    payload = json.dumps({"model": model, "messages": messages, "params": params or {}},
+                         sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Two-tier completion cache with in-flight request coalescing.
+    - max_memory_entries: size of the in-process LRU tier
+    - path: SQLite file for the persistent tier (":memory:" or "" to skip it)
+    - max_disk_entries: oldest rows are evicted beyond this count
+    - ttl: seconds an entry stays valid (None = forever)
+    Each entry remembers how long the original call took, so hits report the
+    latency they saved. The SQLite tier is pruned every `evict_every` writes.
+    """
+    def __init__(self, path: str = None, max_memory_entries: int = 1024,
+                 max_disk_entries: int = 50_000, ttl: Optional[float] = 7 * 24 * 3600,
+                 evict_every: int = 256):
+        if path is None:
+            path = cache_path("completions.sqlite")
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self._writes = 0
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        if self.path:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, latency REAL NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS completions_created "
+                               "ON completions (created)")
+        self.stats: Dict[str, float] = {
+            "memory_hits": 0, "disk_hits": 0, "coalesced": 0, "misses": 0,
+            "saved_latency": 0.0, "api_latency": 0.0,
+        }
+
+    @property
+    def hit_rate(self) -> float:
+        s = self.stats
+        hits = s["memory_hits"] + s["disk_hits"] + s["coalesced"]
+        total = hits + s["misses"]
+        return hits / total if total else 0.0
+
+    def _fresh(self, created: float) -> bool:
+        return self.ttl is None or time.time() - created < self.ttl
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for key, or None. Counts a hit but not a miss."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._fresh(entry[2]):
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    self.stats["saved_latency"] += entry[1]
+                    return entry[0]
+                del self._memory[key]
+        if self._conn is None:
+            return None
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or not self._fresh(row[2]):
+            return None
+        with self._lock:
+            self._remember(key, row)
+            self.stats["disk_hits"] += 1
+            self.stats["saved_latency"] += row[1]
+        return row[0]
+
+    def put(self, key: str, response: str, latency: float = 0.0) -> None:
+        entry = (response, latency, time.time())
+        with self._lock:
+            self._remember(key, entry)
+        if self._conn is None:
+            return
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, response, latency, created) "
+                "VALUES (?, ?, ?, ?)", (key, *entry)
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def discard(self, key: str) -> None:
+        """Forgets key, e.g. because its response turned out to be unusable."""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._conn is None:
+            return
+        with self._db_lock:
+            self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """The in-flight Future for key, and whether the caller must compute it."""
+        with self._lock:
+            pending = self._inflight.get(key)
+            if pending is not None:
+                self.stats["coalesced"] += 1
+                return pending, False
+            pending = self._inflight[key] = Future()
+            return pending, True
+
+    def _settle(self, key: str, pending: Future, response: str = None, latency: float = 0.0,
+                error: BaseException = None, store: bool = True) -> None:
+        if error is None and store and response is not None:
+            self.put(key, response, latency)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is None:
+                self.stats["misses"] += 1
+                self.stats["api_latency"] += latency
+        if error is None:
+            pending.set_result(response)
+        else:
+            pending.set_exception(error)
+
+    def get_or_compute(self, key: str, compute: Callable[[], str],
+                       store: Callable[[str], bool] = None) -> str:
+        """
+        Returns the cached response or calls compute() once. Concurrent
+        callers with the same key wait for the first caller's result.
+        A computed response is only kept if store(response) is true.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        pending, owner = self._claim(key)
+        if not owner:
+            return pending.result()
+        start = time.perf_counter()
+        try:
+            response = compute()
+        except BaseException as e:
+            self._settle(key, pending, error=e)
+            raise
+        self._settle(key, pending, response, time.perf_counter() - start,
+                     store=store is None or store(response))
+        return response
+
+    async def aget_or_compute(self, key: str, compute: Callable[[], Awaitable[str]],
+                              store: Callable[[str], bool] = None) -> str:
+        """
+        Async get_or_compute; coalesces with sync and async callers alike.
+        The SQLite tier is read and written in a worker thread.
+        """
+        cached = await asyncio.to_thread(self.get, key)
+        if cached is not None:
+            return cached
+        pending, owner = self._claim(key)
+        if not owner:
+            return await asyncio.wrap_future(pending)
+        start = time.perf_counter()
+        try:
+            response = await compute()
+        except BaseException as e:
+            self._settle(key, pending, error=e)
+            raise
+        await asyncio.to_thread(self._settle, key, pending, response,
+                                time.perf_counter() - start,
+                                store=store is None or store(response))
+        return response
+
+    def evict(self) -> int:
+        """Drops expired rows and trims the SQLite tier to max_disk_entries."""
+        if self._conn is None:
+            return 0
+        with self._db_lock:
+            removed = 0
+            if self.ttl is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM completions WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM completions WHERE key IN (SELECT key FROM completions "
+                "ORDER BY created DESC LIMIT -1 OFFSET ?)", (self.max_disk_entries,)
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.execute("DELETE FROM completions")
+                self._conn.commit()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._db_lock:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,108 @@
+"""Deterministic offline stand-ins for the OpenAI client."""
+
+import hashlib
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+
+def fake_embedding(text: str, dim: int) -> List[float]:
+    """Returns a unit-length vector derived only from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    vec /= np.linalg.norm(vec)
+    return vec.tolist()
+
+
+class FakeEmbeddings:
+    """Mimics `client.embeddings.create` with a configurable round-trip latency."""
+    def __init__(self, dim: int = 1536, latency: float = 0.05, per_input_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_input_latency = per_input_latency
+        self.calls = 0
+        self.inputs = 0
+        self._lock = threading.Lock()
+
+    def create(self, input: Union[str, List[str]], model: str, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        with self._lock:
+            self.calls += 1
+            self.inputs += len(texts)
+        time.sleep(self.latency + self.per_input_latency * len(texts))
+        data = [
+            SimpleNamespace(object="embedding", index=i, embedding=fake_embedding(text, self.dim))
+            for i, text in enumerate(texts)
+        ]
+        tokens = sum(len(text) // 4 + 1 for text in texts)
+        return SimpleNamespace(
+            data=data,
+            model=model,
+            usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens),
+        )
+
+
+def echo_responder(messages: List[Dict[str, Any]], model: str) -> str:
+    """Default fake reply: a deterministic digest of the last user message."""
+    prompt = messages[-1]["content"] if messages else ""
+    digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()[:12]
+    return f"[{model}:{digest}] {prompt[:80]}"
+
+
+class FakeChatCompletions:
+    """
+    Mimics `client.chat.completions.create`.
+    - responder: maps (messages, model) to the reply text
+    - latency: seconds slept per call, standing in for the round trip; with
+      stream=True it is the time to the first chunk
+    - token_latency: seconds between streamed chunks (about 4 characters each)
+    """
+    def __init__(self, responder: Callable[[List[Dict[str, Any]], str], str] = None,
+                 latency: float = 0.2, token_latency: float = 0.0):
+        self.responder = responder or echo_responder
+        self.latency = latency
+        self.token_latency = token_latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _stream(self, content: str):
+        for i in range(0, len(content), 4):
+            if i:
+                time.sleep(self.token_latency)
+            delta = SimpleNamespace(role="assistant", content=content[i:i + 4])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta,
+                                                           finish_reason=None)])
+        # Like the API, the last chunk carries no content, only the finish reason.
+        yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=None),
+                                                       finish_reason="stop")])
+
+    def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        content = self.responder(messages, model)
+        if stream:
+            return self._stream(content)
+        prompt_tokens = sum(len(str(m.get("content", ""))) // 4 + 1 for m in messages)
+        completion_tokens = len(content) // 4 + 1
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                     message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens),
+        )
+
+
+class FakeOpenAIClient:
+    """Drop-in replacement for `openai.Client` that never touches the network."""
+    def __init__(self, dim: int = 1536, latency: float = 0.05, per_input_latency: float = 0.0,
+                 responder: Callable[[List[Dict[str, Any]], str], str] = None,
+                 chat_latency: float = 0.2, token_latency: float = 0.0):
+        self.embeddings = FakeEmbeddings(dim, latency, per_input_latency)
+        self.chat = SimpleNamespace(
+            completions=FakeChatCompletions(responder, chat_latency, token_latency)
+        )
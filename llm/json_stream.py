@@ -0,0 +1,91 @@
+"""Incremental extraction of the first JSON object from streamed model output."""
+
+import json
+from typing import Any, Dict, Iterable, Optional
+
+
+class JSONObjectScanner:
+    """
+    Tracks brace depth (ignoring braces inside strings) across feed() calls
+    and returns the first top-level {...} as soon as it closes. Text before
+    the object, such as a markdown fence, is skipped.
+    """
+    def __init__(self):
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> Optional[str]:
+        """Consumes the next delta; returns the object text once it is complete."""
+        start = 0
+        if self._depth == 0:
+            start = text.find("{")
+            if start < 0:
+                return None
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[start:i + 1])
+                    return "".join(self._parts)
+        self._parts.append(text[start:])
+        return None
+
+
+def first_json_object(deltas: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parses the first JSON object in a stream of text deltas, without waiting
+    for the rest of the stream (which is closed early). Returns None if the
+    stream ends first or the object is not valid JSON.
+    """
+    scanner = JSONObjectScanner()
+    try:
+        for delta in deltas:
+            text = scanner.feed(delta)
+            if text is not None:
+                try:
+                    return json.loads(text)
+                except json.JSONDecodeError:
+                    return None
+        return None
+    finally:
+        close = getattr(deltas, "close", None)
+        if close is not None:
+            close()
+
+
+def parse_json(text: str) -> Any:
+    """
+    Parses a model reply that should be JSON: tolerates markdown fences and
+    prose around the value by falling back to the outermost [...] or {...}.
+    Raises ValueError if nothing parses.
+    """
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    spans = [(text.find(o), text.rfind(c)) for o, c in (("[", "]"), ("{", "}"))]
+    # Try the value that opens first, so a list nested in an object is not picked alone.
+    for start, end in sorted(span for span in spans if 0 <= span[0] < span[1]):
+        try:
+            return json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("Model reply is not valid JSON")
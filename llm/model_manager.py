@@ -1,13 +1,302 @@
 """
 LLM model manager for SmallHands.
 """
-from .openai_model import OpenAIModel
+import os
+import json
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from observability.logger import log, span
+from .json_stream import JSONObjectScanner, parse_json
+from .openai_model import Completion, OpenAIModel
+
+
+@dataclass
+class RouteStats:
+    """
+    Counters for one (route, tier) pair: `requests` served by the tier, and
+    `calls` made to the API for them (more than one with self-consistency).
+    """
+    requests: int = 0
+    calls: int = 0
+    invalid: int = 0
+    low_confidence: int = 0
+    escalations: int = 0
+    cached: int = 0
+    latency: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.escalations / self.requests if self.requests else 0.0
+
+    @property
+    def mean_latency(self) -> float:
+        return self.latency / self.calls if self.calls else 0.0
+
+    def snapshot(self) -> Dict[str, float]:
+        data = asdict(self)
+        data.update(escalation_rate=self.escalation_rate, mean_latency=self.mean_latency)
+        return data
+
+
+@dataclass
+class Route:
+    """
+    How one kind of request is served.
+    - tiers: model tiers to try in order; later tiers are escalations
+    - samples: self-consistency samples per tier (1 = a single call)
+    - min_confidence: vote share the winning answer needs; below it the
+      request escalates to the next tier
+    - stream: with one sample, read the reply only up to the end of its
+      first JSON object
+    - sample_params: extra request parameters for self-consistency samples;
+      each sample also gets its own seed, and models that reject a
+      parameter (temperature on o-series models) are sent it without
+    """
+    tiers: List[str]
+    samples: int = 1
+    min_confidence: float = 0.5
+    stream: bool = False
+    sample_params: Dict[str, Any] = field(default_factory=lambda: {"temperature": 0.7})
+
+
+_INVALID = object()
+
+DEFAULT_ROUTES = {
+    "tool_selection": Route(["small", "large"], stream=True),
+    "planning": Route(["small", "large"], samples=3),
+    "codegen": Route(["large"]),
+    "default": Route(["small", "large"]),
+}
+
 
 class ModelManager:
-    """A simple wrapper for a single language model."""
-    def __init__(self, model: OpenAIModel):
-        self.model = model
+    """
+    Routes requests across model tiers with cascades and self-consistency.
+    - models: tier name -> OpenAIModel; a single model serves every tier
+    - routes: request kind -> Route (see DEFAULT_ROUTES)
+    - prices: tier -> (USD per 1k prompt tokens, USD per 1k completion tokens)
+    - skip_after / skip_rate: once a tier has served skip_after requests on
+      a route and escalated more than skip_rate of them, the route starts at
+      the next tier, since paying for both is slower and dearer than the
+      large model alone; every probe_every-th call still tries the cheap
+      tier so the route can move back when it improves
+    Cached replies are free and are not counted as latency.
+    """
+    def __init__(self, model: OpenAIModel = None, models: Dict[str, OpenAIModel] = None,
+                 routes: Dict[str, Route] = None, prices: Dict[str, Tuple[float, float]] = None,
+                 max_workers: int = 8, skip_after: int = 20, skip_rate: float = 0.5,
+                 probe_every: int = 10):
+        if models is None:
+            if model is None:
+                raise ValueError("ModelManager needs a model or a models mapping")
+            models = {"small": model, "large": model}
+        self.models = models
+        self.model = model or models.get("large") or next(iter(models.values()))
+        self.routes = dict(DEFAULT_ROUTES, **(routes or {}))
+        self.prices = prices or {}
+        self.max_workers = max_workers
+        self.skip_after = skip_after
+        self.skip_rate = skip_rate
+        self.probe_every = probe_every
+        self.stats: Dict[Tuple[str, str], RouteStats] = {}
+        self._requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> "ModelManager":
+        """Small/large tiers from SMALLHANDS_SMALL_MODEL / SMALLHANDS_LARGE_MODEL."""
+        large = os.getenv("SMALLHANDS_LARGE_MODEL", os.getenv("OPENAI_MODEL", "o4-mini"))
+        small = os.getenv("SMALLHANDS_SMALL_MODEL", large)
+        large_model = OpenAIModel(large)
+        small_model = large_model if small == large else OpenAIModel(small)
+        return cls(models={"small": small_model, "large": large_model}, **kwargs)
+
+    def generate(self, prompt: str, route: str = "default") -> str:
+        """Generates a response from the first tier of the route."""
+        tier = self._tiers(route)[0]
+        with self._lock:
+            self.stats.setdefault((route, tier), RouteStats()).requests += 1
+        return self._call(route, tier, prompt).text
+
+    def _tiers(self, route: str) -> List[str]:
+        config = self.routes.get(route, self.routes["default"])
+        tiers, seen = [], set()
+        for tier in config.tiers:
+            # Escalating to the same model object would only replay its answer.
+            if tier in self.models and id(self.models[tier]) not in seen:
+                seen.add(id(self.models[tier]))
+                tiers.append(tier)
+        with self._lock:
+            self._requests[route] += 1
+            probing = self._requests[route] % self.probe_every == 0
+            if not probing:
+                while len(tiers) > 1:
+                    s = self.stats.get((route, tiers[0]))
+                    if (s is None or s.requests < self.skip_after
+                            or s.escalation_rate <= self.skip_rate):
+                        break
+                    tiers = tiers[1:]
+        return tiers
+
+    def _record(self, route: str, tier: str, result: Completion) -> None:
+        price_in, price_out = self.prices.get(tier, (0.0, 0.0))
+        with self._lock:
+            s = self.stats.setdefault((route, tier), RouteStats())
+            s.calls += 1
+            if result.cached:
+                s.cached += 1
+                return
+            s.latency += result.latency
+            s.prompt_tokens += result.prompt_tokens
+            s.completion_tokens += result.completion_tokens
+            s.cost += (result.prompt_tokens * price_in
+                       + result.completion_tokens * price_out) / 1000
+
+    def _call(self, route: str, tier: str, prompt: str, **params: Any) -> Completion:
+        result = self.models[tier].generate(prompt, **params)
+        self._record(route, tier, result)
+        return result
+
+    def _stream_call(self, route: str, tier: str, prompt: str) -> Completion:
+        model = self.models[tier]
+        key = model.cache_key(prompt) if model.cache is not None else None
+        cached = model.cache.get(key) if key is not None else None
+        if cached is not None:
+            result = Completion(cached, cached=True, cache_key=key)
+            self._record(route, tier, result)
+            return result
+        start = time.perf_counter()
+        parts: List[str] = []
+        scanner = JSONObjectScanner()
+        complete = False
+        # Closed early, the stream never reaches OpenAIModel's cache; the object is cached here.
+        deltas = model.stream(prompt, use_cache=False)
+        with span("llm.stream", route=route, tier=tier):
+            try:
+                for delta in deltas:
+                    parts.append(delta)
+                    text = scanner.feed(delta)
+                    if text is not None:
+                        complete = True
+                        break
+                else:
+                    text = "".join(parts)
+            finally:
+                deltas.close()
+        latency = time.perf_counter() - start
+        if complete and key is not None:
+            model.cache.put(key, text, latency)
+        # Streams report no usage; estimate ~4 characters per token.
+        result = Completion(text, prompt_tokens=len(prompt) // 4 + 1,
+                            completion_tokens=len("".join(parts)) // 4 + 1,
+                            latency=latency, cache_key=key if complete else None)
+        self._record(route, tier, result)
+        return result
+
+    def _sample(self, route: str, tier: str, prompt: str, config: Route) -> List[Completion]:
+        if config.samples <= 1:
+            if config.stream:
+                return [self._stream_call(route, tier, prompt)]
+            return [self._call(route, tier, prompt)]
+        # Distinct seeds give distinct cache keys, so a resumed run replays the same votes.
+        params = self.models[tier].sampling_params(config.sample_params)
+        calls = [dict(params, seed=i) for i in range(config.samples)]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="model_manager")
+        futures = [self._pool.submit(self._call, route, tier, prompt, **p) for p in calls]
+        return [f.result() for f in futures]
+
+    def complete_json(self, prompt: str, route: str = "default",
+                      validate: Callable[[Any], bool] = None) -> Tuple[Any, str]:
+        """
+        Runs the route's cascade and returns (parsed JSON, tier that answered).
+        A tier's answer is accepted when it parses, passes validate() and,
+        with several samples, the majority answer has at least min_confidence
+        of the votes. Otherwise the request escalates. Raises ValueError if
+        no tier produced a valid answer.
+        """
+        with span("llm.route", route=route) as s:
+            parsed, tier = self._complete_json(prompt, route, validate)
+            s.set(tier=tier)
+            return parsed, tier
+
+    def _complete_json(self, prompt: str, route: str,
+                       validate: Optional[Callable[[Any], bool]]) -> Tuple[Any, str]:
+        config = self.routes.get(route, self.routes["default"])
+        tiers = self._tiers(route)
+        for i, tier in enumerate(tiers):
+            votes: Counter = Counter()
+            answers: Dict[str, Any] = {}
+            completions = self._sample(route, tier, prompt, config)
+            for completion in completions:
+                try:
+                    parsed = parse_json(completion.text)
+                except ValueError:
+                    parsed = _INVALID
+                if parsed is _INVALID or (validate is not None and not validate(parsed)):
+                    # Otherwise a retry would replay the same bad reply from the cache.
+                    self.models[tier].evict(completion.cache_key)
+                    continue
+                key = json.dumps(parsed, sort_keys=True)
+                votes[key] += 1
+                answers[key] = parsed
+            last = i == len(tiers) - 1
+            with self._lock:
+                s = self.stats.setdefault((route, tier), RouteStats())
+                s.requests += 1
+                if not votes:
+                    s.invalid += 1
+            if votes:
+                best, count = votes.most_common(1)[0]
+                confidence = count / len(completions)
+                if confidence >= config.min_confidence or last:
+                    return answers[best], tier
+                with self._lock:
+                    s.low_confidence += 1
+            if not last:
+                with self._lock:
+                    s.escalations += 1
+                log("llm.escalate", route=route, tier=tier, next_tier=tiers[i + 1])
+        raise ValueError(f"No model tier returned a valid answer for '{route}'")
+
+    def plan_task(self, prompt: str) -> str:
+        """Returns the task plan as a JSON array string of {id, description, deps}."""
+        def valid(plan: Any) -> bool:
+            return isinstance(plan, list) and all(
+                isinstance(t, dict) and "id" in t and "description" in t for t in plan
+            )
+        plan, _ = self.complete_json(prompt, route="planning", validate=valid)
+        return json.dumps(plan)
+
+    def select_tool(self, prompt: str,
+                    tool_names: Iterable[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns {"tool_name", "args"} from the cheapest tier that names a known
+        tool with dict args, or None if every tier failed.
+        """
+        known = set(tool_names) if tool_names is not None else None
+
+        def valid(call: Any) -> bool:
+            return (isinstance(call, dict) and isinstance(call.get("args", {}), dict)
+                    and (known is None or call.get("tool_name") in known))
+        try:
+            call, _ = self.complete_json(prompt, route="tool_selection", validate=valid)
+        except ValueError:
+            return None
+        return call
 
-    def generate(self, prompt: str) -> str:
-        """Generates a response from the model."""
-        return self.model.complete(prompt)
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """Per-route, per-tier counters keyed as "route/tier"."""
+        with self._lock:
+            return {f"{route}/{tier}": s.snapshot() for (route, tier), s in self.stats.items()}
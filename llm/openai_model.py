@@ -1,18 +1,191 @@
 """OpenAI model wrapper."""
 
-import os
-import openai
-from typing import Dict, Any
+import re
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, List
+
+from observability.logger import span
+from .client import LLMClient, shared_client
+from .completion_cache import CompletionCache, completion_key
+
+
+@dataclass
+class Completion:
+    """A completion with the usage it cost; cached replies cost nothing."""
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cached: bool = False
+    cache_key: str = None
+
+
+# o-series reasoning models reject any temperature / top_p but the default (400 Bad Request).
+REASONING_MODEL = re.compile(r"^o\d")
+SAMPLING_PARAMS = ("temperature", "top_p")
+
+# Other finish reasons ("length", "content_filter", ...) mean a cut-off or empty reply.
+CACHEABLE_FINISH_REASONS = (None, "stop")
+
 
 class OpenAIModel:
-    def __init__(self, model_name: str):
-        self.client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
+    """
+    Chat model with a response cache.
+    - client: an LLMClient, or an `openai.Client`-compatible object (see
+      llm.fake_client) to wrap in one; defaults to the process-wide
+      shared_client()
+    - cache: CompletionCache shared across calls; pass cache=False to always
+      hit the API
+    - params: default request parameters (temperature, max_tokens, ...);
+      they are part of the cache key
+    Only non-empty replies that finished normally are cached; evict() drops
+    one that the caller found unusable.
+    """
+    def __init__(self, model_name: str, client: Any = None, cache: Any = None, **params: Any):
+        if client is None:
+            client = shared_client()
+        elif not isinstance(client, LLMClient):
+            client = LLMClient(client=client)
+        self.client = client
         self.model_name = model_name
+        self.cache = None if cache is False else (cache if cache is not None else CompletionCache())
+        self.params = params
 
-    def complete(self, prompt: str, context: Dict[str, Any] = None) -> str:
+    def _messages(self, prompt: str, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         messages = [{"role": "system", "content": "You are a helpful assistant."}]
         if context:
             messages.append({"role": "assistant", "content": str(context)})
         messages.append({"role": "user", "content": prompt})
-        response = self.client.chat.completions.create(model=self.model_name, messages=messages)
-        return response.choices[0].message.content
+        return messages
+
+    def cache_key(self, prompt: str, context: Dict[str, Any] = None, **params: Any) -> str:
+        """Key of the cached reply to this request (default params included)."""
+        return completion_key(self.model_name, self._messages(prompt, context),
+                              {**self.params, **params})
+
+    @property
+    def fixed_sampling(self) -> bool:
+        """True if the model only accepts its default temperature and top_p."""
+        return bool(REASONING_MODEL.match(self.model_name))
+
+    def sampling_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """params without the sampling knobs this model would reject."""
+        if not self.fixed_sampling:
+            return dict(params)
+        return {k: v for k, v in params.items() if k not in SAMPLING_PARAMS}
+
+    def evict(self, key: str) -> None:
+        if self.cache is not None and key is not None:
+            self.cache.discard(key)
+
+    def complete(self, prompt: str, context: Dict[str, Any] = None, use_cache: bool = True,
+                 **params: Any) -> str:
+        return self.generate(prompt, context, use_cache, **params).text
+
+    def generate(self, prompt: str, context: Dict[str, Any] = None, use_cache: bool = True,
+                 **params: Any) -> Completion:
+        """Like complete(), but also reports token usage, latency and cache use."""
+        messages = self._messages(prompt, context)
+        params = {**self.params, **params}
+        start = time.perf_counter()
+        usage = {}
+        key = None
+
+        def call() -> str:
+            response = self.client.create(model=self.model_name, messages=messages, **params)
+            usage["response"] = getattr(response, "usage", None)
+            usage["finish_reason"] = getattr(response.choices[0], "finish_reason", None)
+            return response.choices[0].message.content
+
+        with span("llm.generate", model=self.model_name) as s:
+            if self.cache is None or not use_cache:
+                text = call()
+            else:
+                key = completion_key(self.model_name, messages, params)
+                text = self.cache.get_or_compute(key, call, store=lambda reply: _finished(
+                    reply, usage.get("finish_reason")))
+            s.set(cached="response" not in usage)
+        latency = time.perf_counter() - start
+        if "response" not in usage:
+            return Completion(text, latency=latency, cached=True, cache_key=key)
+        reported = usage["response"]
+        return Completion(
+            text,
+            prompt_tokens=getattr(reported, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(reported, "completion_tokens", 0) or 0,
+            latency=latency,
+            cache_key=key,
+        )
+
+    async def acomplete(self, prompt: str, context: Dict[str, Any] = None,
+                        use_cache: bool = True, **params: Any) -> str:
+        messages = self._messages(prompt, context)
+        params = {**self.params, **params}
+
+        finish = {}
+
+        async def call() -> str:
+            response = await self.client.acreate(model=self.model_name, messages=messages,
+                                                 **params)
+            finish["reason"] = getattr(response.choices[0], "finish_reason", None)
+            return response.choices[0].message.content
+
+        if self.cache is None or not use_cache:
+            return await call()
+        key = completion_key(self.model_name, messages, params)
+        return await self.cache.aget_or_compute(
+            key, call, store=lambda reply: _finished(reply, finish.get("reason")))
+
+    def stream(self, prompt: str, context: Dict[str, Any] = None, use_cache: bool = True,
+               **params: Any) -> Iterator[str]:
+        """
+        Yields the completion as it is generated. A cached response is yielded
+        in one piece; a streamed one is cached only if it was read to the end
+        and finished normally.
+        """
+        messages = self._messages(prompt, context)
+        params = {**self.params, **params}
+        key = completion_key(self.model_name, messages, params)
+        if self.cache is not None and use_cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+        start = time.perf_counter()
+        parts = []
+        finish = {}
+        for delta in self.client.stream(finish, model=self.model_name, messages=messages,
+                                        **params):
+            parts.append(delta)
+            yield delta
+        reply = "".join(parts)
+        if self.cache is not None and use_cache and _finished(reply, finish.get("reason")):
+            self.cache.put(key, reply, time.perf_counter() - start)
+
+    async def astream(self, prompt: str, context: Dict[str, Any] = None,
+                      use_cache: bool = True, **params: Any) -> AsyncIterator[str]:
+        messages = self._messages(prompt, context)
+        params = {**self.params, **params}
+        key = completion_key(self.model_name, messages, params)
+        # The cache's SQLite tier blocks, so it is read and written off the event loop.
+        if self.cache is not None and use_cache:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                yield cached
+                return
+        start = time.perf_counter()
+        parts = []
+        finish = {}
+        async for delta in self.client.astream(finish, model=self.model_name, messages=messages,
+                                               **params):
+            parts.append(delta)
+            yield delta
+        reply = "".join(parts)
+        if self.cache is not None and use_cache and _finished(reply, finish.get("reason")):
+            await asyncio.to_thread(self.cache.put, key, reply, time.perf_counter() - start)
+
+
+def _finished(reply: Any, finish_reason: Any) -> bool:
+    return bool(reply) and finish_reason in CACHEABLE_FINISH_REASONS
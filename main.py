@@ -4,87 +4,102 @@ SmallHands: Main entry point for the lean code assistant.
 import os
 import sys
 import json
-from llm.openai_model import OpenAIModel
-from sandbox.wsl_sandbox import WSLSandbox
-from tools.registry import ToolRegistry
-from observability.logger import Logger
-from observability.guardrails import Guardrails
+import contextlib
+from typing import Any, Dict, Iterable, List
 
-class ToolAgent:
+import daemon
+
+# The agent stack (model clients, indexes, sandboxes) is imported only when it is
+# needed, so a query answered by a running daemon skips those imports entirely.
+
+
+def serve():
+    """Keeps one warm agent answering CLI calls until interrupted (see daemon.py)."""
+    from agents.tool_agent import answer, build_agent
+    from observability.logger import Logger
+    logger = Logger("smallhands")
+    agent = build_agent()
+    daemon.Daemon(lambda query: answer(agent, query, logger)).serve_forever()
+    agent.sandbox.pool.close()
+    logger.close()
+
+
+def read_queries(lines: Iterable[str]) -> List[Dict[str, Any]]:
     """
-    A simple agent that selects and executes a single tool based on a user prompt.
+    Batch input, one query per line: a JSON object with "query" (and an
+    optional "id" echoed back), a JSON string, or plain text.
     """
-    def __init__(self, model: OpenAIModel, tool_registry: ToolRegistry, sandbox: WSLSandbox):
-        self.model = model
-        self.tool_registry = tool_registry
-        self.sandbox = sandbox
-
-    def _create_prompt(self, query: str, tools: str) -> str:
-        """Creates a prompt for the LLM to select a tool."""
-        return f"""
-You are a helpful AI assistant. Your goal is to select the best tool to respond to the user's query.
-Your output must be a single JSON object with two fields:
-- "tool_name": The name of the tool to use.
-- "args": A dictionary of arguments to pass to the tool.
-
-USER QUERY: "{query}"
-
-AVAILABLE TOOLS:
----
-{tools}
----
-
-Your response must be ONLY the JSON object.
-"""
-
-    def _clean_llm_response(self, response: str) -> str:
-        """Strips markdown fences from the LLM's JSON output."""
-        if response.startswith("```json"):
-            response = response[7:]
-        if response.endswith("```"):
-            response = response[:-3]
-        return response.strip()
-
-    def run(self, query: str) -> dict:
-        """Selects and runs a tool, returning the result."""
-        available_tools = self.tool_registry.get_tool_definitions_str()
-        prompt = self._create_prompt(query, available_tools)
-        
-        print("Selecting tool with model...")
-        llm_response = self.model.complete(prompt)
-        print(f"Received tool call from LLM: {llm_response}")
-
-        cleaned_response = self._clean_llm_response(llm_response)
-        
+    queries = []
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            tool_call = json.loads(cleaned_response)
-        except json.JSONDecodeError:
-            return {"success": False, "output": "Error: LLM returned invalid JSON."}
-
-        tool_name = tool_call.get("tool_name")
-        tool_args = tool_call.get("args", {})
-        
-        tool_fn = self.tool_registry.get_tool(tool_name)
-        if not tool_fn:
-            return {"success": False, "output": f"Error: LLM selected a non-existent tool: {tool_name}"}
-
-        print(f"Executing tool '{tool_name}' with args: {tool_args}")
-        with self.sandbox as sb:
-            execution_result = sb.run(tool_fn, **tool_args)
-        
-        print(f"Task finished. Result: {execution_result}")
-        return execution_result
+            item = json.loads(line)
+        except ValueError:
+            item = line
+        if isinstance(item, str):
+            item = {"query": item}
+        if not isinstance(item, dict) or not isinstance(item.get("query"), str):
+            raise ValueError(f"line {n}: expected a query string or an object with 'query'")
+        item.setdefault("id", n)
+        queries.append(item)
+    return queries
+
+
+def batch(path: str) -> None:
+    """
+    Runs a JSONL file of queries ("-" for stdin) and writes one JSON line
+    per query to stdout as it completes; progress goes to stderr.
+    """
+    if path == "-":
+        queries = read_queries(sys.stdin)
+    else:
+        with open(path) as f:
+            queries = read_queries(f)
+    from agents.tool_agent import build_agent
+    from observability.guardrails import GuardrailViolation
+    from observability.logger import Logger
+    out = sys.stdout
+    logger = Logger("smallhands")
+    with contextlib.redirect_stdout(sys.stderr):
+        agent = build_agent()
+        accepted = []
+        for item in queries:
+            try:
+                agent.guardrails.validate_input(item["query"])
+            except GuardrailViolation as e:
+                out.write(json.dumps({"id": item["id"], "query": item["query"],
+                                      "result": {"success": False, "output": f"Error: {e}"}})
+                          + "\n")
+                continue
+            accepted.append(item)
+        logger.log("batch_start", queries=len(accepted))
+        for done in agent.run_batch(item["query"] for item in accepted):
+            item = accepted[done.pop("index")]
+            done["result"] = agent.guardrails.validate_output(done["result"])
+            out.write(json.dumps({"id": item["id"], **done}, default=str) + "\n")
+            out.flush()
+        logger.log("batch_complete", queries=len(accepted))
+        if agent.sandbox.pool is not None:
+            agent.sandbox.pool.close()
+    logger.close()
+
+
+def print_result(result: dict) -> None:
+    print("\n--- Final Result ---")
+    print(result.get('output', 'No output from tool.'))
+    print("--------------------")
+
 
 def main():
     """Main application loop."""
-    logger = Logger("smallhands")
-    guard = Guardrails()
-    
-    # Initialize core components
-    model = OpenAIModel(os.getenv("OPENAI_MODEL", "o4-mini"))
-    tool_registry = ToolRegistry()
-    sandbox = WSLSandbox()
-    agent = ToolAgent(model, tool_registry, sandbox)
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+        return
+    if len(sys.argv) == 3 and sys.argv[1] == "--batch":
+        batch(sys.argv[2])
+        return
 
     # Get user query from command line or input
     if len(sys.argv) > 1:
@@ -92,17 +107,24 @@ def main():
     else:
         user_query = input("Enter your task: ")
 
-    guard.validate_input(user_query)
-    logger.log("query_start", query=user_query)
+    # A running daemon (main.py --serve) answers without the cold start.
+    if os.getenv("SMALLHANDS_DAEMON", "1") != "0":
+        try:
+            print_result(daemon.query(user_query))
+            return
+        except daemon.DaemonUnavailable:
+            pass
+
+    from agents.tool_agent import answer, build_agent
+    from observability.logger import Logger
+    logger = Logger("smallhands")
+    agent = build_agent()
 
     # Run the agent and get the result
-    result = agent.run(user_query)
-    guard.validate_output(result)
-
-    logger.log("query_complete", result=result)
-    print("\n--- Final Result ---")
-    print(result.get('output', 'No output from tool.'))
-    print("--------------------")
+    result = answer(agent, user_query, logger)
+    print_result(result)
+    logger.close()
+    print(f"Trace written to {logger.trace_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+"""Vectorized BM25 over a segmented, sparse inverted index."""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class _Segment:
+    """
+    Immutable term-major CSR block of postings.
+    Postings of term t are indices[indptr[t]:indptr[t + 1]] (global doc
+    numbers) with term frequencies in the same slice of tfs. Terms added to
+    the vocabulary after the segment was built have no postings in it.
+    """
+    __slots__ = ("indptr", "indices", "tfs")
+
+    def __init__(self, terms: np.ndarray, docs: np.ndarray, tfs: np.ndarray, vocab_size: int):
+        order = np.argsort(terms, kind="stable")
+        self.indices = docs[order]
+        self.tfs = tfs[order]
+        self.indptr = np.zeros(vocab_size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=vocab_size), out=self.indptr[1:])
+
+    def postings(self, term: int) -> Tuple[np.ndarray, np.ndarray]:
+        if term + 1 >= len(self.indptr):
+            return self.indices[:0], self.tfs[:0]
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.indices[start:end], self.tfs[start:end]
+
+    def coo(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        terms = np.repeat(np.arange(len(self.indptr) - 1), np.diff(self.indptr))
+        return terms, self.indices, self.tfs
+
+
+class BM25Index:
+    """
+    Okapi BM25 over pre-tokenized documents.
+    - add() appends documents as a new segment; nothing is rebuilt
+    - remove() hides documents immediately; their postings are dropped on merge
+    - search() scores only the postings of the query terms and picks the
+      top k with argpartition instead of sorting every document
+    Documents are addressed by their insertion number, which never changes.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_segments: int = 8):
+        self.k1 = k1
+        self.b = b
+        self.max_segments = max_segments
+        self.vocab: Dict[str, int] = {}
+        self.segments: List[_Segment] = []
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return int(self.alive.sum())
+
+    def add(self, tokenized_docs: Iterable[List[str]]) -> List[int]:
+        """Indexes documents and returns their document numbers."""
+        first = len(self.doc_len)
+        terms: List[int] = []
+        docs: List[int] = []
+        tfs: List[int] = []
+        lengths: List[int] = []
+        vocab = self.vocab
+        for doc_no, tokens in enumerate(tokenized_docs, start=first):
+            lengths.append(len(tokens))
+            for token, tf in Counter(tokens).items():
+                term = vocab.get(token)
+                if term is None:
+                    term = vocab[token] = len(vocab)
+                terms.append(term)
+                docs.append(doc_no)
+                tfs.append(tf)
+        if not lengths:
+            return []
+
+        vocab_size = len(vocab)
+        term_arr = np.asarray(terms, dtype=np.int64)
+        self.segments.append(_Segment(
+            term_arr,
+            np.asarray(docs, dtype=np.int64),
+            np.asarray(tfs, dtype=np.float32),
+            vocab_size,
+        ))
+        df = np.zeros(vocab_size, dtype=np.int64)
+        df[:len(self.df)] = self.df
+        df += np.bincount(term_arr, minlength=vocab_size)
+        self.df = df
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, dtype=np.float32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(lengths), dtype=bool)])
+        if len(self.segments) > self.max_segments:
+            self.merge()
+        return list(range(first, first + len(lengths)))
+
+    def remove(self, doc_nos: Iterable[int]) -> None:
+        doc_nos = np.asarray(list(doc_nos), dtype=np.int64)
+        if len(doc_nos):
+            self.alive[doc_nos] = False
+
+    def merge(self) -> None:
+        """Collapses all segments into one, dropping postings of removed docs."""
+        if not self.segments:
+            return
+        parts = [seg.coo() for seg in self.segments]
+        terms = np.concatenate([p[0] for p in parts])
+        docs = np.concatenate([p[1] for p in parts])
+        tfs = np.concatenate([p[2] for p in parts])
+        keep = self.alive[docs]
+        terms, docs, tfs = terms[keep], docs[keep], tfs[keep]
+        self.segments = [_Segment(terms, docs, tfs, len(self.vocab))]
+        self.df = np.bincount(terms, minlength=len(self.vocab)).astype(np.int64)
+
+    def _live_df(self, term: int) -> int:
+        if self.alive.all():
+            return int(self.df[term])
+        return int(sum(self.alive[seg.postings(term)[0]].sum() for seg in self.segments))
+
+    def get_scores(self, query_tokens: List[str]) -> np.ndarray:
+        """BM25 score of every document (0 for removed ones)."""
+        scores = np.zeros(len(self.doc_len), dtype=np.float32)
+        n_docs = len(self)
+        if not n_docs:
+            return scores
+        avgdl = float(self.doc_len[self.alive].mean()) or 1.0
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_len / avgdl)
+        for token, qtf in Counter(query_tokens).items():
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            df = self._live_df(term)
+            if not df:
+                continue
+            idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+            for seg in self.segments:
+                docs, tfs = seg.postings(term)
+                if len(docs):
+                    scores[docs] += qtf * idf * tfs * (self.k1 + 1.0) / (tfs + norm[docs])
+        if not self.alive.all():
+            scores[~self.alive] = 0.0
+        return scores
+
+    def search(self, query_tokens: List[str], top_k: int) -> List[Tuple[int, float]]:
+        """Top-k (doc number, score) pairs with a positive score, best first."""
+        if top_k <= 0:
+            return []
+        scores = self.get_scores(query_tokens)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            part = np.argpartition(-scores[candidates], top_k - 1)[:top_k]
+            candidates = candidates[part]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i), float(scores[i])) for i in order]
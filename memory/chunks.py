@@ -0,0 +1,34 @@
+"""Chunks and chunk identifiers shared by the indexers and retrieval strategies."""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+
+def doc_id(*parts: Any) -> int:
+    """Stable non-negative int64 id for a chunk, derived from its identifying parts."""
+    key = "\0".join(str(p) for p in parts).encode("utf-8")
+    digest = hashlib.blake2b(key, digest_size=8).digest()
+    return int.from_bytes(digest, "little") & 0x7FFF_FFFF_FFFF_FFFF
+
+
+def content_ids(docs: List[str]) -> List[int]:
+    """Ids for plain-text docs: derived from content, with repeats kept distinct."""
+    seen: Dict[str, int] = {}
+    ids = []
+    for doc in docs:
+        seen[doc] = seen.get(doc, -1) + 1
+        ids.append(doc_id(doc, seen[doc]))
+    return ids
+
+
+@dataclass
+class Chunk:
+    """A retrievable unit of source: a function, class or module remainder."""
+    id: int
+    path: str
+    name: str
+    kind: str
+    start_line: int
+    end_line: int
+    text: str
@@ -0,0 +1,122 @@
+"""Token-budgeted packing of retrieved chunks into prompt context."""
+
+import re
+import hashlib
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .tokenizer import code_tokenize
+
+# Roughly one BPE token per word, number or punctuation mark in source code.
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+_MERSENNE = (1 << 61) - 1
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Exact cl100k token count when tiktoken is installed, else a regex estimate."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(_TOKEN_PIECES.findall(text))
+
+
+class MinHasher:
+    """MinHash signatures over token shingles, for near-duplicate detection."""
+    def __init__(self, num_perm: int = 64, shingle: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.shingle = shingle
+        self.a = rng.integers(1, _MERSENNE, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _MERSENNE, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        tokens = code_tokenize(text)
+        n = self.shingle
+        shingles = {" ".join(tokens[i:i + n]) for i in range(max(1, len(tokens) - n + 1))}
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+             % _MERSENNE for s in shingles),
+            dtype=np.uint64, count=len(shingles),
+        )
+        # (a * x + b) mod p per permutation; the product wraps at 2**64, fine for hashing.
+        return ((np.outer(hashes, self.a) + self.b) % _MERSENNE).min(axis=0)
+
+
+class ContextPacker:
+    """
+    Fits retrieved chunks into a prompt token budget.
+    - max_tokens: budget for the packed context, separators included
+    - dedup_threshold: estimated Jaccard similarity above which a chunk is
+      dropped as a near-duplicate of a higher-scored one
+    - min_tail_tokens: the first chunk that does not fit is cut to the
+      remaining budget if at least this many tokens are left
+    Chunks are taken highest score first.
+    """
+    def __init__(self, max_tokens: int = 3000, dedup_threshold: float = 0.8,
+                 num_perm: int = 64, min_tail_tokens: int = 64, separator: str = "\n\n"):
+        self.max_tokens = max_tokens
+        self.dedup_threshold = dedup_threshold
+        self.min_tail_tokens = min_tail_tokens
+        self.separator = separator
+        self.hasher = MinHasher(num_perm)
+        self.last_stats = {}
+
+    def select(self, chunks: Sequence[Tuple[str, float]],
+               max_tokens: Optional[int] = None) -> List[str]:
+        """Chunk texts to include, in score order, the last one possibly truncated."""
+        budget = self.max_tokens if max_tokens is None else max_tokens
+        sep_tokens = count_tokens(self.separator)
+        ranked = sorted(chunks, key=lambda c: c[1], reverse=True)
+        kept: List[str] = []
+        signatures: List[np.ndarray] = []
+        used = duplicates = truncated = 0
+        for text, _ in ranked:
+            if used >= budget:
+                break
+            signature = self.hasher.signature(text)
+            if signatures:
+                similarity = (np.stack(signatures) == signature).mean(axis=1)
+                if similarity.max() >= self.dedup_threshold:
+                    duplicates += 1
+                    continue
+            cost = count_tokens(text) + (sep_tokens if kept else 0)
+            if used + cost > budget:
+                remaining = budget - used - (sep_tokens if kept else 0)
+                if remaining >= self.min_tail_tokens:
+                    kept.append(self._truncate(text, remaining))
+                    truncated += 1
+                break
+            kept.append(text)
+            signatures.append(signature)
+            used += cost
+        self.last_stats = {
+            "candidates": len(chunks), "kept": len(kept), "duplicates": duplicates,
+            "truncated": truncated, "tokens": sum(count_tokens(t) for t in kept),
+        }
+        return kept
+
+    def pack(self, chunks: Sequence[Tuple[str, float]], max_tokens: Optional[int] = None) -> str:
+        return self.separator.join(self.select(chunks, max_tokens))
+
+    @staticmethod
+    def _truncate(text: str, max_tokens: int) -> str:
+        """Keeps whole leading lines that fit (chunk headers come first)."""
+        out: List[str] = []
+        used = count_tokens("...")
+        for line in text.splitlines(keepends=True):
+            cost = count_tokens(line)
+            if used + cost > max_tokens:
+                break
+            out.append(line)
+            used += cost
+        return "".join(out) + "..."
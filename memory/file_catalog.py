@@ -0,0 +1,105 @@
+"""One shared walk of a repository tree for the indexes built over it."""
+
+import os
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+
+EXCLUDED_DIRS = {
+    ".git", ".hg", ".svn", ".smallhands", "__pycache__", ".venv", "venv", "env",
+    "node_modules", "build", "dist", ".tox", ".nox", ".mypy_cache", ".pytest_cache",
+    ".ruff_cache", "site-packages",
+}
+
+
+class FileCatalog:
+    """
+    (mtime_ns, size) of every file under root, found with os.scandir.
+    - max_age: refresh() reuses the directory walk of the last this many
+      seconds, so the semantic and trigram indexes updated back to back walk
+      the tree once; files and directories are re-stat'ed on every refresh,
+      so edits are always seen, and a directory whose mtime changed (a file
+      was created, deleted or renamed in it) triggers a new walk
+    Use FileCatalog.shared(root) to get the process-wide catalog of a root.
+    """
+    _shared: Dict[str, "FileCatalog"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str = ".", max_age: float = 2.0):
+        self.root = os.path.abspath(root)
+        self.max_age = max_age
+        self.files: Dict[str, Tuple[int, int]] = {}
+        self.walks = 0
+        self._paths: List[str] = []
+        self._dirs: Dict[str, int] = {}
+        self._scanned_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, root: str = ".") -> "FileCatalog":
+        root = os.path.abspath(root)
+        with cls._shared_lock:
+            if root not in cls._shared:
+                cls._shared[root] = cls(root)
+            return cls._shared[root]
+
+    def invalidate(self) -> None:
+        self._scanned_at = 0.0
+
+    def refresh(self, max_age: Optional[float] = None) -> Dict[str, Tuple[int, int]]:
+        """{relative path: (mtime_ns, size)}, walking the tree unless a recent walk exists."""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            if (time.monotonic() - self._scanned_at > max_age or not self._scanned_at
+                    or self._dirs_changed()):
+                self._dirs = {}
+                self.files = dict(self._walk(self._dirs))
+                self._paths = list(self.files)
+                self.walks += 1
+                self._scanned_at = time.monotonic()
+                return self.files
+            files: Dict[str, Tuple[int, int]] = {}
+            for path in self._paths:
+                try:
+                    st = os.stat(os.path.join(self.root, path))
+                except OSError:
+                    continue
+                files[path] = (st.st_mtime_ns, st.st_size)
+            self.files = files
+            return files
+
+    def paths(self, suffix: Optional[str] = None, max_age: Optional[float] = None) -> List[str]:
+        """Sorted relative paths ending in `suffix` (None: all files)."""
+        files = self.refresh(max_age)
+        return sorted(p for p in files if suffix is None or p.endswith(suffix))
+
+    def _dirs_changed(self) -> bool:
+        for path, mtime_ns in self._dirs.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _walk(self, dirs: Dict[str, int]):
+        """Yields (relative path, (mtime_ns, size)) and records each directory's mtime in dirs."""
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                # Taken before listing, so a file created meanwhile shows up next refresh.
+                dirs[current] = os.stat(current).st_mtime_ns
+                entries = list(os.scandir(current))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in EXCLUDED_DIRS:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    yield os.path.relpath(entry.path, self.root), (st.st_mtime_ns, st.st_size)
@@ -1,34 +1,93 @@
 """Hybrid search pipeline with BM25 and semantic strategies."""
 
-from typing import Any, List, Tuple, Dict
+import time
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from abc import ABC, abstractmethod
-from rank_bm25 import BM25Okapi
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from observability.logger import log, span
+from .bm25_index import BM25Index
+from .chunks import Chunk, doc_id
+from .tokenizer import code_tokenize
 
 class RetrievalStrategy(ABC):
+    """Strategies index and return chunk ids; HybridSearch owns the texts."""
     @abstractmethod
-    def index(self, docs: List[str]) -> None:
+    def index(self, docs: List[str], ids: List[int]) -> None:
         ...
 
     @abstractmethod
-    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        ...
+
+    def add(self, docs: List[str], ids: List[int]) -> None:
+        raise NotImplementedError(f"{type(self).__name__} cannot add documents incrementally")
+
+    def remove(self, ids: List[int]) -> None:
+        raise NotImplementedError(f"{type(self).__name__} cannot remove documents")
+
+    def rescore(self, query: str, ids: List[int]) -> List[Tuple[int, float]]:
+        """Scores only the given chunks; used for two-stage re-ranking."""
+        raise NotImplementedError(f"{type(self).__name__} cannot re-score candidates")
+
+    def finish_index(self, keep_ids: Set[int]) -> None:
+        """Called after a streamed index pass; drops chunks not in keep_ids."""
         ...
 
 class BM25Strategy(RetrievalStrategy):
+    """BM25 over a sparse inverted index with a code-aware tokenizer."""
+    def __init__(self, k1: float = 1.5, b: float = 0.75,
+                 tokenizer: Callable[[str], List[str]] = code_tokenize):
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer
+        self.engine = BM25Index(k1, b)
+        self.doc_ids: List[int] = []
+        self.doc_no: Dict[int, int] = {}
+
+    def index(self, docs: List[str], ids: List[int]) -> None:
+        self.engine = BM25Index(self.k1, self.b)
+        self.doc_ids = []
+        self.doc_no = {}
+        self.add(docs, ids)
+
+    def add(self, docs: List[str], ids: List[int]) -> None:
+        """Indexes more documents without rebuilding the existing postings."""
+        self.remove([i for i in ids if i in self.doc_no])
+        doc_nos = self.engine.add(self.tokenizer(doc) for doc in docs)
+        for chunk_id, doc_no in zip(ids, doc_nos):
+            self.doc_no[chunk_id] = doc_no
+        self.doc_ids.extend(ids)
+
+    def remove(self, ids: List[int]) -> None:
+        self.engine.remove(self.doc_no.pop(i) for i in ids if i in self.doc_no)
+
+    def finish_index(self, keep_ids: Set[int]) -> None:
+        self.remove([i for i in self.doc_no if i not in keep_ids])
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        hits = self.engine.search(self.tokenizer(query), top_k)
+        return [(self.doc_ids[i], score) for i, score in hits]
+
+class RankBM25Strategy(RetrievalStrategy):
+    """Original rank_bm25 + whitespace-split strategy, kept as a benchmark baseline."""
     def __init__(self):
         self.bm25 = None
-        self.docs: List[str] = []
+        self.ids: List[int] = []
 
-    def index(self, docs: List[str]) -> None:
+    def index(self, docs: List[str], ids: List[int]) -> None:
+        from rank_bm25 import BM25Okapi
         tokenized = [doc.split() for doc in docs]
         self.bm25 = BM25Okapi(tokenized)
-        self.docs = docs
+        self.ids = list(ids)
 
-    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
         if not self.bm25:
             return []
         tokenized_query = query.split()
         scores = self.bm25.get_scores(tokenized_query)
-        results = [(self.docs[i], float(scores[i])) for i in range(len(self.docs)) if scores[i] > 0]
+        results = [(self.ids[i], float(scores[i])) for i in range(len(self.ids)) if scores[i] > 0]
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:top_k]
 
@@ -36,21 +95,76 @@ class EmbeddingStrategy(RetrievalStrategy):
     def __init__(self, vector_store: Any):
         self.vector_store = vector_store
 
-    def index(self, docs: List[str]) -> None:
-        self.vector_store.build_index(docs)
+    def index(self, docs: List[str], ids: List[int]) -> None:
+        self.vector_store.build_index(docs, ids)
+
+    def add(self, docs: List[str], ids: List[int]) -> None:
+        # Chunks already stored with the same text (e.g. from a saved index) are skipped.
+        self.vector_store.upsert(ids, docs)
+
+    def remove(self, ids: List[int]) -> None:
+        self.vector_store.remove_ids(ids)
+
+    def finish_index(self, keep_ids: Set[int]) -> None:
+        self.vector_store.retain(keep_ids)
+        self.vector_store.flush()
+
+    def _similarities(self, results: List[Tuple[int, float]]) -> List[Tuple[int, float]]:
+        return [(chunk_id, self.vector_store.similarity(dist)) for chunk_id, dist in results]
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        return self._similarities(self.vector_store.search_ids(query, top_k))
 
-    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
-        results = self.vector_store.search(query, top_k)
-        scored = []
-        for doc, dist in results:
-            sim = 1.0 / (1.0 + dist)
-            scored.append((doc, sim))
-        return scored
+    def rescore(self, query: str, ids: List[int]) -> List[Tuple[int, float]]:
+        return self._similarities(self.vector_store.score_ids(query, ids))
+
+def _id_doc_batches(docs: Iterable[Union[str, Chunk]], ids: Optional[Iterable[int]],
+                    batch_size: int) -> Iterator[Tuple[List[int], List[str]]]:
+    id_iter = iter(ids) if ids is not None else None
+    occurrences: Dict[str, int] = {}
+    batch_ids: List[int] = []
+    batch_docs: List[str] = []
+    for doc in docs:
+        if isinstance(doc, Chunk):
+            chunk_id, doc = doc.id, doc.text
+        elif id_iter is not None:
+            chunk_id = next(id_iter)
+        else:
+            occurrences[doc] = occurrences.get(doc, -1) + 1
+            chunk_id = doc_id(doc, occurrences[doc])
+        batch_ids.append(int(chunk_id))
+        batch_docs.append(doc)
+        if len(batch_ids) >= batch_size:
+            yield batch_ids, batch_docs
+            batch_ids, batch_docs = [], []
+    if batch_ids:
+        yield batch_ids, batch_docs
 
 class HybridSearch:
-    """Hybrid search combining multiple retrieval strategies."""
+    """
+    Hybrid search combining multiple retrieval strategies.
+    - mode "parallel": every strategy runs concurrently, each bounded by its
+      timeout; a strategy that fails or times out is left out of the fusion,
+      and is skipped while its timed-out call is still running, so slow
+      calls never pile up in the shared worker pool
+    - mode "two_stage": the lexical strategy (first_stage) proposes
+      candidate_pool chunks and only those are re-scored by the reranker
+    - fusion "weighted" sums weighted scores, each strategy's divided by its
+      best score so unbounded BM25 scores and [0, 1] similarities weigh the
+      same; "rrf" uses Reciprocal Rank Fusion (sum of weight / (rrf_k + rank)),
+      which ignores score scales
+    Results are keyed by chunk id, so identical text in two files stays two hits.
+    """
     def __init__(self, strategies: Dict[str, RetrievalStrategy] = None,
-                 weights: Dict[str, float] = None):
+                 weights: Dict[str, float] = None, fusion: str = "weighted",
+                 mode: str = "parallel", timeouts: Dict[str, float] = None,
+                 default_timeout: Optional[float] = 30.0, rrf_k: int = 60,
+                 first_stage: str = "bm25", reranker: str = "semantic",
+                 candidate_pool: int = 50):
+        if fusion not in ("weighted", "rrf"):
+            raise ValueError(f"Unknown fusion method: {fusion}")
+        if mode not in ("parallel", "two_stage"):
+            raise ValueError(f"Unknown search mode: {mode}")
         if strategies:
             self.strategies = strategies
         else:
@@ -64,6 +178,18 @@ class HybridSearch:
             self.weights = weights
         else:
             self.weights = {name: 1 / total for name in self.strategies}
+        self.fusion = fusion
+        self.mode = mode
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+        self.rrf_k = rrf_k
+        self.first_stage = first_stage
+        self.reranker = reranker
+        self.candidate_pool = candidate_pool
+        self.docs: Dict[int, str] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._abandoned: Dict[str, int] = {}
+        self._abandoned_lock = threading.Lock()
 
     def register_strategy(self, name: str, strategy: RetrievalStrategy,
                           weight: float = None) -> None:
@@ -72,17 +198,129 @@ class HybridSearch:
         total = sum(self.weights.values())
         for key in self.weights:
             self.weights[key] /= total
+        self._shutdown_pool()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            # One worker per strategy, plus one for a timed-out call still running.
+            self._pool = ThreadPoolExecutor(
+                max_workers=2 * max(len(self.strategies), 1), thread_name_prefix="hybrid_search",
+            )
+        return self._pool
 
-    def index(self, docs: List[str]) -> None:
+    def _shutdown_pool(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def index(self, docs: Iterable[Union[str, Chunk]], ids: Iterable[int] = None,
+              batch_size: int = 1024) -> None:
+        """
+        Syncs the corpus to `docs`: strings or Chunks from any iterable, such
+        as SemanticIndexer.iter_chunks(). Docs are consumed in batches and
+        only new or changed chunks reach the strategies; chunks missing from
+        the stream are dropped when it ends. Strings without ids get
+        content-derived ids.
+        """
+        seen: Set[int] = set()
+        for batch_ids, batch_docs in _id_doc_batches(docs, ids, batch_size):
+            seen.update(batch_ids)
+            fresh = [(i, doc) for i, doc in zip(batch_ids, batch_docs) if self.docs.get(i) != doc]
+            if fresh:
+                self.add([doc for _, doc in fresh], [i for i, _ in fresh])
+        self.docs = {i: doc for i, doc in self.docs.items() if i in seen}
         for strat in self.strategies.values():
-            strat.index(docs)
+            strat.finish_index(seen)
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
-        scores: Dict[str, float] = {}
-        for name, strat in self.strategies.items():
-            subs = strat.search(query, top_k * 2)
+    def add(self, docs: List[str], ids: List[int]) -> None:
+        """Adds or replaces chunks in every strategy without re-indexing the rest."""
+        ids = list(ids)
+        self.docs.update(zip(ids, docs))
+        for strat in self.strategies.values():
+            strat.add(docs, ids)
+
+    def remove(self, ids: List[int]) -> None:
+        ids = [i for i in ids if i in self.docs]
+        for chunk_id in ids:
+            del self.docs[chunk_id]
+        for strat in self.strategies.values():
+            strat.remove(ids)
+
+    def _fan_out(self, calls: Dict[str, Callable[[], List[Tuple[int, float]]]]
+                 ) -> Dict[str, List[Tuple[int, float]]]:
+        """Runs the calls concurrently; each must finish within its strategy's timeout."""
+        start = time.monotonic()
+        pool = self._executor()
+        futures = {}
+        for name, call in calls.items():
+            if self._abandoned.get(name):
+                log("retrieval.strategy_skipped", strategy=name,
+                    reason="a timed-out call is still running")
+                continue
+            futures[name] = pool.submit(call)
+        results: Dict[str, List[Tuple[int, float]]] = {}
+        for name, future in futures.items():
+            timeout = self.timeouts.get(name, self.default_timeout)
+            remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+            try:
+                results[name] = future.result(timeout=remaining)
+            except FutureTimeout:
+                if not future.cancel():
+                    self._abandon(name, future)
+                log("retrieval.strategy_timeout", strategy=name, timeout=timeout)
+            except Exception as e:
+                log("retrieval.strategy_failed", strategy=name, error=f"{type(e).__name__}: {e}")
+        return results
+
+    def _abandon(self, name: str, future) -> None:
+        """Counts a timed-out call as holding a worker until it returns."""
+        with self._abandoned_lock:
+            self._abandoned[name] = self._abandoned.get(name, 0) + 1
+
+        def released(_) -> None:
+            with self._abandoned_lock:
+                self._abandoned[name] -= 1
+        future.add_done_callback(released)
+
+    def _fuse(self, ranked: Dict[str, List[Tuple[int, float]]]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for name, hits in ranked.items():
             weight = self.weights.get(name, 1.0)
-            for doc, score in subs:
-                scores[doc] = scores.get(doc, 0.0) + weight * score
-        results = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return results[:top_k]
+            top = max((score for _, score in hits), default=0.0)
+            scale = 1.0 / top if top > 0 else 1.0
+            for rank, (chunk_id, score) in enumerate(hits, start=1):
+                contribution = 1.0 / (self.rrf_k + rank) if self.fusion == "rrf" else score * scale
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight * contribution
+        return scores
+
+    def _two_stage(self, query: str, top_k: int) -> Optional[Dict[int, float]]:
+        lexical = self.strategies[self.first_stage]
+        reranker = self.strategies[self.reranker]
+        pool_size = max(self.candidate_pool, top_k)
+        candidates = self._fan_out({self.first_stage: lambda: lexical.search(query, pool_size)})
+        ids = [chunk_id for chunk_id, _ in candidates.get(self.first_stage, [])]
+        if not ids:
+            return None
+        reranked = self._fan_out({self.reranker: lambda: reranker.rescore(query, ids)})
+        if self.reranker not in reranked:
+            return dict(candidates[self.first_stage])
+        return dict(reranked[self.reranker])
+
+    def search_ids(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k (chunk_id, fused score) pairs, best first."""
+        with span("retrieval.hybrid", mode=self.mode, top_k=top_k):
+            scores = None
+            if self.mode == "two_stage":
+                scores = self._two_stage(query, top_k)
+            if scores is None:
+                ranked = self._fan_out({
+                    name: (lambda strat=strat: strat.search(query, top_k * 2))
+                    for name, strat in self.strategies.items()
+                })
+                scores = self._fuse(ranked)
+            results = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+            return results[:top_k]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        return [(self.docs[chunk_id], score) for chunk_id, score in self.search_ids(query, top_k)
+                if chunk_id in self.docs]
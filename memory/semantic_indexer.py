@@ -0,0 +1,233 @@
+"""Code-aware, incremental repository indexer for SmallHands."""
+
+import os
+import ast
+import time
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import paths
+
+from .chunks import Chunk, doc_id
+from .file_catalog import FileCatalog
+
+# Classes longer than this are split into a header chunk plus one chunk per method.
+MAX_CLASS_LINES = 80
+
+
+@dataclass
+class FileEntry:
+    mtime_ns: int
+    size: int
+    sha1: str
+    chunks: List[Chunk] = field(default_factory=list)
+
+
+def _make_chunk(path: str, name: str, kind: str, lines: List[str], start: int, end: int) -> Chunk:
+    body = "".join(lines[start - 1:end])
+    text = f"# {path} ({kind} {name}, lines {start}-{end})\n{body}"
+    return Chunk(
+        id=doc_id(path, name, hashlib.sha1(text.encode("utf-8")).hexdigest()),
+        path=path, name=name, kind=kind, start_line=start, end_line=end, text=text,
+    )
+
+
+def _first_line(node: ast.AST) -> int:
+    decorators = getattr(node, "decorator_list", [])
+    return min([node.lineno] + [d.lineno for d in decorators])
+
+
+def chunk_python_source(path: str, source: str) -> List[Chunk]:
+    """Splits a Python file into function, class and method chunks with `ast`."""
+    lines = source.splitlines(keepends=True)
+    try:
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, ValueError):
+        return [_make_chunk(path, "<module>", "module", lines, 1, len(lines))] if lines else []
+
+    chunks: List[Chunk] = []
+    covered = set()
+    defs = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+    for node in tree.body:
+        if not isinstance(node, defs):
+            continue
+        start, end = _first_line(node), node.end_lineno
+        covered.update(range(start, end + 1))
+        if isinstance(node, ast.ClassDef) and end - start + 1 > MAX_CLASS_LINES:
+            methods = [n for n in node.body if isinstance(n, defs)]
+            header_end = (_first_line(methods[0]) - 1) if methods else end
+            chunks.append(_make_chunk(path, node.name, "class", lines, start, header_end))
+            for method in methods:
+                kind = "class" if isinstance(method, ast.ClassDef) else "method"
+                chunks.append(_make_chunk(path, f"{node.name}.{method.name}", kind, lines,
+                                          _first_line(method), method.end_lineno))
+        else:
+            kind = "class" if isinstance(node, ast.ClassDef) else "function"
+            chunks.append(_make_chunk(path, node.name, kind, lines, start, end))
+
+    # Imports, constants and script code outside any definition.
+    rest = [i for i in range(1, len(lines) + 1) if i not in covered and lines[i - 1].strip()]
+    if rest:
+        body = "".join(lines[i - 1] for i in rest)
+        text = f"# {path} (module <module>, lines {rest[0]}-{rest[-1]})\n{body}"
+        chunks.insert(0, Chunk(
+            id=doc_id(path, "<module>", hashlib.sha1(text.encode("utf-8")).hexdigest()),
+            path=path, name="<module>", kind="module",
+            start_line=rest[0], end_line=rest[-1], text=text,
+        ))
+    return chunks
+
+
+def _index_files(root: str, jobs: List[Tuple[str, int, int, Optional[str]]]
+                 ) -> List[Tuple[str, Optional[FileEntry]]]:
+    """
+    Worker: reads and chunks files. A file whose content hash matches the
+    known one is returned as FileEntry without chunks so the caller keeps
+    its cached chunks; unreadable files come back as None.
+    """
+    out: List[Tuple[str, Optional[FileEntry]]] = []
+    for path, mtime_ns, size, known_sha1 in jobs:
+        try:
+            with open(os.path.join(root, path), "rb") as f:
+                data = f.read()
+        except OSError:
+            out.append((path, None))
+            continue
+        sha1 = hashlib.sha1(data).hexdigest()
+        if sha1 == known_sha1:
+            out.append((path, FileEntry(mtime_ns, size, sha1)))
+            continue
+        source = data.decode("utf-8", errors="replace")
+        out.append((path, FileEntry(mtime_ns, size, sha1, chunk_python_source(path, source))))
+    return out
+
+
+class SemanticIndexer:
+    """
+    Incremental AST chunker for Python repositories.
+    - files come from the shared FileCatalog of the root (one walk serves
+      this indexer and the trigram index) and are compared to the cached
+      (mtime, size) and content hash, so only changed files are re-parsed
+    - parsing fans out over a process pool once enough files changed
+    - iter_chunks() streams chunks as workers finish, for HybridSearch.index
+    - `index` maps each path to its chunk texts; `last_removed` holds ids of
+      chunks dropped by the latest scan
+    """
+    def __init__(self, root: str = ".", cache_path: str = None, max_workers: int = None,
+                 batch_size: int = 64, parallel_threshold: int = 256,
+                 catalog: FileCatalog = None):
+        self.root = os.path.abspath(root)
+        self.catalog = catalog or FileCatalog.shared(self.root)
+        self.cache_path = cache_path if cache_path is not None else paths.cache_path(
+            "semantic_index.pkl")
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.parallel_threshold = parallel_threshold
+        self.files: Dict[str, FileEntry] = {}
+        self.index: Dict[str, List[str]] = {}
+        self.last_removed: List[int] = []
+        self.stats: Dict[str, float] = {}
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+        if cached.get("root") == self.root:
+            self.files = cached["files"]
+            self.index = {path: [c.text for c in e.chunks] for path, e in self.files.items()}
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"root": self.root, "files": self.files}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache_path)
+
+    def walk(self) -> Iterator[Tuple[str, int, int]]:
+        """Yields (relative path, mtime_ns, size) for every Python file under root."""
+        for path, (mtime_ns, size) in self.catalog.refresh().items():
+            if path.endswith(".py"):
+                yield path, mtime_ns, size
+
+    def _run_jobs(self, jobs) -> Iterator[Tuple[str, Optional[FileEntry]]]:
+        batches = [jobs[i:i + self.batch_size] for i in range(0, len(jobs), self.batch_size)]
+        if len(jobs) < self.parallel_threshold or self.max_workers == 1:
+            for batch in batches:
+                yield from _index_files(self.root, batch)
+            return
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(_index_files, self.root, batch) for batch in batches]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def iter_chunks(self, changed_only: bool = False) -> Iterator[Chunk]:
+        """
+        Rescans the repository and yields chunks: cached chunks of unchanged
+        files first (unless changed_only), then chunks of new or modified
+        files as they are parsed. The cache is saved once the stream ends.
+        """
+        start = time.perf_counter()
+        seen = set()
+        jobs = []
+        for path, mtime_ns, size in self.walk():
+            seen.add(path)
+            entry = self.files.get(path)
+            if entry and entry.mtime_ns == mtime_ns and entry.size == size:
+                if not changed_only:
+                    yield from entry.chunks
+                continue
+            jobs.append((path, mtime_ns, size, entry.sha1 if entry else None))
+
+        removed: List[int] = []
+        for path in [p for p in self.files if p not in seen]:
+            removed.extend(c.id for c in self.files.pop(path).chunks)
+            self.index.pop(path, None)
+
+        parsed = 0
+        for path, entry in self._run_jobs(jobs):
+            old = self.files.get(path)
+            if entry is None:
+                if old:
+                    removed.extend(c.id for c in old.chunks)
+                    del self.files[path]
+                    self.index.pop(path, None)
+                continue
+            if old and entry.sha1 == old.sha1:
+                # Touched but unchanged: keep the cached chunks.
+                entry.chunks = old.chunks
+                self.files[path] = entry
+                if not changed_only:
+                    yield from entry.chunks
+                continue
+            parsed += 1
+            if old:
+                new_ids = {c.id for c in entry.chunks}
+                removed.extend(c.id for c in old.chunks if c.id not in new_ids)
+            self.files[path] = entry
+            self.index[path] = [c.text for c in entry.chunks]
+            yield from entry.chunks
+
+        self.last_removed = removed
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            "files": len(self.files), "checked": len(jobs), "parsed": parsed,
+            "removed_chunks": len(removed), "seconds": elapsed,
+            "files_per_sec": len(seen) / elapsed if elapsed else 0.0,
+        }
+        self._save_cache()
+
+    def index_repo(self) -> Dict[str, float]:
+        """Brings `index` up to date with the working tree and returns scan stats."""
+        for _ in self.iter_chunks(changed_only=True):
+            pass
+        return self.stats
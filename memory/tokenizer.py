@@ -0,0 +1,40 @@
+"""Code-aware tokenizer shared by the lexical retrieval components."""
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_SUBWORD = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+# Words that carry no signal when matching short natural-language requests.
+STOPWORDS = frozenset({
+    "the", "and", "for", "with", "of", "to", "in", "on", "a", "an", "it", "is", "are", "be",
+    "this", "that", "my", "me", "please", "all", "any", "using", "use", "from", "into", "or",
+    "if", "doesn", "isn", "exist", "return", "results", "run", "can", "you", "could", "would",
+})
+
+
+@lru_cache(maxsize=65536)
+def _identifier_tokens(word: str) -> Tuple[str, ...]:
+    word = word.strip("_")
+    whole = word.lower()
+    if whole == word and "_" not in word:
+        return (whole,) if len(whole) > 1 else ()
+    parts = [part.lower() for part in _SUBWORD.findall(word)]
+    tokens = [whole] if len(whole) > 1 else []
+    if len(parts) > 1:
+        tokens.extend(part for part in parts if len(part) > 1)
+    return tuple(tokens)
+
+
+def code_tokenize(text: str) -> List[str]:
+    """
+    Lower-cased tokens for source code and natural-language queries.
+    Identifiers are kept whole and also split on snake_case and camelCase
+    boundaries, so "parseHTTPResponse" yields "parsehttpresponse", "parse",
+    "http" and "response". Punctuation separates tokens; 1-char pieces are dropped.
+    """
+    tokens: List[str] = []
+    for word in _IDENTIFIER.findall(text):
+        tokens.extend(_identifier_tokens(word))
+    return tokens
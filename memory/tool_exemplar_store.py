@@ -0,0 +1,158 @@
+"""Store of successful tool calls, used to skip the LLM for repeated requests."""
+
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from paths import cache_path
+
+from .tokenizer import STOPWORDS, code_tokenize
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    return frozenset(code_tokenize(query)) - STOPWORDS
+
+
+def _arg_values(args: Dict[str, Any]) -> List[str]:
+    values: List[str] = []
+    for value in args.values():
+        if isinstance(value, dict):
+            values.extend(_arg_values(value))
+        elif isinstance(value, (list, tuple)):
+            values.extend(str(v) for v in value)
+        elif value is not None and not isinstance(value, bool):
+            values.append(str(value))
+    return values
+
+
+@dataclass
+class Exemplar:
+    """
+    A past (query, tool call, result) that succeeded.
+    - latency: seconds the model took to pick the call, saved on each reuse
+    """
+    query: str
+    tool_name: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    result: str = ""
+    latency: float = 0.0
+    hits: int = 0
+    created: float = field(default_factory=time.time)
+
+
+class ToolExemplarStore:
+    """
+    Bounded, persistent exemplar store with an inverted index over query terms.
+    - threshold: Jaccard similarity of query terms (stopwords removed) needed
+      to reuse an exemplar
+    - max_entries: least recently used exemplars are evicted beyond this
+    A match is only reused if every argument value of the stored call also
+    appears in the new query, so "search for foo" is never answered with
+    the call made for "search for bar".
+    """
+    def __init__(self, path: str = None, threshold: float = 0.75, max_entries: int = 1000):
+        self.path = path if path is not None else cache_path("tool_exemplars.json")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Exemplar]" = OrderedDict()
+        self._terms: Dict[str, FrozenSet[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {"lookups": 0, "hits": 0, "saved_latency": 0.0}
+        self._load()
+
+    @property
+    def hit_rate(self) -> float:
+        return self.stats["hits"] / self.stats["lookups"] if self.stats["lookups"] else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(query: str) -> str:
+        return " ".join(query.lower().split())
+
+    def _index(self, key: str, exemplar: Exemplar) -> None:
+        terms = query_terms(exemplar.query)
+        self._entries[key] = exemplar
+        self._terms[key] = terms
+        for term in terms:
+            self._postings.setdefault(term, set()).add(key)
+
+    def _unindex(self, key: str) -> None:
+        self._entries.pop(key, None)
+        for term in self._terms.pop(key, ()):
+            keys = self._postings.get(term)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[term]
+
+    def lookup(self, query: str) -> Optional[Exemplar]:
+        """Best stored exemplar for the query, or None below the threshold."""
+        key = self._key(query)
+        lowered = query.lower()
+        with self._lock:
+            self.stats["lookups"] += 1
+            best, best_score = self._entries.get(key), 1.0
+            if best is None:
+                terms = query_terms(query)
+                candidates = set()
+                for term in terms:
+                    candidates |= self._postings.get(term, set())
+                best_score = 0.0
+                for candidate in candidates:
+                    stored = self._terms[candidate]
+                    score = len(terms & stored) / len(terms | stored)
+                    if score > best_score and all(
+                        v.lower() in lowered for v in _arg_values(self._entries[candidate].args)
+                    ):
+                        best, best_score = self._entries[candidate], score
+            if best is None or best_score < self.threshold:
+                return None
+            self._entries.move_to_end(self._key(best.query))
+            best.hits += 1
+            self.stats["hits"] += 1
+            self.stats["saved_latency"] += best.latency
+            return best
+
+    def add(self, query: str, tool_name: str, args: Dict[str, Any], result: Any = "",
+            latency: float = 0.0) -> None:
+        """Records a successful call and persists the store."""
+        summary = result if isinstance(result, str) else json.dumps(result, default=str)
+        exemplar = Exemplar(query=query, tool_name=tool_name, args=dict(args or {}),
+                            result=summary[:500], latency=latency)
+        key = self._key(query)
+        with self._lock:
+            self._unindex(key)
+            self._index(key, exemplar)
+            while len(self._entries) > self.max_entries:
+                self._unindex(next(iter(self._entries)))
+        self.save()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return
+        for record in records[-self.max_entries:]:
+            exemplar = Exemplar(**record)
+            self._index(self._key(exemplar.query), exemplar)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            records = [asdict(e) for e in self._entries.values()]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(records, f)
+        os.replace(tmp, self.path)
@@ -0,0 +1,244 @@
+"""Persistent trigram index for literal and regex code search."""
+
+import os
+import re
+import time
+import pickle
+import hashlib
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set
+
+import paths
+
+from .file_catalog import FileCatalog
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_constants
+    import sre_parse
+
+# Minified bundles, lockfiles and data dumps are skipped rather than indexed.
+MAX_FILE_BYTES = 1 << 20
+MAX_LINE_CHARS = 300
+
+
+def trigrams(data: bytes) -> FrozenSet[bytes]:
+    """Case-folded (ASCII) byte trigrams of the data."""
+    low = data.lower()
+    return frozenset(low[i:i + 3] for i in range(len(low) - 2))
+
+
+def required_literals(pattern: str, ignore_case: bool = False) -> List[str]:
+    """
+    Literal strings every match of the regex must contain, found from its
+    parse tree. Alternations, classes and optional parts end a literal
+    run; an empty list means the regex gives no usable filter. Non-ASCII
+    runs are dropped when the match may ignore case, as the index only
+    folds ASCII.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except (re.error, OverflowError, RecursionError):
+        return []
+    runs: List[str] = []
+    current: List[str] = []
+
+    def flush() -> None:
+        if current:
+            runs.append("".join(current))
+            current.clear()
+
+    def walk(items) -> None:
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                current.append(chr(av))
+            elif op is sre_constants.SUBPATTERN:
+                walk(av[-1])
+            elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+                # One copy of the repeated part is required, bounded on both sides.
+                flush()
+                walk(av[2])
+                flush()
+            else:
+                flush()
+
+    walk(parsed)
+    flush()
+    folds = ignore_case or "(?" in pattern
+    return [run for run in runs
+            if len(run.encode("utf-8")) >= 3 and (run.isascii() or not folds)]
+
+
+@dataclass
+class Hit:
+    path: str
+    line: int
+    text: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}:{self.text}"
+
+
+@dataclass
+class IndexedFile:
+    mtime_ns: int
+    size: int
+    sha1: str
+    grams: FrozenSet[bytes] = field(default_factory=frozenset)
+    # False for binary or oversized files, remembered so they are not re-read.
+    text: bool = True
+
+
+class TrigramIndex:
+    """
+    Inverted index from byte trigrams to the text files containing them.
+    - catalog: FileCatalog supplying the files (shared with SemanticIndexer)
+    - max_file_bytes: larger files and files with NUL bytes are not indexed
+    update() re-reads only files whose (mtime, size) changed and whose
+    content hash differs; search() intersects the posting lists of the
+    query's trigrams (required literals, for a regex) and verifies the
+    surviving files line by line.
+    """
+    def __init__(self, root: str = ".", cache_path: str = None, catalog: FileCatalog = None,
+                 max_file_bytes: int = MAX_FILE_BYTES):
+        self.root = os.path.abspath(root)
+        self.catalog = catalog or FileCatalog.shared(self.root)
+        self.cache_path = cache_path if cache_path is not None else paths.cache_path(
+            "trigram", hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16] + ".pkl")
+        self.max_file_bytes = max_file_bytes
+        self.files: Dict[str, IndexedFile] = {}
+        self.postings: Dict[bytes, Set[str]] = {}
+        self.stats: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "rb") as f:
+                cached = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return
+        if cached.get("root") == self.root:
+            self.files = cached["files"]
+            for path, entry in self.files.items():
+                for gram in entry.grams:
+                    self.postings.setdefault(gram, set()).add(path)
+
+    def _save_cache(self) -> None:
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump({"root": self.root, "files": self.files}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.cache_path)
+
+    def _unindex(self, path: str) -> None:
+        entry = self.files.pop(path, None)
+        if entry is None:
+            return
+        for gram in entry.grams:
+            paths = self.postings.get(gram)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self.postings[gram]
+
+    def _skip(self, path: str, mtime_ns: int, size: int) -> None:
+        self._unindex(path)
+        self.files[path] = IndexedFile(mtime_ns, size, "", text=False)
+
+    def update(self) -> Dict[str, float]:
+        """Brings the index up to date with the catalog and returns scan stats."""
+        start = time.perf_counter()
+        current = self.catalog.refresh()
+        read = reindexed = 0
+        with self._lock:
+            for path in [p for p in self.files if p not in current]:
+                self._unindex(path)
+            for path, (mtime_ns, size) in current.items():
+                entry = self.files.get(path)
+                if entry and entry.mtime_ns == mtime_ns and entry.size == size:
+                    continue
+                if size > self.max_file_bytes:
+                    self._skip(path, mtime_ns, size)
+                    continue
+                try:
+                    with open(os.path.join(self.root, path), "rb") as f:
+                        data = f.read()
+                except OSError:
+                    self._unindex(path)
+                    continue
+                read += 1
+                if b"\0" in data[:8192]:
+                    self._skip(path, mtime_ns, size)
+                    continue
+                sha1 = hashlib.sha1(data).hexdigest()
+                if entry and entry.sha1 == sha1:
+                    entry.mtime_ns, entry.size = mtime_ns, size
+                    continue
+                self._unindex(path)
+                grams = trigrams(data)
+                self.files[path] = IndexedFile(mtime_ns, size, sha1, grams)
+                for gram in grams:
+                    self.postings.setdefault(gram, set()).add(path)
+                reindexed += 1
+            if read:
+                self._save_cache()
+        self.stats = {"files": len(self.files), "read": read, "reindexed": reindexed,
+                      "trigrams": len(self.postings), "seconds": time.perf_counter() - start}
+        return self.stats
+
+    def candidates(self, literals: List[str]) -> List[str]:
+        """Files containing every trigram of every literal (all files if none)."""
+        grams: Set[bytes] = set()
+        for literal in literals:
+            grams |= trigrams(literal.encode("utf-8"))
+        with self._lock:
+            if not grams:
+                return sorted(p for p, entry in self.files.items() if entry.text)
+            lists = sorted((self.postings.get(g, set()) for g in grams), key=len)
+            found = set(lists[0])
+            for paths in lists[1:]:
+                found &= paths
+                if not found:
+                    break
+        return sorted(found)
+
+    def search(self, query: str, regex: bool = False, ignore_case: bool = False,
+               max_results: int = 100, max_per_file: Optional[int] = None) -> List[Hit]:
+        """
+        file:line hits for the query, in path order, at most max_results.
+        Literal mode matches the query as a plain substring; regex mode uses
+        Python `re` syntax, matched against one line at a time.
+        """
+        flags = re.IGNORECASE if ignore_case else 0
+        if regex:
+            pattern = re.compile(query, flags)
+            literals = required_literals(query, ignore_case)
+        else:
+            pattern = re.compile(re.escape(query), flags)
+            literals = [query] if query.isascii() or not ignore_case else []
+        hits: List[Hit] = []
+        for path in self.candidates(literals):
+            try:
+                with open(os.path.join(self.root, path), encoding="utf-8",
+                          errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+            in_file = 0
+            for number, line in enumerate(lines, 1):
+                if pattern.search(line):
+                    hits.append(Hit(path, number, line[:MAX_LINE_CHARS]))
+                    in_file += 1
+                    if len(hits) >= max_results:
+                        return hits
+                    if max_per_file and in_file >= max_per_file:
+                        break
+        return hits
@@ -1,40 +1,610 @@
 """FAISS vector store for SmallHands."""
 
 import os
-import openai
+import mmap
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
 import faiss
 import numpy as np
-from typing import List, Tuple, Any
+
+from llm.client import shared_client
+from paths import cache_path
+
+from .chunks import content_ids
+
+
+def content_hash(text: str, model: str) -> str:
+    """Cache key for an embedding: the model name plus the exact text."""
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for batch sizing."""
+    return len(text) // 4 + 1
+
+
+class EmbeddingCache:
+    """Persistent content-hash -> vector cache backed by SQLite."""
+    def __init__(self, path: str = None):
+        self.path = path or cache_path("embeddings.sqlite")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit.
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype="float32")
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, np.asarray(vec, dtype="float32").tobytes()) for key, vec in items.items()],
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class EmbeddingPipeline:
+    """
+    Embeds documents in token-budgeted batches, several batches at a time.
+    - max_batch_tokens: estimated token budget per embeddings request
+    - max_batch_size: hard cap on inputs per request
+    - max_workers: number of requests kept in flight concurrently
+    - cache: optional EmbeddingCache; cached texts are never sent to the API
+    - client: None means the shared client, created on the first request
+    """
+    def __init__(self, client: Any, model: str, max_batch_tokens: int = 8000,
+                 max_batch_size: int = 512, max_workers: int = 4,
+                 cache: EmbeddingCache = None):
+        self._client = client
+        self.model = model
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.cache = cache
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            self._client = shared_client().sync
+        return self._client
+
+    def _batches(self, texts: List[str]) -> List[List[str]]:
+        batches: List[List[str]] = []
+        current: List[str] = []
+        budget = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and (budget + tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, budget = [], 0
+            current.append(text)
+            budget += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        resp = self.client.embeddings.create(input=batch, model=self.model)
+        return [item.embedding for item in sorted(resp.data, key=lambda item: item.index)]
+
+    def embed(self, docs: List[str]) -> np.ndarray:
+        """Returns a (len(docs), dim) float32 array, reusing cached vectors."""
+        keys = [content_hash(doc, self.model) for doc in docs]
+        vectors: Dict[str, np.ndarray] = {}
+        if self.cache is not None:
+            vectors = self.cache.get_many(list(set(keys)))
+
+        missing: Dict[str, str] = {}
+        for key, doc in zip(keys, docs):
+            if key not in vectors:
+                missing[key] = doc
+        if missing:
+            batches = self._batches(list(missing.values()))
+            if len(batches) == 1 or self.max_workers <= 1:
+                embedded = [self._embed_batch(batch) for batch in batches]
+            else:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    embedded = list(pool.map(self._embed_batch, batches))
+            fresh = {
+                key: np.asarray(vec, dtype="float32")
+                for key, vec in zip(missing.keys(), (vec for batch in embedded for vec in batch))
+            }
+            if self.cache is not None:
+                self.cache.put_many(fresh)
+            vectors.update(fresh)
+
+        if not docs:
+            return np.zeros((0, 0), dtype="float32")
+        return np.stack([vectors[key] for key in keys]).astype("float32", copy=False)
+
+
+_DOC_TABLE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+
+
+def _atomic_replace(tmp_path: str, path: str) -> None:
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class DocStore:
+    """
+    Chunk-id -> text mapping persisted next to the FAISS index.
+    - docs.bin: UTF-8 texts stored back to back, memory-mapped on load
+    - docs.npy: (id, offset, length) rows sorted by id, memory-mapped on load
+    Adds and removals are held in memory until save() rewrites both files.
+    """
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self._table = np.zeros(0, dtype=_DOC_TABLE)
+        self._blob: Optional[mmap.mmap] = None
+        self._added: Dict[int, str] = {}
+        self._removed: set = set()
+
+    def load(self) -> None:
+        table_path = os.path.join(self.directory, "docs.npy")
+        blob_path = os.path.join(self.directory, "docs.bin")
+        if not os.path.exists(table_path):
+            return
+        self._table = np.load(table_path, mmap_mode="r")
+        if os.path.getsize(blob_path):
+            with open(blob_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _base_row(self, chunk_id: int) -> int:
+        pos = int(np.searchsorted(self._table["id"], chunk_id))
+        if pos < len(self._table) and self._table["id"][pos] == chunk_id:
+            return pos
+        return -1
+
+    def get(self, chunk_id: int) -> Optional[str]:
+        chunk_id = int(chunk_id)
+        if chunk_id in self._added:
+            return self._added[chunk_id]
+        if chunk_id in self._removed:
+            return None
+        row = self._base_row(chunk_id)
+        if row < 0:
+            return None
+        _, offset, length = self._table[row]
+        if length == 0:
+            return ""  # docs.bin is empty (and not mapped) when every text is
+        return self._blob[offset:offset + length].decode("utf-8")
+
+    def __contains__(self, chunk_id: int) -> bool:
+        chunk_id = int(chunk_id)
+        if chunk_id in self._added:
+            return True
+        return chunk_id not in self._removed and self._base_row(chunk_id) >= 0
+
+    def id_array(self) -> np.ndarray:
+        """Sorted int64 array of the stored chunk ids."""
+        ids = np.asarray(self._table["id"], dtype="int64")
+        if self._removed:
+            ids = ids[~np.isin(ids, np.fromiter(self._removed, "int64", len(self._removed)))]
+        if self._added:
+            ids = np.union1d(ids, np.fromiter(self._added, "int64", len(self._added)))
+        return ids
+
+    def ids(self) -> List[int]:
+        return self.id_array().tolist()
+
+    def __len__(self) -> int:
+        return int(self.id_array().size)
+
+    def put(self, chunk_id: int, text: str) -> None:
+        self._added[int(chunk_id)] = text
+
+    def remove(self, chunk_id: int) -> None:
+        chunk_id = int(chunk_id)
+        self._added.pop(chunk_id, None)
+        if self._base_row(chunk_id) >= 0:
+            self._removed.add(chunk_id)
+
+    def clear(self) -> None:
+        self._table = np.zeros(0, dtype=_DOC_TABLE)
+        self._blob = None
+        self._added.clear()
+        self._removed.clear()
+
+    def save(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        table_path = os.path.join(self.directory, "docs.npy")
+        blob_path = os.path.join(self.directory, "docs.bin")
+        ids = self.ids()
+        table = np.zeros(len(ids), dtype=_DOC_TABLE)
+        offset = 0
+        with open(blob_path + ".tmp", "wb") as out:
+            for row, chunk_id in enumerate(ids):
+                data = self.get(chunk_id).encode("utf-8")
+                out.write(data)
+                table[row] = (chunk_id, offset, len(data))
+                offset += len(data)
+        with open(table_path + ".tmp", "wb") as out:
+            np.save(out, table)
+        _atomic_replace(blob_path + ".tmp", blob_path)
+        _atomic_replace(table_path + ".tmp", table_path)
+        self.clear()
+        self.load()
+
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+# Corpus sizes at which index_type="auto" moves to the next index type.
+AUTO_FLAT_MAX = 20_000
+AUTO_HNSW_MAX = 200_000
+
+
+def choose_index_type(n: int) -> str:
+    """Index type used by index_type="auto" for a corpus of n vectors."""
+    if n < AUTO_FLAT_MAX:
+        return "flat"
+    if n < AUTO_HNSW_MAX:
+        return "hnsw"
+    return "ivf_pq"
+
+
+def _default_pq_m(dim: int) -> int:
+    # Largest divisor of dim giving sub-vectors of at least 16 dimensions.
+    for m in range(max(dim // 16, 1), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def ivf_nlist(kind: str, n: int, nlist: int = None, pq_nbits: int = 8) -> int:
+    """IVF lists to train for n vectors; 0 when n is too small to train `kind` at all."""
+    nlist = nlist or max(1, int(4 * np.sqrt(n)))
+    nlist = min(nlist, n // 39)
+    if kind == "ivf_pq" and n < 39 * 2 ** pq_nbits:
+        return 0
+    return max(nlist, 0)
+
+
+def create_faiss_index(kind: str, vectors: np.ndarray, nlist: int = None,
+                       hnsw_m: int = 32, ef_construction: int = 80,
+                       pq_m: int = None, pq_nbits: int = 8):
+    """
+    Creates and trains an empty id-addressable index of the given kind.
+    IVF indexes store ids natively; flat and HNSW are wrapped in IndexIDMap2.
+    Falls back to flat when there are too few vectors to train on.
+    """
+    n, dim = vectors.shape
+    if kind in ("ivf_flat", "ivf_pq"):
+        nlist = ivf_nlist(kind, n, nlist, pq_nbits)
+        if nlist < 1:
+            print(f"Too few vectors ({n}) to train {kind}; using a flat index.")
+            return create_faiss_index("flat", vectors)
+        quantizer = faiss.IndexFlatL2(dim)
+        if kind == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m or _default_pq_m(dim), pq_nbits)
+        index.train(vectors)
+        return index
+    if kind == "hnsw":
+        inner = faiss.IndexHNSWFlat(dim, hnsw_m)
+        inner.hnsw.efConstruction = ef_construction
+        return faiss.IndexIDMap2(inner)
+    if kind == "flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatL2(dim))
+    raise ValueError(f"Unknown index type: {kind}")
+
+
+def index_type_of(index) -> str:
+    """Recovers the index type name from a (possibly loaded) FAISS index."""
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSWFlat):
+        return "hnsw"
+    return "flat"
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None) -> None:
+    """Applies query-time knobs (IVF nprobe, HNSW efSearch) where they exist."""
+    if isinstance(index, faiss.IndexIDMap2):
+        index = faiss.downcast_index(index.index)
+    if nprobe is not None and isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe
+    if ef_search is not None and isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
 
 class FaissVectorStore:
-    def __init__(self, model: str = "text-embedding-ada-002"):
-        self.client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
+    """
+    Embedding index keyed by chunk id.
+    - index_type: "flat", "ivf_flat", "hnsw", "ivf_pq" or "auto" (by corpus size)
+    - nprobe / ef_search: recall-vs-latency knobs for IVF and HNSW
+    Vectors are L2-normalised, so every index type returns squared L2
+    distances in [0, 4] and similarity() maps them onto the same [0, 1] scale.
+    The index and its DocStore are written to index_dir by save() and read
+    back lazily on first use; pass index_dir="" to keep them in memory only.
+    HNSW cannot delete vectors, so there each vector gets its own internal
+    label (saved as labels.npy) and only current labels map to chunk ids; a
+    replaced or removed chunk's old vector is skipped until the next rebuild.
+    Without a client, the shared one is only created when the first
+    uncached text needs embedding.
+    """
+    def __init__(self, model: str = "text-embedding-ada-002", client: Any = None,
+                 cache: EmbeddingCache = None, max_batch_tokens: int = 8000,
+                 max_workers: int = 4, index_dir: str = None, index_type: str = "auto",
+                 nlist: int = None, nprobe: int = 16, hnsw_m: int = 32,
+                 ef_search: int = 64, ef_construction: int = 80,
+                 pq_m: int = None, pq_nbits: int = 8):
+        if index_type != "auto" and index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}")
         self.model = model
+        self.cache = cache if cache is not None else EmbeddingCache()
+        self.pipeline = EmbeddingPipeline(
+            client, model, max_batch_tokens=max_batch_tokens,
+            max_workers=max_workers, cache=self.cache,
+        )
+        if index_dir is None:
+            index_dir = cache_path("faiss")
+        self.index_dir = index_dir
+        self.index_type = index_type
+        self.index_params = dict(nlist=nlist, hnsw_m=hnsw_m, ef_construction=ef_construction,
+                                 pq_m=pq_m, pq_nbits=pq_nbits)
+        self.nprobe = nprobe
+        self.ef_search = ef_search
         self.index = None
-        self.id_to_doc: List[str] = []
-
-    def build_index(self, docs: List[str]) -> None:
-        """Embed and index a list of documents."""
-        embeddings: List[List[float]] = []
-        for doc in docs:
-            resp = self.client.embeddings.create(input=doc, model=self.model)
-            emb = resp.data[0].embedding
-            embeddings.append(emb)
-            self.id_to_doc.append(doc)
-        arr = np.array(embeddings, dtype="float32")
-        dim = arr.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(arr)
+        self.index_kind = None
+        self.id_to_doc = DocStore(self.index_dir)
+        # HNSW cannot delete vectors; removed ids stay in the graph until rebuild.
+        self._stale = 0
+        self._chunk_of: Dict[int, int] = {}
+        self._label_of: Dict[int, int] = {}
+        self._next_label = 0
+        self._loaded = False
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
-        """Embed query and return top_k (doc, distance)."""
+    @property
+    def client(self) -> Any:
+        return self.pipeline.client
+
+    @staticmethod
+    def similarity(distance: float) -> float:
+        """Maps a squared L2 distance between unit vectors to [0, 1] ((1 + cos) / 2)."""
+        return min(1.0, max(0.0, 1.0 - distance / 4.0))
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.index_dir:
+            return
+        index_path = os.path.join(self.index_dir, "index.faiss")
+        if os.path.exists(index_path):
+            self.index = faiss.read_index(index_path)
+            self.index_kind = index_type_of(self.index)
+            self.id_to_doc.load()
+            if self.index_kind == "hnsw":
+                self._load_labels()
+                self._stale = self.index.ntotal - len(self._chunk_of)
+            else:
+                self._stale = self.index.ntotal - len(self.id_to_doc)
+            set_search_params(self.index, self.nprobe, self.ef_search)
+
+    def _load_labels(self) -> None:
+        labels_path = os.path.join(self.index_dir, "labels.npy")
+        if os.path.exists(labels_path):
+            pairs = np.load(labels_path)
+            self._chunk_of = {int(label): int(chunk) for label, chunk in pairs}
+        else:
+            # Written before internal labels: every label is its chunk id.
+            self._chunk_of = {i: i for i in self.id_to_doc.ids()}
+        self._label_of = {chunk: label for label, chunk in self._chunk_of.items()}
+        used = faiss.vector_to_array(self.index.id_map)
+        self._next_label = int(used.max()) + 1 if len(used) else 0
+
+    def _labels_for(self, ids: List[int]) -> np.ndarray:
+        """FAISS labels for new vectors of these chunks."""
+        if self.index_kind != "hnsw":
+            return np.asarray(ids, dtype="int64")
+        labels = np.arange(self._next_label, self._next_label + len(ids), dtype="int64")
+        self._next_label += len(ids)
+        for chunk_id, label in zip(ids, labels.tolist()):
+            self._label_of[chunk_id] = label
+            self._chunk_of[label] = chunk_id
+        return labels
+
+    def _wanted_kind(self, n: int) -> str:
+        return choose_index_type(n) if self.index_type == "auto" else self.index_type
+
+    def _embed(self, docs: List[str]) -> np.ndarray:
+        arr = np.ascontiguousarray(self.pipeline.embed(docs), dtype="float32")
+        faiss.normalize_L2(arr)
+        return arr
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return 0 if self.index is None else self.index.ntotal - self._stale
+
+    def add_documents(self, ids: Iterable[int], docs: List[str]) -> None:
+        """Embeds and adds docs under the given chunk ids, replacing existing entries."""
+        self._ensure_loaded()
+        ids = [int(i) for i in ids]
+        if not docs:
+            return
+        self._add_vectors(ids, docs, self._embed(docs))
+
+    def _add_vectors(self, ids: List[int], docs: List[str], arr: np.ndarray) -> None:
+        if self.index is None:
+            self._set_index(self._wanted_kind(len(docs)), arr)
+        self.remove_ids([i for i in ids if i in self.id_to_doc])
+        self.index.add_with_ids(arr, self._labels_for(ids))
+        for chunk_id, doc in zip(ids, docs):
+            self.id_to_doc.put(chunk_id, doc)
+
+    def _set_index(self, kind: str, training: np.ndarray) -> None:
+        self.index = create_faiss_index(kind, training, **self.index_params)
+        self.index_kind = index_type_of(self.index)
+        self._stale = 0
+        self._chunk_of, self._label_of, self._next_label = {}, {}, 0
+        set_search_params(self.index, self.nprobe, self.ef_search)
+
+    def remove_ids(self, ids: Iterable[int]) -> None:
+        """Drops chunks from the index and the doc mapping."""
+        self._ensure_loaded()
+        ids = [int(i) for i in ids]
+        if not ids or self.index is None:
+            return
+        if self.index_kind == "hnsw":
+            for chunk_id in ids:
+                label = self._label_of.pop(chunk_id, None)
+                if label is not None:
+                    del self._chunk_of[label]
+                    self._stale += 1
+        else:
+            self.index.remove_ids(np.asarray(ids, dtype="int64"))
+        for chunk_id in ids:
+            self.id_to_doc.remove(chunk_id)
+
+    def rebuild(self, kind: str = None) -> None:
+        """Re-creates and retrains the index from the stored docs (vectors come from the cache)."""
+        self._ensure_loaded()
+        ids = self.id_to_doc.ids()
+        if not ids:
+            self.index, self.index_kind, self._stale = None, None, 0
+            return
+        arr = self._embed([self.id_to_doc.get(i) for i in ids])
+        self._set_index(kind or self._wanted_kind(len(ids)), arr)
+        self.index.add_with_ids(arr, self._labels_for(ids))
+
+    def _needs_rebuild(self) -> bool:
+        if self.index is None:
+            return False
+        n = len(self)
+        if self._stale > 0.25 * max(self.index.ntotal, 1):
+            return True
+        if self.index_type == "auto":
+            return choose_index_type(n) != self.index_kind
+        # An explicit IVF type falls back to flat while too small to train; retrain once it can.
+        return self.index_kind != self.index_type and ivf_nlist(
+            self.index_type, n, self.index_params["nlist"], self.index_params["pq_nbits"]) >= 1
+
+    def upsert(self, ids: Iterable[int], docs: List[str]) -> None:
+        """Adds chunks that are missing or whose stored text differs; skips the rest."""
+        self._ensure_loaded()
+        fresh = [(int(i), doc) for i, doc in zip(ids, docs) if self.id_to_doc.get(i) != doc]
+        if fresh:
+            fresh_ids = [i for i, _ in fresh]
+            fresh_docs = [doc for _, doc in fresh]
+            self._add_vectors(fresh_ids, fresh_docs, self._embed(fresh_docs))
+
+    def retain(self, ids: Iterable[int]) -> None:
+        """Removes every chunk whose id is not in `ids`."""
+        self._ensure_loaded()
+        keep = np.fromiter((int(i) for i in ids), dtype="int64")
+        self.remove_ids(np.setdiff1d(self.id_to_doc.id_array(), keep).tolist())
+
+    def flush(self) -> None:
+        """Retrains if the corpus outgrew its index type, then saves."""
+        if self._needs_rebuild():
+            self.rebuild()
+        if self.index_dir:
+            self.save()
+
+    def build_index(self, docs: List[str], ids: List[int] = None) -> None:
+        """
+        Makes the index hold exactly `docs`. Chunks that are already indexed
+        under the same id are kept, stale ones are removed, and only new ones
+        are embedded and added. Without explicit ids, ids derive from content.
+        The index is retrained when the corpus outgrows its index type.
+        """
+        if ids is None:
+            ids = content_ids(docs)
+        self.retain(ids)
+        self.upsert(ids, docs)
+        self.flush()
+
+    def save(self) -> None:
+        """Atomically writes the index and doc mapping to index_dir."""
+        self._ensure_loaded()
         if self.index is None:
+            return
+        os.makedirs(self.index_dir, exist_ok=True)
+        index_path = os.path.join(self.index_dir, "index.faiss")
+        faiss.write_index(self.index, index_path + ".tmp")
+        labels_path = os.path.join(self.index_dir, "labels.npy")
+        if self.index_kind == "hnsw":
+            pairs = np.array(list(self._chunk_of.items()), dtype="int64").reshape(-1, 2)
+            with open(labels_path + ".tmp", "wb") as out:
+                np.save(out, pairs)
+            _atomic_replace(labels_path + ".tmp", labels_path)
+        elif os.path.exists(labels_path):
+            os.remove(labels_path)
+        _atomic_replace(index_path + ".tmp", index_path)
+        self.id_to_doc.save()
+
+    def score_ids(self, query: str, ids: Iterable[int]) -> List[Tuple[int, float]]:
+        """Exact (chunk_id, squared L2 distance) for the given chunks only, from cached vectors."""
+        self._ensure_loaded()
+        ids = [int(i) for i in ids if i in self.id_to_doc]
+        if not ids:
+            return []
+        q_vec = self._embed([query])[0]
+        vectors = self._embed([self.id_to_doc.get(i) for i in ids])
+        distances = ((vectors - q_vec) ** 2).sum(axis=1)
+        return list(zip(ids, distances.tolist()))
+
+    def search_ids(self, query: str, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Embed query and return top_k (chunk_id, squared L2 distance)."""
+        self._ensure_loaded()
+        if self.index is None or self.index.ntotal == 0:
             return []
-        resp = self.client.embeddings.create(input=query, model=self.model)
-        q_emb = resp.data[0].embedding
-        q_arr = np.array([q_emb], dtype="float32")
-        distances, idxs = self.index.search(q_arr, top_k)
-        results: List[Tuple[str, float]] = []
-        for dist, idx in zip(distances[0], idxs[0]):
-            results.append((self.id_to_doc[idx], float(dist)))
-        return results
+        q_arr = self._embed([query])
+        # Over-fetch so removed HNSW entries and duplicates can be filtered out.
+        fetch = top_k + min(self._stale, 4 * top_k)
+        distances, labels = self.index.search(q_arr, fetch)
+        results: List[Tuple[int, float]] = []
+        seen = set()
+        hnsw = self.index_kind == "hnsw"
+        for dist, label in zip(distances[0], labels[0]):
+            label = int(label)
+            if label < 0:
+                continue
+            chunk_id = self._chunk_of.get(label) if hnsw else label
+            if chunk_id is None or chunk_id in seen:
+                continue
+            seen.add(chunk_id)
+            results.append((chunk_id, float(dist)))
+        return results[:top_k]
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """Embed query and return top_k (doc, squared L2 distance)."""
+        return [
+            (self.id_to_doc.get(chunk_id), dist)
+            for chunk_id, dist in self.search_ids(query, top_k)
+        ]
@@ -0,0 +1,184 @@
+"""Input/output validation and security checks for SmallHands."""
+
+import re
+from dataclasses import dataclass
+from typing import Any, List, Pattern, Sequence, Tuple
+
+BLOCK = "block"
+REDACT = "redact"
+WARN = "warn"
+
+
+class GuardrailViolation(ValueError):
+    """Raised when text matches a blocking guardrail rule."""
+    def __init__(self, findings: List["Finding"]):
+        self.findings = findings
+        super().__init__("Guardrail violation: " + ", ".join(f.rule for f in findings))
+
+
+@dataclass(frozen=True)
+class Rule:
+    """
+    One compiled check.
+    - triggers: lowercase substrings at least one of which every match
+      contains; the regex only runs when a trigger is present, so clean
+      text costs a few substring scans
+    - action: BLOCK raises, REDACT masks the match, WARN only reports it
+    """
+    name: str
+    pattern: Pattern[str]
+    action: str
+    triggers: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Finding:
+    rule: str
+    action: str
+    start: int
+    end: int
+
+
+def rule(name: str, pattern: str, action: str, triggers: Sequence[str], flags: int = 0) -> Rule:
+    return Rule(name, re.compile(pattern, flags), action, tuple(t.lower() for t in triggers))
+
+
+SECRET_RULES = [
+    rule("aws_access_key", r"\b(?:AKIA|ASIA)[0-9A-Z]{16}\b", REDACT, ["akia", "asia"]),
+    rule("openai_key", r"\bsk-(?:proj-)?[A-Za-z0-9_-]{20,}", REDACT, ["sk-"]),
+    rule("github_token", r"\bgh[pousr]_[A-Za-z0-9]{36,}\b", REDACT,
+         ["ghp_", "gho_", "ghu_", "ghs_", "ghr_"]),
+    rule("private_key", r"-----BEGIN (?:[A-Z]+ )?PRIVATE KEY-----[\s\S]*?"
+         r"(?:-----END (?:[A-Z]+ )?PRIVATE KEY-----|\Z)", REDACT, ["private key-----"]),
+    rule("bearer_token", r"(?i)\bbearer\s+[A-Za-z0-9._~+/-]{20,}=*", REDACT, ["bearer"]),
+]
+PII_RULES = [
+    rule("email", r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b", REDACT, ["@"]),
+]
+INPUT_RULES = [
+    rule("prompt_injection",
+         r"\b(?:ignore|disregard|forget)\s+(?:all\s+|any\s+)?(?:the\s+)?(?:previous|prior|above)"
+         r"\s+(?:instructions|prompts?|rules)", BLOCK, ["ignore", "disregard", "forget"], re.I),
+    rule("system_prompt_leak", r"\b(?:reveal|print|show)\s+(?:your\s+|the\s+)?system\s+prompt",
+         BLOCK, ["system prompt"], re.I),
+]
+# Destructive or remote-code commands in generated code and tool arguments.
+COMMAND_RULES = [
+    rule("rm_root",
+         r"\brm\s+(?:-[a-zA-Z]*[rf][a-zA-Z]*\s+)+(?:--no-preserve-root\s+)?(?:/|~)(?:\s|$)",
+         BLOCK, ["rm "]),
+    rule("pipe_to_shell", r"\b(?:curl|wget)\b[^\n|]*\|\s*(?:sudo\s+)?(?:ba|z)?sh\b", BLOCK,
+         ["curl", "wget"]),
+    rule("disk_wipe", r"\b(?:mkfs(?:\.\w+)?\s+/dev/|dd\s+[^\n]*\bof=/dev/(?:sd|nvme|hd))", BLOCK,
+         ["mkfs", "of=/dev/"]),
+    rule("fork_bomb", r":\(\)\s*\{\s*:\|:&\s*\};:", BLOCK, [":|:&"]),
+    rule("chmod_world_root", r"\bchmod\s+-R\s+777\s+/(?:\s|$)", BLOCK, ["chmod"]),
+]
+LICENSE_RULES = [
+    rule("copyleft_license", r"GNU (?:Affero |Lesser )?General Public License", WARN,
+         ["general public license"]),
+]
+
+
+def scan(text: str, rules: Sequence[Rule]) -> List[Finding]:
+    """All matches of the rules in text, checking triggers before any regex."""
+    if not text:
+        return []
+    lowered = text.lower()
+    findings: List[Finding] = []
+    for r in rules:
+        if not any(t in lowered for t in r.triggers):
+            continue
+        findings.extend(Finding(r.name, r.action, m.start(), m.end())
+                        for m in r.pattern.finditer(text))
+    return findings
+
+
+def redact(text: str, rules: Sequence[Rule] = tuple(SECRET_RULES + PII_RULES)) -> str:
+    """text with every REDACT match replaced by [REDACTED:<rule>]."""
+    findings = [f for f in scan(text, rules) if f.action == REDACT]
+    if not findings:
+        return text
+    out, last = [], 0
+    for f in sorted(findings, key=lambda f: f.start):
+        if f.start < last:
+            continue
+        out.append(text[last:f.start])
+        out.append(f"[REDACTED:{f.rule}]")
+        last = f.end
+    out.append(text[last:])
+    return "".join(out)
+
+
+class Guardrails:
+    """
+    Validates user input, tool calls and outputs with precompiled rules.
+    - max_input_chars: longer inputs are rejected
+    - redact_outputs: mask secrets in tool outputs instead of passing them on
+    Checks on clean text cost microseconds: a rule's regex only runs when
+    one of its trigger substrings occurs.
+    """
+    def __init__(self, max_input_chars: int = 20000, redact_outputs: bool = True,
+                 extra_rules: Sequence[Rule] = ()):
+        self.max_input_chars = max_input_chars
+        self.redact_outputs = redact_outputs
+        self.input_rules = INPUT_RULES + [r for r in extra_rules if r.action == BLOCK]
+        self.call_rules = COMMAND_RULES + list(extra_rules)
+        self.output_rules = SECRET_RULES + LICENSE_RULES
+        self.last_findings: List[Finding] = []
+
+    def _enforce(self, findings: List[Finding]) -> None:
+        self.last_findings = findings
+        blocked = [f for f in findings if f.action == BLOCK]
+        if blocked:
+            raise GuardrailViolation(blocked)
+
+    def validate_input(self, text: str) -> str:
+        """Returns the input, or raises GuardrailViolation."""
+        if len(text) > self.max_input_chars:
+            raise GuardrailViolation([Finding("input_too_long", BLOCK, self.max_input_chars,
+                                              len(text))])
+        self._enforce(scan(text, self.input_rules))
+        return text
+
+    def validate_tool_call(self, tool_name: str, args: Any) -> None:
+        """Raises GuardrailViolation if any string argument holds a blocked command."""
+        findings: List[Finding] = []
+        for value in _strings(args):
+            findings.extend(scan(value, self.call_rules))
+        self._enforce(findings)
+
+    def validate_output(self, result: Any) -> Any:
+        """
+        Returns the result with secrets redacted (strings inside dicts and
+        lists included); license and other WARN findings are left in
+        last_findings.
+        """
+        findings: List[Finding] = []
+
+        def check(value: Any) -> Any:
+            if isinstance(value, str):
+                found = scan(value, self.output_rules)
+                findings.extend(found)
+                if self.redact_outputs and any(f.action == REDACT for f in found):
+                    return redact(value, self.output_rules)
+                return value
+            if isinstance(value, dict):
+                return {k: check(v) for k, v in value.items()}
+            if isinstance(value, list):
+                return [check(v) for v in value]
+            return value
+
+        checked = check(result)
+        self._enforce(findings)
+        return checked
+
+
+def _strings(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        return [s for v in value.values() for s in _strings(v)]
+    if isinstance(value, (list, tuple)):
+        return [s for v in value for s in _strings(v)]
+    return []
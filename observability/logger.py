@@ -0,0 +1,253 @@
+"""Structured JSON logging and span tracing for SmallHands."""
+
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from paths import cache_path
+
+from .guardrails import redact
+
+_active: Optional["Logger"] = None
+_current: ContextVar[Any] = ContextVar("smallhands_span", default=None)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class _Unsampled(_NoopSpan):
+    """Root of a trace that lost the sampling draw; its children are no-ops too."""
+    __slots__ = ("_token",)
+
+    def __enter__(self) -> "_Unsampled":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc: Any) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+class Span:
+    """A timed region; attributes set on it end up in the trace event's args."""
+    __slots__ = ("logger", "name", "attrs", "start_ns", "_token")
+
+    def __init__(self, logger: "Logger", name: str, attrs: Dict[str, Any]):
+        self.logger = logger
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> bool:
+        end_ns = time.perf_counter_ns()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.logger._enqueue(("span", self.name, self.start_ns, end_ns,
+                              threading.get_ident(), self.attrs))
+        return False
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+
+class Logger:
+    """
+    Structured JSON logger with span tracing. The caller only enqueues;
+    a background thread serializes, redacts secrets and PII, and writes.
+    - path: JSONL event log (default .smallhands/logs/<name>.jsonl)
+    - trace_path: Chrome trace event file, viewable in chrome://tracing or
+      Perfetto (default .smallhands/traces/<name>-<pid>.json); "" disables
+    - sample_rate: share of root spans traced (SMALLHANDS_TRACE_SAMPLE);
+      children follow their root, unsampled spans cost a context lookup
+    - max_queue: events beyond this many pending are dropped and counted,
+      so a slow disk never blocks the agent
+    The first Logger created becomes the process default used by span().
+    """
+    def __init__(self, name: str = "smallhands", path: str = None, trace_path: str = None,
+                 sample_rate: float = None, max_queue: int = 100_000,
+                 flush_interval: float = 0.5, install: bool = True):
+        self.name = name
+        self.path = path if path is not None else cache_path("logs", f"{name}.jsonl")
+        self.trace_path = trace_path if trace_path is not None else cache_path(
+            "traces", f"{name}-{os.getpid()}.json")
+        if sample_rate is None:
+            sample_rate = float(os.getenv("SMALLHANDS_TRACE_SAMPLE", "1.0"))
+        self.sample_rate = sample_rate
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.span_totals: Dict[str, List[float]] = {}
+        self._totals_lock = threading.Lock()
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._pid = os.getpid()
+        self._origin_ns = time.perf_counter_ns()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name=f"logger-{name}",
+                                        daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+        global _active
+        if install and _active is None:
+            _active = self
+
+    def _enqueue(self, item: tuple) -> None:
+        if self._closed or self._queue.qsize() >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.put(item)
+
+    def log(self, event: str, **fields: Any) -> None:
+        """Records an event; fields are serialized (and redacted) off the calling thread."""
+        self._enqueue(("log", event, time.time(), fields))
+
+    def span(self, name: str, **attrs: Any):
+        parent = _current.get()
+        if isinstance(parent, _Unsampled):
+            return _NOOP
+        if parent is None and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return _Unsampled()
+        return Span(self, name, attrs)
+
+    def record_span(self, name: str, start: float, end: float, **attrs: Any) -> None:
+        """Adds a span measured elsewhere, from time.perf_counter() start and end."""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self._enqueue(("span", name, int(start * 1e9), int(end * 1e9),
+                       threading.get_ident(), attrs))
+
+    def _open(self, path: str):
+        if not path:
+            return None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return open(path, "a", encoding="utf-8")
+
+    def _write_loop(self) -> None:
+        log_file = self._open(self.path)
+        trace_file = self._open(self.trace_path)
+        if trace_file is not None and trace_file.tell() == 0:
+            # The closing "]" is optional in the Chrome trace format, so a crash keeps it valid.
+            trace_file.write("[\n")
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            flushed = []
+            for item in batch:
+                if item is None:
+                    running = False
+                elif item[0] == "flush":
+                    flushed.append(item[1])
+                elif item[0] == "log":
+                    _, event, ts, fields = item
+                    record = {"ts": ts, "logger": self.name, "event": event, **fields}
+                    if log_file is not None:
+                        log_file.write(redact(json.dumps(record, default=str)) + "\n")
+                else:
+                    self._write_span(trace_file, *item[1:])
+            for f in (log_file, trace_file):
+                if f is not None:
+                    f.flush()
+            for done in flushed:
+                done.set()
+        for f in (log_file, trace_file):
+            if f is not None:
+                f.close()
+
+    def _write_span(self, trace_file, name: str, start_ns: int, end_ns: int, tid: int,
+                    attrs: Dict[str, Any]) -> None:
+        duration = (end_ns - start_ns) / 1e9
+        with self._totals_lock:
+            totals = self.span_totals.setdefault(name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += duration
+        if trace_file is None:
+            return
+        event = {"name": name, "cat": name.split(".", 1)[0], "ph": "X",
+                 "ts": (start_ns - self._origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000,
+                 "pid": self._pid, "tid": tid, "args": attrs}
+        trace_file.write(redact(json.dumps(event, default=str)) + ",\n")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per span name: count, total and mean seconds of the spans recorded so far."""
+        self.flush()
+        with self._totals_lock:
+            totals = [(name, n, total) for name, (n, total) in self.span_totals.items()]
+        return {name: {"count": n, "total": total, "mean": total / n}
+                for name, n, total in sorted(totals)}
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Waits until everything enqueued so far has been written."""
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+
+    def close(self) -> None:
+        global _active
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._closed = True
+        self._writer.join(timeout=5.0)
+        if _active is self:
+            _active = None
+
+
+def get_logger() -> Optional[Logger]:
+    return _active
+
+
+def span(name: str, **attrs: Any):
+    """
+    Context manager timing a region under the process default Logger.
+    A no-op when no Logger exists, so library code can call it freely.
+    """
+    logger = _active
+    if logger is None:
+        return _NOOP
+    return logger.span(name, **attrs)
+
+
+def record_span(name: str, start: float, end: float, **attrs: Any) -> None:
+    logger = _active
+    if logger is not None:
+        logger.record_span(name, start, end, **attrs)
+
+
+def log(event: str, **fields: Any) -> None:
+    """Logs an event to the process default Logger; a no-op without one."""
+    logger = _active
+    if logger is not None:
+        logger.log(event, **fields)
@@ -0,0 +1,17 @@
+"""
+Where SmallHands keeps its on-disk state: caches, indexes, logs and the
+daemon socket all live under one directory, SMALLHANDS_CACHE_DIR (default
+.smallhands in the working directory). The variable is read on every call,
+so setting it before the first cache is opened is enough.
+"""
+
+import os
+
+
+def cache_dir() -> str:
+    return os.getenv("SMALLHANDS_CACHE_DIR", ".smallhands")
+
+
+def cache_path(*parts: str) -> str:
+    """A path under the cache directory."""
+    return os.path.join(cache_dir(), *parts)
@@ -0,0 +1,299 @@
+"""Pool of reusable, incrementally re-synced sandbox workspaces."""
+
+import os
+import fcntl
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import List, Optional
+
+from observability.logger import span
+
+STRATEGIES = ("auto", "rsync", "reflink", "hardlink", "overlay", "worktree")
+EXCLUDES = [".git", ".smallhands"]
+
+
+@dataclass
+class Workspace:
+    """One pooled sandbox directory and the state needed to reset it."""
+    path: str
+    root: str
+    lock_fd: int
+    synced: bool = False
+    mounted: bool = False
+
+
+def _overlay_supported() -> bool:
+    if shutil.which("fuse-overlayfs"):
+        return True
+    if os.geteuid() != 0:
+        return False
+    try:
+        with open("/proc/filesystems") as f:
+            return any(line.split()[-1] == "overlay" for line in f if line.strip())
+    except OSError:
+        return False
+
+
+def _python_sync(src: str, dst: str, link: bool = False) -> None:
+    """
+    rsync -a --delete equivalent used when rsync is not installed: copies
+    files whose size or mtime differ, removes extras, and with link=True
+    hardlinks files instead of copying them.
+    """
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDES]
+        rel = os.path.relpath(dirpath, src)
+        target_dir = os.path.normpath(os.path.join(dst, rel))
+        os.makedirs(target_dir, exist_ok=True)
+        wanted = set(dirnames) | set(filenames)
+        for name in os.listdir(target_dir):
+            if name not in wanted and not (rel == "." and name in EXCLUDES):
+                path = os.path.join(target_dir, name)
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.unlink(path)
+        for name in filenames:
+            s_path = os.path.join(dirpath, name)
+            d_path = os.path.join(target_dir, name)
+            s_stat = os.lstat(s_path)
+            try:
+                d_stat = os.lstat(d_path)
+                if (d_stat.st_size == s_stat.st_size
+                        and int(d_stat.st_mtime) == int(s_stat.st_mtime)):
+                    continue
+                os.unlink(d_path)
+            except FileNotFoundError:
+                pass
+            if os.path.islink(s_path):
+                os.symlink(os.readlink(s_path), d_path)
+            elif link:
+                os.link(s_path, d_path)
+            else:
+                shutil.copy2(s_path, d_path)
+
+
+class WorkspacePool:
+    """
+    Pre-warmed sandbox workspaces for one source tree, reused across tool
+    calls (and across processes: workspaces live in base_dir and are
+    claimed with a file lock).
+    - rsync: a reused directory re-synced with `rsync -a --delete`, so only
+      changed files are copied and tool edits are reverted
+    - reflink: first fill with `cp --reflink=auto` (copy-on-write where the
+      filesystem supports it), then incremental rsync
+    - hardlink: unchanged files are hardlinked to the source; only safe for
+      read-only tools, since in-place writes would reach the source tree
+    - overlay: an overlayfs mount over the source; reset is an unmount and
+      an empty upper dir, so setup cost does not grow with repository size
+    - worktree: a detached `git worktree` reset to HEAD, plus the source's
+      uncommitted and untracked files
+    - auto: overlay when available, otherwise rsync
+    """
+    def __init__(self, source: str = None, size: int = 2, strategy: str = "auto",
+                 base_dir: str = None, prewarm: bool = True):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown workspace strategy: {strategy}")
+        self.source = os.path.abspath(source or os.getcwd())
+        self.size = size
+        if strategy == "auto":
+            strategy = "overlay" if _overlay_supported() else "rsync"
+        if strategy == "worktree" and not os.path.isdir(os.path.join(self.source, ".git")):
+            print("Source is not a git checkout; falling back to rsync workspaces.")
+            strategy = "rsync"
+        self.strategy = strategy
+        tag = hashlib.sha1(self.source.encode("utf-8")).hexdigest()[:12]
+        self.base_dir = base_dir or os.path.join(tempfile.gettempdir(), f"smallhands_pool_{tag}")
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._cond = threading.Condition()
+        self._idle: List[Workspace] = []
+        self._in_use = 0
+        self._closed = False
+        if prewarm:
+            threading.Thread(target=self._prewarm, name="workspace_prewarm", daemon=True).start()
+
+    def _prewarm(self) -> None:
+        for _ in range(self.size):
+            with self._cond:
+                if self._closed or len(self._idle) + self._in_use >= self.size:
+                    return
+                ws = self._claim()
+                if ws is None:
+                    return
+                self._in_use += 1
+            try:
+                self._reset(ws)
+            except Exception as e:
+                print(f"Failed to pre-warm workspace {ws.path}: {e}")
+            self.release(ws)
+
+    def _claim(self) -> Optional[Workspace]:
+        """Locks the first workspace slot not held by this or another process."""
+        for slot in range(self.size):
+            root = os.path.join(self.base_dir, f"ws{slot}")
+            os.makedirs(root, exist_ok=True)
+            fd = os.open(os.path.join(root, ".lock"), os.O_CREAT | os.O_RDWR)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            return Workspace(path=os.path.join(root, "tree"), root=root, lock_fd=fd)
+        return None
+
+    def acquire(self, timeout: float = None) -> Workspace:
+        """Returns a workspace synced with the current source tree."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Workspace pool is closed")
+                if self._idle:
+                    ws = self._idle.pop()
+                    break
+                if self._in_use + len(self._idle) < self.size:
+                    ws = self._claim()
+                    if ws is not None:
+                        break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No sandbox workspace became free in time")
+            self._in_use += 1
+        try:
+            with span("sandbox.reset", strategy=self.strategy):
+                self._reset(ws)
+        except BaseException:
+            self._drop(ws)
+            raise
+        return ws
+
+    def release(self, ws: Workspace) -> None:
+        """Returns a workspace; it is reset on its next acquire."""
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._unlock(ws)
+            else:
+                self._idle.append(ws)
+            self._cond.notify()
+
+    def _drop(self, ws: Workspace) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._unlock(ws)
+            self._cond.notify()
+
+    def _unlock(self, ws: Workspace) -> None:
+        if ws.mounted:
+            self._unmount(ws)
+        try:
+            os.close(ws.lock_fd)
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        """Releases all idle workspaces; their directories stay warm on disk."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for ws in idle:
+            self._unlock(ws)
+
+    def _run(self, cmd: List[str], cwd: str = None) -> subprocess.CompletedProcess:
+        return subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, check=True)
+
+    def _rsync(self, dst: str, link: bool = False) -> None:
+        if shutil.which("rsync"):
+            cmd = ["rsync", "-a", "--delete"]
+            for pattern in EXCLUDES:
+                cmd += ["--exclude", pattern]
+            if link:
+                cmd.append(f"--link-dest={self.source}")
+            self._run(cmd + [f"{self.source}/", f"{dst}/"])
+        else:
+            _python_sync(self.source, dst, link=link)
+
+    def _reset(self, ws: Workspace) -> None:
+        """Brings the workspace back to an exact copy of the source tree."""
+        if self.strategy == "overlay":
+            self._reset_overlay(ws)
+        elif self.strategy == "worktree":
+            self._reset_worktree(ws)
+        elif self.strategy == "reflink" and not ws.synced:
+            shutil.rmtree(ws.path, ignore_errors=True)
+            os.makedirs(ws.path)
+            entries = [os.path.join(self.source, e) for e in os.listdir(self.source)
+                       if e not in EXCLUDES]
+            if entries:
+                self._run(["cp", "-a", "--reflink=auto", *entries, ws.path])
+        else:
+            os.makedirs(ws.path, exist_ok=True)
+            self._rsync(ws.path, link=self.strategy == "hardlink")
+        ws.synced = True
+
+    def _reset_overlay(self, ws: Workspace) -> None:
+        if ws.mounted:
+            self._unmount(ws)
+        upper = os.path.join(ws.root, "upper")
+        work = os.path.join(ws.root, "work")
+        for path in (upper, work):
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path)
+        os.makedirs(ws.path, exist_ok=True)
+        options = f"lowerdir={self.source},upperdir={upper},workdir={work}"
+        if shutil.which("fuse-overlayfs"):
+            cmd = ["fuse-overlayfs", "-o", options, ws.path]
+        else:
+            cmd = ["mount", "-t", "overlay", "overlay", "-o", options, ws.path]
+        try:
+            self._run(cmd)
+        except (subprocess.CalledProcessError, OSError) as e:
+            detail = e.stderr.strip() if isinstance(e, subprocess.CalledProcessError) else e
+            print(f"overlay mount failed ({detail}); falling back to rsync workspaces.")
+            self.strategy = "rsync"
+            self._rsync(ws.path)
+            return
+        ws.mounted = True
+
+    def _unmount(self, ws: Workspace) -> None:
+        cmd = ["fusermount", "-u", ws.path] if shutil.which("fusermount") else ["umount", ws.path]
+        subprocess.run(cmd, capture_output=True)
+        ws.mounted = False
+
+    def _reset_worktree(self, ws: Workspace) -> None:
+        head = self._run(["git", "rev-parse", "HEAD"], cwd=self.source).stdout.strip()
+        if not os.path.isdir(os.path.join(ws.path, ".git")) and not os.path.isfile(
+                os.path.join(ws.path, ".git")):
+            shutil.rmtree(ws.path, ignore_errors=True)
+            self._run(["git", "worktree", "prune"], cwd=self.source)
+            self._run(["git", "worktree", "add", "--detach", "-f", ws.path, head], cwd=self.source)
+        else:
+            self._run(["git", "checkout", "-f", "--detach", head], cwd=ws.path)
+            # -x too: ignored build output from the last task must not leak into the next.
+            self._run(["git", "clean", "-fdxq"], cwd=ws.path)
+        # Overlay the source's uncommitted changes on top of HEAD.
+        status = self._run(["git", "status", "--porcelain", "-z", "--untracked-files=all"],
+                           cwd=self.source).stdout
+        entries = [e for e in status.split("\0") if e]
+        i = 0
+        while i < len(entries):
+            code, paths = entries[i][:2], [entries[i][3:]]
+            if code[0] in "RC":
+                i += 1  # the next entry is the rename or copy source
+                paths.append(entries[i])
+            for path in paths:
+                src = os.path.join(self.source, path)
+                dst = os.path.join(ws.path, path)
+                if os.path.lexists(src):
+                    os.makedirs(os.path.dirname(dst), exist_ok=True)
+                    if os.path.isdir(src) and not os.path.islink(src):
+                        shutil.copytree(src, dst, symlinks=True, dirs_exist_ok=True)
+                    else:
+                        shutil.copy2(src, dst, follow_symlinks=False)
+                elif os.path.isdir(dst) and not os.path.islink(dst):
+                    shutil.rmtree(dst)
+                elif os.path.lexists(dst):
+                    os.unlink(dst)
+            i += 1
@@ -2,41 +2,123 @@
 
 import os
 import shutil
+import inspect
 import tempfile
 import subprocess
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional
+
+from observability.logger import span
+from .workspace_pool import Workspace, WorkspacePool, _python_sync
+
+
+@lru_cache(maxsize=256)
+def _accepted_params(fn) -> FrozenSet[str]:
+    try:
+        return frozenset(inspect.signature(fn).parameters)
+    except (TypeError, ValueError):
+        return frozenset()
+
+
+def _pin_worker(work_dir: str, env: Dict[str, str]) -> None:
+    """Initializer for the sandbox's worker process: chdir is private to it."""
+    os.chdir(work_dir)
+    os.environ.clear()
+    os.environ.update(env)
+
 
 class WSLSandbox:
-    """Baseline sandbox using temporary workspace and optional cache mount."""
+    """
+    Sandbox that runs tools in a copy of the repository.
+    - pool: a WorkspacePool to take pre-warmed, incrementally synced
+      workspaces from; without one every entry copies the tree into a fresh
+      temporary directory
+    - cache_dir: shared read-only dependency cache (WSL_CACHE_DIR). Its
+      `wheels/` directory is offered to pip as --find-links and its
+      `site-packages/` directory is put on PYTHONPATH, so sandboxes reuse
+      installed dependencies instead of copying or reinstalling them
+    Tools never change the agent's working directory, so several sandboxes
+    can run tools at once from different threads.
+    """
 
-    def __init__(self, cache_dir=None):
+    def __init__(self, cache_dir=None, pool: Optional[WorkspacePool] = None, source: str = None):
         self.cache_dir = cache_dir or os.getenv("WSL_CACHE_DIR", "/mnt/cache")
+        self.pool = pool
+        self.source = source
         self.work_dir = None
+        self._workspace: Optional[Workspace] = None
+        self._worker: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def env(self) -> Dict[str, str]:
+        """Environment for sandboxed commands, wired to the dependency cache."""
+        env = dict(os.environ)
+        wheels = os.path.join(self.cache_dir, "wheels")
+        if os.path.isdir(wheels):
+            env["PIP_FIND_LINKS"] = wheels
+        site_packages = os.path.join(self.cache_dir, "site-packages")
+        if os.path.isdir(site_packages):
+            paths = [site_packages] + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+            env["PYTHONPATH"] = os.pathsep.join(paths)
+        return env
 
     def __enter__(self):
+        with span("sandbox.setup", pooled=self.pool is not None):
+            return self._setup()
+
+    def _setup(self):
+        if self.pool is not None:
+            self._workspace = self.pool.acquire()
+            self.work_dir = self._workspace.path
+            return self
         self.work_dir = tempfile.mkdtemp(prefix="smallhands_")
         # copy repository state excluding .git to sandbox
-        src = os.getcwd()
+        src = os.path.abspath(self.source or os.getcwd())
         dst = self.work_dir
-        subprocess.run(["rsync", "-a", "--exclude", ".git", f"{src}/", f"{dst}/"])
+        if shutil.which("rsync"):
+            subprocess.run(["rsync", "-a", "--exclude", ".git", f"{src}/", f"{dst}/"])
+        else:
+            _python_sync(src, dst)
         return self
 
     def run(self, fn, *args, **kwargs):
         """
         Execute a function within the sandbox context.
+        Tools taking a `cwd` argument (and optionally `env`) are called in
+        this process with the sandbox paths; other functions run in a worker
+        process pinned to the sandbox directory, so they must be picklable.
         """
-        current_dir = os.getcwd()
-        os.chdir(self.work_dir)
-        try:
-            return fn(*args, **kwargs)
-        finally:
-            os.chdir(current_dir)
+        params = _accepted_params(fn)
+        with span("tool.run", tool=getattr(fn, "__name__", repr(fn))) as s:
+            if "cwd" in params:
+                kwargs["cwd"] = self.work_dir
+                if "env" in params:
+                    kwargs["env"] = self.env
+                result = fn(*args, **kwargs)
+            else:
+                if self._worker is None:
+                    self._worker = ProcessPoolExecutor(max_workers=1, initializer=_pin_worker,
+                                                       initargs=(self.work_dir, self.env))
+                result = self._worker.submit(fn, *args, **kwargs).result()
+            if isinstance(result, dict):
+                s.set(success=result.get("success"), cached=result.get("cached"))
+            return result
 
     def run_shell(self, cmd: List[str], capture_output: bool = True, text: bool = True) -> subprocess.CompletedProcess:
         """
         Execute a shell command within the sandbox workspace.
         """
-        return subprocess.run(cmd, cwd=self.work_dir, capture_output=capture_output, text=text)
+        return subprocess.run(cmd, cwd=self.work_dir, capture_output=capture_output, text=text,
+                              env=self.env)
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        shutil.rmtree(self.work_dir, ignore_errors=True)
+        if self._worker is not None:
+            self._worker.shutdown(wait=True)
+            self._worker = None
+        if self._workspace is not None:
+            self.pool.release(self._workspace)
+            self._workspace = None
+        else:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+        self.work_dir = None
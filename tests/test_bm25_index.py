@@ -0,0 +1,44 @@
+"""Scoring, removal and segment merges in memory.bm25_index.BM25Index."""
+
+import math
+
+import numpy as np
+
+from memory.bm25_index import BM25Index
+
+DOCS = [["parse", "json", "reply"], ["parse", "config"], ["stream", "json", "json", "reply"],
+        ["index", "trigram"]]
+
+
+def test_scores_match_the_okapi_formula():
+    index = BM25Index(k1=1.5, b=0.75)
+    index.add(DOCS)
+    avgdl = sum(map(len, DOCS)) / len(DOCS)
+    idf = math.log((4 - 2 + 0.5) / (2 + 0.5) + 1.0)
+    tf, dl = 2, 4
+    expected = idf * tf * 2.5 / (tf + 1.5 * (0.25 + 0.75 * dl / avgdl))
+    assert math.isclose(index.get_scores(["json"])[2], expected, rel_tol=1e-5)
+    assert [doc for doc, _ in index.search(["json"], 5)] == [2, 0]
+
+
+def test_segments_and_merges_score_like_one_batch():
+    whole = BM25Index()
+    whole.add(DOCS)
+    split = BM25Index(max_segments=2)
+    for doc in DOCS:
+        split.add([doc])
+    assert len(split.segments) <= 2
+    query = ["parse", "json", "reply"]
+    np.testing.assert_allclose(split.get_scores(query), whole.get_scores(query), rtol=1e-6)
+
+
+def test_removed_documents_stop_matching_and_leave_the_statistics():
+    index = BM25Index()
+    index.add(DOCS)
+    index.remove([0])
+    assert [doc for doc, _ in index.search(["parse"], 5)] == [1]
+    fresh = BM25Index()
+    fresh.add(DOCS[1:])
+    index.merge()
+    assert math.isclose(index.search(["json"], 1)[0][1], fresh.search(["json"], 1)[0][1],
+                        rel_tol=1e-6)
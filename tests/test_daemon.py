@@ -0,0 +1,51 @@
+"""Round trips through daemon.Daemon and daemon.query."""
+
+import os
+import threading
+import time
+
+import pytest
+
+import daemon
+
+
+@pytest.fixture
+def serving(tmp_path):
+    path = str(tmp_path / "d.sock")
+
+    def handler(query):
+        if query == "fail":
+            raise ValueError("bad query")
+        return {"success": True, "output": query.upper()}
+
+    server = daemon.Daemon(handler, path=path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5.0
+    while not os.path.exists(path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    yield server, path
+    server.shutdown()
+    thread.join(5.0)
+
+
+def test_a_query_is_answered_by_the_running_daemon(serving):
+    server, path = serving
+    assert daemon.query("hello", path=path, timeout=5.0) == {"success": True,
+                                                             "output": "HELLO"}
+    assert server.served == 1
+
+
+def test_handler_errors_come_back_as_runtime_errors(serving):
+    _, path = serving
+    with pytest.raises(RuntimeError, match="ValueError: bad query"):
+        daemon.query("fail", path=path, timeout=5.0)
+
+
+def test_no_daemon_or_another_directory_means_unavailable(serving, tmp_path, monkeypatch):
+    _, path = serving
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.query("hello", path=str(tmp_path / "missing.sock"))
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(daemon.DaemonUnavailable):
+        daemon.query("hello", path=path, timeout=5.0)
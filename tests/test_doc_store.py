@@ -0,0 +1,27 @@
+"""Persistence and id bookkeeping in memory.vector_store.DocStore."""
+
+from memory.vector_store import DocStore
+
+
+def test_empty_texts_survive_a_reload(tmp_path):
+    store = DocStore(str(tmp_path))
+    store.put(3, "")
+    store.put(1, "")
+    store.save()
+    reloaded = DocStore(str(tmp_path))
+    reloaded.load()
+    assert reloaded.get(3) == "" and reloaded.get(1) == ""
+    assert reloaded.ids() == [1, 3]
+
+
+def test_ids_merge_saved_added_and_removed_chunks(tmp_path):
+    store = DocStore(str(tmp_path))
+    for chunk_id in (1, 2, 3):
+        store.put(chunk_id, f"doc {chunk_id}")
+    store.save()
+    store.remove(2)
+    store.put(5, "doc 5")
+    store.put(1, "doc 1 again")
+    assert store.ids() == [1, 3, 5]
+    assert len(store) == 3
+    assert store.get(1) == "doc 1 again" and 2 not in store
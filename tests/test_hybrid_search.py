@@ -0,0 +1,50 @@
+"""Score fusion and strategy timeouts in memory.hybrid_search.HybridSearch."""
+
+import threading
+import time
+
+from memory.hybrid_search import HybridSearch, RetrievalStrategy
+
+
+class FixedStrategy(RetrievalStrategy):
+    """Returns `hits` for every query; blocks on `gate` first when one is given."""
+    def __init__(self, hits, gate=None):
+        self.hits = hits
+        self.gate = gate
+        self.calls = 0
+
+    def index(self, docs, ids):
+        pass
+
+    def search(self, query, top_k):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait()
+        return self.hits
+
+
+def test_weights_decide_between_unbounded_and_unit_scores():
+    strategies = {"bm25": FixedStrategy([(1, 12.0), (2, 6.0)]),
+                  "semantic": FixedStrategy([(2, 0.9), (1, 0.3)])}
+    lexical = HybridSearch(strategies, weights={"bm25": 0.7, "semantic": 0.3})
+    semantic = HybridSearch(strategies, weights={"bm25": 0.3, "semantic": 0.7})
+    assert [chunk_id for chunk_id, _ in lexical.search_ids("q")] == [1, 2]
+    assert [chunk_id for chunk_id, _ in semantic.search_ids("q")] == [2, 1]
+
+
+def test_a_hung_strategy_holds_at_most_one_worker():
+    gate = threading.Event()
+    slow = FixedStrategy([(1, 1.0)], gate)
+    search = HybridSearch({"slow": slow, "fast": FixedStrategy([(2, 1.0)])},
+                          timeouts={"slow": 0.05})
+    try:
+        for _ in range(4):
+            assert search.search_ids("q") == [(2, 0.5)]
+        assert slow.calls == 1
+    finally:
+        gate.set()
+    # Once the hung call returns, the strategy is queried again.
+    deadline = time.monotonic() + 5.0
+    while slow.calls == 1 and time.monotonic() < deadline:
+        hits = search.search_ids("q")
+    assert slow.calls == 2 and sorted(hits) == [(1, 0.5), (2, 0.5)]
@@ -0,0 +1,51 @@
+"""Affected-test selection and result memoization in tools.incremental."""
+
+import pytest
+
+from tools import incremental
+from tools.incremental import ToolResultCache, affected_tests, file_hashes, memoized
+
+
+@pytest.fixture
+def tree(tmp_path):
+    files = {
+        "pkg/__init__.py": "",
+        "pkg/core.py": "from .util import helper\n",
+        "pkg/util.py": "def helper():\n    return 1\n",
+        "pkg/sub/__init__.py": "",
+        "pkg/sub/leaf.py": "from .. import core\n",
+        "tests/test_core.py": "from pkg.core import helper\n",
+        "tests/test_leaf.py": "import pkg.sub.leaf\n",
+    }
+    for rel, source in files.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+    return str(tmp_path), file_hashes(str(tmp_path), sorted(files))
+
+
+def test_relative_imports_reach_the_tests(tree):
+    cwd, hashes = tree
+    assert affected_tests(cwd, hashes, ["pkg/util.py"]) == ["tests/test_core.py",
+                                                            "tests/test_leaf.py"]
+    assert affected_tests(cwd, hashes, ["pkg/sub/leaf.py"]) == ["tests/test_leaf.py"]
+
+
+def test_unresolved_changes_run_everything(tree):
+    cwd, hashes = tree
+    assert affected_tests(cwd, hashes, ["pkg/removed.py"]) is None
+    assert affected_tests(cwd, hashes, ["pytest.ini"]) is None
+
+
+def test_failures_are_not_memoized_and_env_is_part_of_the_key(monkeypatch):
+    monkeypatch.setattr(incremental, "_cache", ToolResultCache(":memory:"))
+    outcomes = iter([False, True, True])
+
+    def run():
+        return {"success": next(outcomes)}
+
+    keep = lambda result: result["success"]
+    assert not memoized("run_tests", {}, [], run, store=keep)["success"]
+    assert memoized("run_tests", {}, [], run, store=keep) == {"success": True, "cached": False}
+    assert memoized("run_tests", {}, [], run, store=keep)["cached"]
+    assert not memoized("run_tests", {}, [], run, env={"X": "1"}, store=keep)["cached"]
@@ -0,0 +1,53 @@
+"""Timeouts, cancellation and shutdown in execution.local_executor."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pytest
+
+from execution.local_executor import AsyncioLocalExecutor, ThreadPoolLocalExecutor
+
+
+async def sleep_then_return(seconds):
+    await asyncio.sleep(seconds)
+    return seconds
+
+
+def test_a_timed_out_task_is_counted_once():
+    executor = ThreadPoolLocalExecutor(max_workers=1)
+    future = executor.submit_with_timeout(0.05, time.sleep, 0.2)
+    with pytest.raises(FutureTimeout):
+        future.result()
+    executor.shutdown(wait=True)
+    m = executor.metrics
+    assert (m.timed_out, m.completed, m.failed, m.pending) == (1, 0, 0, 0)
+
+
+def test_cancel_drops_a_queued_task():
+    executor = ThreadPoolLocalExecutor(max_workers=1)
+    gate = threading.Event()
+    running = executor.submit(gate.wait)
+    queued = executor.submit(lambda: "never")
+    assert queued.cancel()
+    gate.set()
+    assert running.result() is True
+    executor.shutdown(wait=True)
+    assert executor.metrics.cancelled == 1 and executor.metrics.completed == 1
+
+
+def test_asyncio_shutdown_finishes_running_tasks_and_closes_the_loop():
+    executor = AsyncioLocalExecutor(max_workers=1)
+    timed_out = executor.submit_with_timeout(0.05, sleep_then_return, 5)
+    with pytest.raises(FutureTimeout):
+        timed_out.result()
+    running = executor.submit(sleep_then_return, 0.2)
+    queued = executor.submit(sleep_then_return, 0.1)
+    time.sleep(0.05)
+    executor.shutdown(wait=True, cancel_pending=True)
+    assert running.result() == 0.2
+    assert queued.cancelled()
+    assert executor._loop.is_closed()
+    with pytest.raises(RuntimeError):
+        executor.submit(sleep_then_return, 0)
@@ -0,0 +1,70 @@
+"""Self-consistency, cache eviction and streamed selection in llm.ModelManager."""
+
+import json
+import threading
+
+import pytest
+
+from llm.completion_cache import CompletionCache
+from llm.fake_client import FakeChatCompletions, FakeOpenAIClient
+from llm.model_manager import ModelManager, Route
+from llm.openai_model import OpenAIModel
+
+
+class SeededChat(FakeChatCompletions):
+    """Replies with replies[seed] (replies[0] without a seed) and records each request."""
+    def __init__(self, replies):
+        super().__init__(latency=0.0)
+        self.replies = replies
+        self.requests = []
+        self._seed_lock = threading.Lock()
+
+    def create(self, model, messages, stream=False, **kwargs):
+        # Samples arrive from several threads; the responder swap must not interleave.
+        with self._seed_lock:
+            self.requests.append(kwargs)
+            reply = self.replies[kwargs.get("seed", 0) % len(self.replies)]
+            self.responder = lambda messages, model: reply
+            return super().create(model, messages, stream=stream, **kwargs)
+
+
+def make_manager(tmp_path, replies, model_name="gpt-4o-mini", **routes):
+    client = FakeOpenAIClient(dim=8, latency=0.0, chat_latency=0.0)
+    chat = client.chat.completions = SeededChat(replies)
+    cache = CompletionCache(str(tmp_path / "completions.sqlite"))
+    return ModelManager(OpenAIModel(model_name, client=client, cache=cache), routes=routes), chat
+
+
+PLAN_A = json.dumps([{"id": "a", "description": "first", "deps": []}])
+PLAN_B = json.dumps([{"id": "b", "description": "other", "deps": []}])
+
+
+def test_self_consistency_returns_the_majority_answer(tmp_path):
+    manager, chat = make_manager(tmp_path, [PLAN_A, PLAN_B, PLAN_A])
+    assert json.loads(manager.plan_task("plan it")) == json.loads(PLAN_A)
+    assert sorted(r["seed"] for r in chat.requests) == [0, 1, 2]
+    assert all(r["temperature"] == 0.7 for r in chat.requests)
+
+
+def test_reasoning_models_are_sampled_without_temperature(tmp_path):
+    manager, chat = make_manager(tmp_path, [PLAN_A], model_name="o4-mini")
+    manager.plan_task("plan it")
+    assert chat.requests and all("temperature" not in r for r in chat.requests)
+
+
+def test_invalid_replies_are_not_replayed_from_the_cache(tmp_path):
+    manager, chat = make_manager(tmp_path, ["not json"],
+                                 planning=Route(["small"], samples=1))
+    with pytest.raises(ValueError):
+        manager.plan_task("plan it")
+    chat.replies = [PLAN_A]
+    assert json.loads(manager.plan_task("plan it")) == json.loads(PLAN_A)
+    assert len(chat.requests) == 2
+
+
+def test_streamed_tool_selection_is_cached(tmp_path):
+    call = {"tool_name": "search_repo", "args": {"query": "x"}}
+    manager, chat = make_manager(tmp_path, [json.dumps(call) + " trailing text"])
+    assert manager.select_tool("pick a tool", ["search_repo"]) == call
+    assert manager.select_tool("pick a tool", ["search_repo"]) == call
+    assert len(chat.requests) == 1
@@ -0,0 +1,53 @@
+"""Which streamed replies llm.openai_model.OpenAIModel keeps in its cache."""
+
+import asyncio
+from types import SimpleNamespace
+
+from llm.completion_cache import CompletionCache
+from llm.fake_client import FakeChatCompletions, FakeOpenAIClient
+from llm.openai_model import OpenAIModel
+
+
+class TruncatedChat(FakeChatCompletions):
+    """Streams the reply but reports it as cut off at max_tokens."""
+    def _stream(self, content):
+        for chunk in super()._stream(content):
+            if chunk.choices[0].finish_reason == "stop":
+                chunk = SimpleNamespace(choices=[SimpleNamespace(
+                    index=0, delta=chunk.choices[0].delta, finish_reason="length")])
+            yield chunk
+
+
+def make_model(tmp_path, chat=None):
+    client = FakeOpenAIClient(dim=8, latency=0.0, chat_latency=0.0)
+    if chat is not None:
+        client.chat.completions = chat
+    cache = CompletionCache(str(tmp_path / "completions.sqlite"))
+    return OpenAIModel("gpt-4o-mini", client=client, cache=cache), client.chat.completions
+
+
+def test_a_finished_stream_is_replayed_from_the_cache(tmp_path):
+    model, chat = make_model(tmp_path)
+    first = "".join(model.stream("hello"))
+    assert "".join(model.stream("hello")) == first
+    assert chat.calls == 1
+
+
+def test_a_truncated_stream_is_not_cached(tmp_path):
+    model, chat = make_model(tmp_path, TruncatedChat(latency=0.0))
+    "".join(model.stream("hello"))
+    "".join(model.stream("hello"))
+    assert chat.calls == 2
+
+
+def test_astream_caches_through_the_same_rules(tmp_path):
+    async def collect(model):
+        return "".join([delta async for delta in model.astream("hello")])
+
+    model, chat = make_model(tmp_path)
+    assert asyncio.run(collect(model)) == asyncio.run(collect(model))
+    assert chat.calls == 1
+    truncated, chat = make_model(tmp_path / "t", TruncatedChat(latency=0.0))
+    asyncio.run(collect(truncated))
+    asyncio.run(collect(truncated))
+    assert chat.calls == 2
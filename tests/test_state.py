@@ -0,0 +1,20 @@
+"""StateStore persistence of controller.state.State."""
+
+from controller.state import State
+
+
+def test_saving_a_fresh_state_replaces_stored_results(tmp_path):
+    path = str(tmp_path / "state.db")
+    old = State()
+    old.mark_complete("old", {"x": 1})
+    old.save(path)
+    State().save(path)
+    assert dict(State.load(path).results.items()) == {}
+
+
+def test_loaded_state_journals_new_results(tmp_path):
+    path = str(tmp_path / "state.db")
+    State().save(path)
+    state = State.load(path)
+    state.mark_complete("n", 1)
+    assert dict(State.load(path).results.items()) == {"n": 1}
@@ -0,0 +1,57 @@
+"""Validation, ordering and failure handling in controller.task_graph.TaskGraph."""
+
+import threading
+
+import pytest
+
+from controller.task_graph import FAILED, SKIPPED, CycleError, TaskGraph, TaskGraphError
+
+
+def test_tasks_run_after_their_dependencies():
+    graph = TaskGraph()
+    order = []
+    lock = threading.Lock()
+
+    def step(name):
+        def run():
+            with lock:
+                order.append(name)
+            return name
+        return run
+
+    graph.add_tasks([
+        {"node_id": "test", "task_fn": step("test"), "deps": ["build", "lint"]},
+        {"node_id": "build", "task_fn": step("build"), "deps": ["fetch"]},
+        {"node_id": "lint", "task_fn": step("lint"), "deps": ["fetch"]},
+        {"node_id": "fetch", "task_fn": step("fetch"), "cost": 3.0},
+    ])
+    assert graph.run(max_parallel=2) == {n: n for n in ("test", "build", "lint", "fetch")}
+    assert order[0] == "fetch" and order[-1] == "test"
+    assert graph.critical_path()[0] == "fetch" and graph.critical_path()[-1] == "test"
+
+
+def test_cycles_and_unknown_dependencies_are_rejected_atomically():
+    graph = TaskGraph()
+    graph.add_task("a", lambda: 1)
+    with pytest.raises(CycleError):
+        graph.add_tasks([{"node_id": "b", "task_fn": None, "deps": ["a", "c"]},
+                         {"node_id": "c", "task_fn": None, "deps": ["b"]}])
+    with pytest.raises(TaskGraphError):
+        graph.add_task("d", lambda: 1, deps=["missing"])
+    with pytest.raises(TaskGraphError):
+        graph.add_task("a", lambda: 1)
+    assert list(graph.nodes) == ["a"]
+
+
+def test_dependents_of_a_failed_task_are_skipped():
+    graph = TaskGraph()
+
+    def boom():
+        raise RuntimeError("boom")
+
+    graph.add_task("a", boom)
+    graph.add_task("b", lambda: "b", deps=["a"])
+    graph.add_task("c", lambda: "c")
+    results = graph.run(max_parallel=1, fail_fast=False)
+    assert results == {"c": "c"}
+    assert graph.nodes["a"].status == FAILED and graph.nodes["b"].status == SKIPPED
@@ -0,0 +1,46 @@
+"""Batch runs in agents.tool_agent.ToolAgent."""
+
+import threading
+import time
+
+from agents.tool_agent import ToolAgent
+from sandbox.wsl_sandbox import WSLSandbox
+from tools.registry import ToolRegistry
+
+
+class ScriptedModel:
+    """Picks the tool call scripted for the query named in the prompt."""
+    def __init__(self, calls):
+        self.calls = calls
+
+    def select_tool(self, prompt, tool_names=None):
+        query = next(q for q in self.calls if f'"{q}"' in prompt)
+        return self.calls[query]
+
+
+class RecordingAgent(ToolAgent):
+    """Records tool executions instead of running them in a sandbox."""
+    def __init__(self, calls):
+        super().__init__(ScriptedModel(calls), ToolRegistry(), WSLSandbox())
+        self.executed = []
+        self._lock = threading.Lock()
+
+    def _execute(self, call, sandbox):
+        time.sleep(0.05)  # long enough for the duplicate to find this run in flight
+        with self._lock:
+            self.executed.append(call.tool_name)
+        return {"success": True, "output": f"{call.tool_name} {call.args}"}
+
+
+def test_identical_read_only_calls_share_one_run_but_tests_do_not():
+    search = {"tool_name": "search_repo", "args": {"query": "helper"}}
+    tests = {"tool_name": "run_tests", "args": {}}
+    agent = RecordingAgent({"find helper": search, "look for helper": search,
+                            "run the tests": tests, "test again": tests})
+    results = list(agent.run_batch(["find helper", "look for helper", "run the tests",
+                                    "test again"], max_sandboxes=4))
+    assert sorted(agent.executed) == ["run_tests", "run_tests", "search_repo"]
+    assert sorted(r["index"] for r in results) == [0, 1, 2, 3]
+    assert all(r["result"]["success"] for r in results)
+    shared = [r["query"] for r in results if r.get("deduplicated")]
+    assert shared in (["find helper"], ["look for helper"])
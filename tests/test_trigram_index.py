@@ -0,0 +1,19 @@
+"""Keeping memory.trigram_index.TrigramIndex in step with the tree."""
+
+from memory.file_catalog import FileCatalog
+from memory.trigram_index import TrigramIndex
+
+
+def test_files_created_within_max_age_are_found(tmp_path):
+    (tmp_path / "a.py").write_text("def alpha():\n    pass\n")
+    index = TrigramIndex(str(tmp_path), cache_path="",
+                         catalog=FileCatalog(str(tmp_path), max_age=60.0))
+    index.update()
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "b.py").write_text("def beta_function():\n    pass\n")
+    index.update()
+    assert [str(hit) for hit in index.search("beta_function")] == [
+        "pkg/b.py:1:def beta_function():"]
+    (tmp_path / "pkg" / "b.py").rename(tmp_path / "pkg" / "c.py")
+    index.update()
+    assert [hit.path for hit in index.search("beta_function")] == ["pkg/c.py"]
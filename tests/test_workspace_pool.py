@@ -0,0 +1,76 @@
+"""Resetting reused workspaces in sandbox.workspace_pool.WorkspacePool."""
+
+import os
+import subprocess
+
+import pytest
+
+from sandbox.workspace_pool import WorkspacePool
+
+
+def git(cwd, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                   check=True, capture_output=True)
+
+
+def read_tree(root):
+    found = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d != ".git"]
+        for name in filenames:
+            if name == ".git":  # a worktree's pointer to its repository
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path) as f:
+                found[os.path.relpath(path, root)] = f.read()
+    return found
+
+
+@pytest.fixture
+def source(tmp_path):
+    src = tmp_path / "src"
+    (src / "pkg").mkdir(parents=True)
+    (src / "pkg" / "mod.py").write_text("x = 1\n")
+    (src / "old.py").write_text("old\n")
+    (src / ".gitignore").write_text("build/\n")
+    return src
+
+
+@pytest.mark.parametrize("strategy", ["rsync", "reflink", "hardlink"])
+def test_a_reused_workspace_matches_the_source_again(tmp_path, source, strategy):
+    pool = WorkspacePool(str(source), size=1, strategy=strategy,
+                         base_dir=str(tmp_path / "pool"), prewarm=False)
+    try:
+        ws = pool.acquire()
+        os.unlink(os.path.join(ws.path, "pkg", "mod.py"))
+        with open(os.path.join(ws.path, "scratch.txt"), "w") as f:
+            f.write("left behind\n")
+        pool.release(ws)
+        os.unlink(source / "old.py")
+        (source / "new.py").write_text("new\n")
+        ws = pool.acquire()
+        assert read_tree(ws.path) == read_tree(str(source))
+        pool.release(ws)
+    finally:
+        pool.close()
+
+
+def test_worktree_reset_follows_renames_and_drops_ignored_files(tmp_path, source):
+    git(source, "init", "-q")
+    git(source, "add", "-A")
+    git(source, "commit", "-qm", "init")
+    pool = WorkspacePool(str(source), size=1, strategy="worktree",
+                         base_dir=str(tmp_path / "pool"), prewarm=False)
+    try:
+        ws = pool.acquire()
+        os.makedirs(os.path.join(ws.path, "build"))
+        with open(os.path.join(ws.path, "build", "artifact.o"), "w") as f:
+            f.write("stale\n")
+        pool.release(ws)
+        git(source, "mv", "old.py", "renamed.py")
+        (source / "pkg" / "mod.py").write_text("x = 2\n")
+        ws = pool.acquire()
+        assert read_tree(ws.path) == read_tree(str(source))
+        pool.release(ws)
+    finally:
+        pool.close()
@@ -0,0 +1,364 @@
+"""Change detection, result memoization and sharding shared by the dev tools."""
+
+import os
+import re
+import json
+import hashlib
+import sqlite3
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from memory.file_catalog import FileCatalog
+from paths import cache_path
+
+# Files whose content changes what a linter or test run reports.
+CONFIG_FILES = ("setup.cfg", "tox.ini", ".flake8", "pyproject.toml", "pytest.ini",
+                "conftest.py", ".bandit", ".semgrep.yml", "requirements.txt")
+_IMPORT = re.compile(r"^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([\w, \t]+)"
+                     r"|import[ \t]+([\w., \t]+))", re.MULTILINE)
+
+_stat_cache: Dict[str, Tuple[int, int, str]] = {}
+_stat_lock = threading.Lock()
+
+
+def file_sha1(path: str) -> str:
+    """Content hash, recomputed only when the file's size or mtime changed."""
+    st = os.stat(path)
+    with _stat_lock:
+        cached = _stat_cache.get(path)
+    if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+        return cached[2]
+    with open(path, "rb") as f:
+        sha1 = hashlib.sha1(f.read()).hexdigest()
+    with _stat_lock:
+        _stat_cache[path] = (st.st_size, st.st_mtime_ns, sha1)
+    return sha1
+
+
+def tree_files(cwd: str, suffix: Optional[str] = ".py") -> List[str]:
+    """
+    Relative paths of the files under cwd ending in `suffix` (None: all),
+    sorted. Always walks the tree, refreshing the shared catalog for the
+    search and semantic indexes.
+    """
+    return FileCatalog.shared(cwd).paths(suffix, max_age=0.0)
+
+
+def file_hashes(cwd: str, paths: Iterable[str] = None) -> Dict[str, str]:
+    """{relative path: sha1} for the given paths (default: every Python file)."""
+    root = os.path.abspath(cwd)
+    hashes: Dict[str, str] = {}
+    for rel in (tree_files(root) if paths is None else paths):
+        try:
+            hashes[rel] = file_sha1(os.path.join(root, rel))
+        except OSError:
+            continue
+    return hashes
+
+
+def config_hash(cwd: str) -> str:
+    present = [f for f in CONFIG_FILES if os.path.isfile(os.path.join(cwd, f))]
+    return tree_hash(file_hashes(cwd, present))
+
+
+def tree_hash(hashes: Dict[str, str], *extra: Any) -> str:
+    """Hash of a set of files plus any extra key parts (tool name, arguments)."""
+    h = hashlib.sha1(json.dumps(extra, sort_keys=True, default=str).encode("utf-8"))
+    for rel in sorted(hashes):
+        h.update(f"{rel}\0{hashes[rel]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def git_changed_files(cwd: str, base: str = "HEAD") -> Optional[List[str]]:
+    """
+    Files changed relative to `base` plus untracked files, or None when cwd
+    is not a git checkout (e.g. a copied sandbox workspace).
+    """
+    def git(*args: str) -> Optional[str]:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+        return result.stdout if result.returncode == 0 else None
+
+    diff = git("diff", "--name-only", base)
+    untracked = git("ls-files", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    return sorted({p for p in (diff + untracked).splitlines() if p})
+
+
+def resolve_changed(tool: str, cwd: str, hashes: Dict[str, str], files: List[str] = None,
+                    changed_only: bool = False) -> Optional[List[str]]:
+    """
+    The changed-file set a tool should work on, or None for the whole tree.
+    Explicit `files` win; with changed_only the set comes from git diff, or
+    outside a git checkout from the file hashes recorded by the tool's last
+    successful run (see record_manifest).
+    """
+    if files is not None:
+        return sorted({os.path.normpath(f) for f in files})
+    if not changed_only:
+        return None
+    changed = git_changed_files(cwd)
+    if changed is None:
+        previous = result_cache().get(f"manifest:{tool}")
+        if previous is None:
+            return None
+        changed = sorted(rel for rel in set(hashes) | set(previous)
+                         if hashes.get(rel) != previous.get(rel))
+    return changed
+
+
+def record_manifest(tool: str, hashes: Dict[str, str]) -> None:
+    result_cache().put(f"manifest:{tool}", hashes)
+
+
+def python_targets(tool: str, cwd: str, files: Optional[List[str]], changed_only: bool,
+                   path: str = ".") -> Dict[str, str]:
+    """{path: sha1} of the Python files a lint-style tool should look at."""
+    hashes = file_hashes(cwd)
+    changed = resolve_changed(tool, cwd, hashes, files, changed_only)
+    if changed is not None:
+        return {rel: sha for rel, sha in file_hashes(cwd, changed).items()
+                if rel.endswith(".py")}
+    prefix = os.path.normpath(path)
+    if prefix == ".":
+        return hashes
+    return {rel: sha for rel, sha in hashes.items()
+            if rel == prefix or rel.startswith(prefix + os.sep)}
+
+
+def memoized(tool: str, hashes: Dict[str, str], extra: Sequence[Any],
+             compute: Callable[[], Dict[str, Any]], env: Optional[Dict[str, str]] = None,
+             store: Callable[[Dict[str, Any]], bool] = None) -> Dict[str, Any]:
+    """
+    compute() memoized on the tree hash of `hashes` plus `extra` and the
+    subprocess `env`; the result gains "cached": True when it was replayed.
+    Results for which store(result) is false are returned but not kept.
+    SMALLHANDS_TOOL_CACHE=0 turns memoization off.
+    """
+    if os.getenv("SMALLHANDS_TOOL_CACHE", "1") == "0":
+        return dict(compute(), cached=False)
+    key = tree_hash(hashes, tool, env, *extra)
+    hit = result_cache().get(key)
+    if hit is not None:
+        return dict(hit, cached=True)
+    result = compute()
+    if store is None or store(result):
+        result_cache().put(key, result)
+    return dict(result, cached=False)
+
+
+def per_file(tool: str, hashes: Dict[str, str], salt: str,
+             run: Callable[[List[str]], Dict[str, Any]], jobs: int) -> Dict[str, Any]:
+    """
+    {path: result} for every file in `hashes`, running run(shard) only for
+    files whose (path, content, salt) has no stored result. The missing
+    files are split into `jobs` shards run in parallel. run() may report
+    shard-level errors under the "" key, which is never stored.
+    """
+    results = stored_results(tool, hashes, salt)
+    missing = [rel for rel in sorted(hashes) if rel not in results]
+    if not missing:
+        return results
+    shards = shard(missing, jobs)
+    if len(shards) > 1:
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            outputs = list(pool.map(run, shards))
+    else:
+        outputs = [run(files) for files in shards]
+    fresh: Dict[str, Any] = {}
+    for output in outputs:
+        errors = output.pop("", None)
+        if errors:
+            results.setdefault("", []).extend(errors)
+        fresh.update(output)
+    store_results(tool, hashes, salt, fresh)
+    results.update(fresh)
+    return results
+
+
+def _file_keys(tool: str, hashes: Dict[str, str], salt: str) -> Dict[str, str]:
+    return {rel: tree_hash({rel: sha}, tool, salt) for rel, sha in hashes.items()}
+
+
+def stored_results(tool: str, hashes: Dict[str, str], salt: str) -> Dict[str, Any]:
+    """Stored per-file results for the files in `hashes` that have one."""
+    keys = _file_keys(tool, hashes, salt)
+    stored = result_cache().get_many(list(keys.values()))
+    return {rel: stored[key] for rel, key in keys.items() if key in stored}
+
+
+def store_results(tool: str, hashes: Dict[str, str], salt: str, values: Dict[str, Any]) -> None:
+    keys = _file_keys(tool, hashes, salt)
+    result_cache().put_many({keys[rel]: value for rel, value in values.items() if rel in keys})
+
+
+def is_test_file(rel: str) -> bool:
+    name = os.path.basename(rel)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def module_names(rel: str) -> List[str]:
+    """Dotted names a file may be imported as: pkg/sub/mod.py -> pkg.sub.mod, sub.mod, mod."""
+    parts = rel[:-3].replace(os.sep, "/").split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+_imports_cache: Dict[Tuple[str, str], Set[str]] = {}
+
+
+def _absolute(rel: str, base: str) -> Optional[str]:
+    """Resolves a `from .x import` base against the package of the file at rel."""
+    level = len(base) - len(base.lstrip("."))
+    if not level:
+        return base
+    package = rel.replace(os.sep, "/").split("/")[:-1]
+    if level - 1 > len(package):
+        return None
+    parts = package[:len(package) - (level - 1)]
+    if base[level:]:
+        parts.append(base[level:])
+    return ".".join(parts) or None
+
+
+def _imports(cwd: str, rel: str, sha: str) -> Set[str]:
+    # Keyed by path too: relative imports resolve differently in another package.
+    if (rel, sha) in _imports_cache:
+        return _imports_cache[rel, sha]
+    try:
+        with open(os.path.join(cwd, rel), encoding="utf-8", errors="ignore") as f:
+            source = f.read()
+    except OSError:
+        return set()
+    names: Set[str] = set()
+    for base, members, plain in _IMPORT.findall(source):
+        if base:
+            base = _absolute(rel, base)
+            if base is None:
+                continue
+            names.add(base)
+            names.update(f"{base}.{m.strip()}" for m in members.split(",") if m.strip())
+        else:
+            names.update(n.split()[0] for n in plain.split(",") if n.strip())
+    _imports_cache[rel, sha] = names
+    return names
+
+
+def affected_tests(cwd: str, hashes: Dict[str, str], changed: List[str]) -> Optional[List[str]]:
+    """
+    Test files that import a changed module, directly or through other
+    modules, plus changed test files. None means run everything: a config
+    file or conftest.py changed, or a changed module was deleted or is not
+    imported by any file we could resolve.
+    """
+    if any(os.path.basename(rel) in CONFIG_FILES for rel in changed):
+        return None
+    by_module: Dict[str, Set[str]] = {}
+    for rel in hashes:
+        if rel.endswith(".py"):
+            for name in module_names(rel):
+                by_module.setdefault(name, set()).add(rel)
+    importers: Dict[str, Set[str]] = {}
+    for rel, sha in hashes.items():
+        if not rel.endswith(".py"):
+            continue
+        for name in _imports(cwd, rel, sha):
+            # "import a.b.c" also runs a/__init__.py and a/b/__init__.py.
+            parts = name.split(".")
+            for i in range(len(parts), 0, -1):
+                for target in by_module.get(".".join(parts[:i]), ()):
+                    importers.setdefault(target, set()).add(rel)
+    for rel in changed:
+        if rel.endswith(".py") and not is_test_file(rel) and (
+                rel not in hashes or rel not in importers):
+            return None
+    reached = set(changed)
+    frontier = list(reached)
+    while frontier:
+        for importer in importers.get(frontier.pop(), ()):
+            if importer not in reached:
+                reached.add(importer)
+                frontier.append(importer)
+    return sorted(rel for rel in reached if is_test_file(rel) and rel in hashes)
+
+
+def shard(items: Sequence[str], shards: int) -> List[List[str]]:
+    """Round-robin split into at most `shards` non-empty lists."""
+    shards = max(1, min(shards, len(items)))
+    return [list(items[i::shards]) for i in range(shards)] if items else []
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def run_sharded(make_cmd, shards: List[List[str]], cwd: str, env: Optional[Dict[str, str]],
+                jobs: int) -> List[subprocess.CompletedProcess]:
+    """Runs make_cmd(shard) for every shard, up to `jobs` subprocesses at a time."""
+    def run(files: List[str]) -> subprocess.CompletedProcess:
+        return subprocess.run(make_cmd(files), cwd=cwd, env=env, capture_output=True, text=True)
+    if len(shards) <= 1 or jobs <= 1:
+        return [run(files) for files in shards]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run, shards))
+
+
+class ToolResultCache:
+    """
+    Persistent key -> JSON result store for tool runs (SQLite, WAL). Keys
+    are content hashes, so results are shared across sandbox workspaces.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or cache_path("tool_results.sqlite")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        found: Dict[str, Any] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({placeholders})", chunk
+                )
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def put_many(self, items: Dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in items.items()],
+            )
+            self._conn.commit()
+
+    def put(self, key: str, value: Any) -> None:
+        self.put_many({key: value})
+
+
+_cache: Optional[ToolResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def result_cache() -> ToolResultCache:
+    """The process-wide tool result cache, opened on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolResultCache()
+        return _cache
@@ -1,4 +1,9 @@
 """Tool registry for SmallHands."""
+import math
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Tuple
+
+from memory.tokenizer import STOPWORDS, code_tokenize
 from .dev_tools import run_tests, lint_code, format_code, search_repo, commit_git, create_pr
 from .static_analysis import semgrep_scan, bandit_scan
 
@@ -12,17 +17,55 @@ TOOLS = {
     "semgrep_scan": semgrep_scan,
     "bandit_scan": bandit_scan,
 }
+# Tools that only read the workspace: identical calls can share one run. run_tests is
+# not one: test suites may write files, hit services or be flaky, so each call runs.
+READ_ONLY_TOOLS = frozenset({"lint_code", "search_repo", "semgrep_scan", "bandit_scan"})
 
 class ToolRegistry:
-    """Registry for available tools."""
-    def __init__(self):
+    """
+    Registry for available tools.
+    Tool definitions are rendered once; get_tool_definitions_str(query) lists
+    only the tools whose name or description shares words with the query,
+    weighted by how rare each word is among the tools (all tools when none
+    match).
+    """
+    def __init__(self, max_tools: int = 4):
         self.tools = TOOLS
+        self.max_tools = max_tools
+        self._definitions: Dict[str, str] = {
+            name: f"{name}: {fn.__doc__ or ''}" for name, fn in self.tools.items()
+        }
+        self._terms: Dict[str, FrozenSet[str]] = {
+            name: frozenset(code_tokenize(definition)) - STOPWORDS
+            for name, definition in self._definitions.items()
+        }
+        df: Dict[str, int] = {}
+        for terms in self._terms.values():
+            for term in terms:
+                df[term] = df.get(term, 0) + 1
+        self._idf = {term: math.log(1 + len(self._terms) / n) for term, n in df.items()}
+        self._render = lru_cache(maxsize=256)(self._render_uncached)
 
     def get_tool(self, name: str):
         return self.tools.get(name)
 
-    def get_tool_definitions_str(self) -> str:
-        return "\n".join([f"{name}: {fn.__doc__ or ''}" for name, fn in self.tools.items()])
+    def is_read_only(self, name: str) -> bool:
+        return name in READ_ONLY_TOOLS
+
+    def _render_uncached(self, names: Tuple[str, ...]) -> str:
+        return "\n".join(self._definitions[name] for name in names)
+
+    def relevant_tools(self, query: str) -> List[str]:
+        """Tool names ranked by word overlap with the query, at most max_tools."""
+        words = set(code_tokenize(query))
+        scored = [(sum(self._idf[w] for w in words & terms), name)
+                  for name, terms in self._terms.items()]
+        ranked = sorted((s for s in scored if s[0] > 0), key=lambda s: -s[0])
+        return [name for _, name in ranked[:self.max_tools]]
+
+    def get_tool_definitions_str(self, query: str = None) -> str:
+        names = self.relevant_tools(query) if query else []
+        return self._render(tuple(names or self._definitions))
 
 def get_tool(name: str):
     return TOOLS.get(name)
@@ -1,11 +1,76 @@
 """Static analysis tools for SmallHands."""
 
+import os
+import json
 import subprocess
+from typing import Dict, List, Optional
 
-def semgrep_scan(path: str = ".") -> dict:
-    result = subprocess.run(["semgrep", "--config", "auto", path], capture_output=True, text=True)
-    return {"success": result.returncode == 0, "output": result.stdout + result.stderr}
+from .incremental import (config_hash, default_jobs, file_hashes, memoized, per_file,
+                          python_targets, record_manifest, resolve_changed, tree_files)
 
-def bandit_scan(path: str = ".") -> dict:
-    result = subprocess.run(["bandit", "-r", path, "-f", "json"], capture_output=True, text=True)
-    return {"success": result.returncode == 0, "output": result.stdout + result.stderr}
+def semgrep_scan(path: str = ".", cwd: str = ".", env: Optional[Dict[str, str]] = None,
+                 files: Optional[List[str]] = None, changed_only: bool = False,
+                 jobs: Optional[int] = None) -> dict:
+    """
+    Scan code with Semgrep security and bug-pattern rules. Pass `files` (or
+    changed_only=True for the git diff) to scan only changed files.
+    """
+    jobs = jobs or default_jobs()
+    hashes = file_hashes(cwd, tree_files(cwd, suffix=None))
+    changed = resolve_changed("semgrep_scan", cwd, hashes, files, changed_only)
+    if changed is not None:
+        changed = [rel for rel in changed if rel in hashes]
+        if not changed:
+            return {"success": True, "output": "No changed files to scan.", "cached": False}
+
+    def scan() -> dict:
+        result = subprocess.run(["semgrep", "--config", "auto", "--jobs", str(jobs),
+                                 *(changed or [path])], cwd=cwd, env=env,
+                                capture_output=True, text=True)
+        return {"success": result.returncode == 0, "output": result.stdout + result.stderr}
+
+    result = memoized("semgrep_scan", hashes, [path, changed], scan, env=env)
+    if result["success"] and files is None:
+        record_manifest("semgrep_scan", hashes)
+    return result
+
+def bandit_scan(path: str = ".", cwd: str = ".", env: Optional[Dict[str, str]] = None,
+                files: Optional[List[str]] = None, changed_only: bool = False,
+                jobs: Optional[int] = None) -> dict:
+    """
+    Scan Python code for common security issues with Bandit. Pass `files`
+    (or changed_only=True for the git diff) to scan only changed files;
+    files are scanned in `jobs` parallel shards and unchanged files reuse
+    their last result.
+    """
+    jobs = jobs or default_jobs()
+    targets = python_targets("bandit_scan", cwd, files, changed_only, path)
+
+    def run(part: List[str]) -> dict:
+        result = subprocess.run(["bandit", "-q", "-f", "json", *part], cwd=cwd, env=env,
+                                capture_output=True, text=True)
+        try:
+            report = json.loads(result.stdout)
+        except ValueError:
+            return {"": [{"filename": "", "reason": result.stdout + result.stderr}]}
+        by_file: Dict[str, Dict[str, list]] = {rel: {"results": [], "errors": []} for rel in part}
+        for kind in ("results", "errors"):
+            for item in report.get(kind, []):
+                rel = os.path.normpath(item.get("filename", ""))
+                if rel in by_file:
+                    by_file[rel][kind].append(item)
+        return by_file
+
+    def scan() -> dict:
+        results = per_file("bandit", targets, config_hash(cwd), run, jobs)
+        report = {"results": [], "errors": results.pop("", [])}
+        for rel in sorted(results):
+            report["results"].extend(results[rel]["results"])
+            report["errors"].extend(results[rel]["errors"])
+        return {"success": not report["results"] and not report["errors"],
+                "output": json.dumps(report, indent=2)}
+
+    result = memoized("bandit_scan", targets, [config_hash(cwd)], scan, env=env)
+    if result["success"] and files is None:
+        record_manifest("bandit_scan", file_hashes(cwd))
+    return result